@@ -0,0 +1,260 @@
+"""
+Benchmarks for the JSON -> DataFrame parsers, the CPU hot path of a backfill.
+
+Each case parses the payloads one league-season produces (synthetic, from bench.standin),
+call by call like the pipeline does, `scale` times over: 1x, 10x and 100x a season.
+Reported per case and scale:
+  rows_per_s     best of --repeat runs
+  peak_mib       tracemalloc peak over the whole scaled run (a separate, untimed pass): flat across
+                 scales unless something piles up between calls
+  gc0_per_krow   gen-0 collections per 1000 rows, i.e. net new Python objects per row / 700:
+                 the per-row churn (dicts, Timestamps) a parser causes
+
+Results are compared with bench/baseline.json; rows/s is machine dependent, so refresh the
+baseline on the machine you compare on.
+
+    python -m bench.bench_parsers                       # run and compare with the baseline
+    python -m bench.bench_parsers --scales 1 10 --only odds
+    python -m bench.bench_parsers --check               # exit 1 on a regression
+    python -m bench.bench_parsers --update-baseline     # after an intended change
+"""
+from __future__ import annotations
+import argparse, gc, json, os, platform, sys, time, tracemalloc
+from datetime import datetime, timezone
+import duckdb, pandas as pd
+from .standin import Universe
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SCALES = (1, 10, 100)
+TOLERANCE = 0.3
+LEAGUE, SEASON, OLDB_LEAGUE = 39, 2024, 78
+NOW = datetime(2025, 7, 1)          # the 2024 season is over: every fixture has stats
+
+
+def _chunks(xs, n):
+    return [xs[i:i + n] for i in range(0, len(xs), n)]
+
+
+def _cases(u: Universe) -> dict:
+    """name -> (payloads of one season, one per API call; parse(payload) -> DataFrame)."""
+    from src.ingest.loaders import build_odds_df_from_theoddsapi, openligadb_matches_frame
+    from src.ingest.odds_theoddsapi import h2h_snapshot_frame, normalize_odds
+    from src.ingest.explore_data_pipeline import player_match_frame, fixture_detail_frames
+    from src.ingest.players import player_stats_frame, fact_player_stats_frame
+    from src.ingest.explore_data_pipeline import FIXTURE_SPEC, odds_frame
+    from src.ingest.flatten import flatten, flatten_arrow
+    from src.ingest.explore_data_pipeline import ensure_schema, upsert
+    from src.ingest import decode
+    from src.ingest.teams import resolve_events
+    from src.warehouse.io import DB
+    from src.warehouse import odds_history
+
+    fixtures = u.fixtures(LEAGUE, SEASON)
+    events = [u.odds_api_event(LEAGUE, fx) for fx in fixtures]
+    events_all = [u.odds_api_event(LEAGUE, fx, "eu,uk,us", "h2h,totals") for fx in fixtures]
+    details = [{**u.fixture_item(LEAGUE, SEASON, fx), "events": u.events(fx), "lineups": u.lineups(fx),
+                "players": u.fixture_players(fx)} for fx in fixtures]
+    players = _chunks(u.season_players(LEAGUE, SEASON), 20)
+    pulled = datetime.now(timezone.utc)
+    # raw bodies, bytes -> frame: stdlib json (what r.json() did), decode.loads, decode.iter_payload
+    season_body = [_body("fixtures", [u.fixture_item(LEAGUE, SEASON, fx) for fx in fixtures])]
+    odds_bodies = [_body("odds", [u.odds_item(LEAGUE, SEASON, fx) for fx in chunk]) for chunk in _chunks(fixtures, 10)]
+    decoders = {"json": json.loads, "loads": decode.loads, "stream": decode.iter_payload}
+    con = _warehouse(u, fixtures)
+    sink = duckdb.connect()
+    ensure_schema(sink)
+    small = [flatten(FIXTURE_SPEC, c, updated_ts=pulled) for c in _chunks(decode.loads(season_body[0])["response"], 20)]
+    dbs = {"direct": DB(":memory:"), "bulk": DB(":memory:", bulk=True, flush_rows=5_000)}
+    # 40 fixtures (~4 rounds): one upsert per fixture is slow enough at 100x
+    player_frames = [player_match_frame(fx["id"], LEAGUE, SEASON, d["players"]) for fx, d in zip(fixtures[:40], details)]
+    history = [odds_history.theoddsapi_rows(build_odds_df_from_theoddsapi(c)) for c in _chunks(events, 10)]
+
+    return {
+        # The Odds API: ~10 upcoming events per call, 20 books each
+        "odds.theoddsapi_df": (_chunks(events, 10), build_odds_df_from_theoddsapi),
+        "odds.h2h_snapshot": (_chunks(events, 10), lambda p: h2h_snapshot_frame(p, pulled)),
+        # every market and region of a call, long format
+        "odds.normalize_all": (_chunks(events_all, 10), normalize_odds),
+        # odds snapshot -> fixture_id against fact_fixtures (alias index loaded per snapshot)
+        "teams.resolve_snapshot": ([normalize_odds(c) for c in _chunks(events, 10)], lambda df: resolve_events(con, df)),
+        # OpenLigaDB: one call per season
+        "openligadb.matches": ([u.openligadb("bl1", SEASON)], lambda p: openligadb_matches_frame(p, SEASON)[0]),
+        # /fixtures/players, one call per fixture (ingest_player_stats_per_fixture)
+        "fixtures.player_rows": ([(fx["id"], d["players"]) for fx, d in zip(fixtures, details)],
+                                 lambda p: player_match_frame(p[0], LEAGUE, SEASON, p[1])),
+        # /fixtures?ids=, 20 fixtures per call fanned out to 4 tables
+        "fixtures.detail_frames": (_chunks(details, 20),
+                                   lambda p: _Concat(fixture_detail_frames(p, LEAGUE, SEASON).values())),
+        # /players pages (python_ingester.ingest_player_stats, explore ingest_player_stats)
+        "players.player_stats": (players, lambda p: player_stats_frame(p, LEAGUE, SEASON)),
+        "players.fact_player_stats": (players, lambda p: fact_player_stats_frame(p, LEAGUE, SEASON)),
+        # /fixtures for a whole season in one body, /odds pages of 10 fixtures
+        **{f"decode.fixtures_season.{name}": (season_body, lambda b, d=d: flatten(FIXTURE_SPEC, d(b)["response"], updated_ts=pulled))
+           for name, d in decoders.items()},
+        **{f"decode.odds_pages.{name}": (odds_bodies, lambda b, d=d: odds_frame(d(b)["response"], LEAGUE, SEASON, markets=None))
+           for name, d in decoders.items()},
+        # season /fixtures -> fact_fixtures upsert, through a DataFrame or as Arrow
+        # (tracemalloc doesn't see Arrow's allocator: compare rows/s, not peak_mib)
+        **{f"write.fixtures_season.{name}": (
+            [decode.loads(season_body[0])["response"]],
+            lambda r, f=f: _Rows(upsert(sink, "fact_fixtures", f(FIXTURE_SPEC, r, updated_ts=pulled), ["fixture_id"])))
+           for name, f in (("pandas", flatten), ("arrow", flatten_arrow))},
+        # DB.insert_df with 20-row frames: one INSERT each, or buffered into one per 5k rows
+        **{f"write.db_small_batches.{name}": (small, lambda df, db=db: _Rows(db.insert_df("matches", df)))
+           for name, db in dbs.items()},
+        # fact_player_stats_match, ~30 rows per fixture: one upsert each, or through WriteBehind
+        "write.player_match.per_fixture": (player_frames, lambda df: _Rows(
+            upsert(sink, "fact_player_stats_match", df, ["fixture_id", "player_id", "team_id"]))),
+        "write.player_match.write_behind": ([player_frames], lambda fs: _Rows(_write_behind(sink, upsert, fs))),
+        # The Odds API pulls into odds_history; from the second pass on nothing moved and all is dropped
+        "write.odds_history.record": (history, lambda df: _record_history(sink, df)),
+    }
+
+
+def _write_behind(con, upsert, player_frames) -> int:
+    """A season of per-fixture frames through WriteBehind, flushed at the end like the ingester."""
+    from src.warehouse.buffer import WriteBehind
+    with WriteBehind(con, upsert) as wb:
+        for df in player_frames:
+            wb.add("fact_player_stats_match", df, ["fixture_id", "player_id", "team_id"])
+    return wb.totals["fact_player_stats_match"]
+
+
+def _record_history(con, rows):
+    """Rows offered to odds_history.record (what it stores depends on the pass)."""
+    from src.warehouse import odds_history
+    odds_history.record(con, rows)
+    return _Rows(len(rows))
+
+
+def _warehouse(u: Universe, fixtures):
+    """In-memory dim_team + fact_fixtures for the league; API-Football style names ('FC ...')."""
+    con = duckdb.connect()
+    con.execute("CREATE TABLE dim_team (team_id INTEGER PRIMARY KEY, team_name VARCHAR, country_name VARCHAR)")
+    con.executemany("INSERT INTO dim_team VALUES (?, ?, ?)", [(t["id"], f"FC {t['name']}", t["country"]) for t in u.teams(LEAGUE)])
+    con.execute("""CREATE TABLE fact_fixtures (fixture_id INTEGER, league_id INTEGER, date_utc TIMESTAMP,
+                   home_team_id INTEGER, away_team_id INTEGER)""")
+    con.executemany("INSERT INTO fact_fixtures VALUES (?, ?, ?, ?, ?)",
+                    [(fx["id"], LEAGUE, fx["date"], fx["home"], fx["away"]) for fx in fixtures])
+    return con
+
+
+def _body(endpoint: str, items: list) -> bytes:
+    return json.dumps({"get": endpoint, "parameters": {}, "errors": [], "results": len(items),
+                       "paging": {"current": 1, "total": 1}, "response": items}).encode()
+
+
+class _Rows:
+    """A row count reported by a writer."""
+    def __init__(self, n: int):
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+
+class _Concat:
+    """Row count of several frames without concatenating them."""
+    def __init__(self, frames):
+        self.n = sum(len(f) for f in frames)
+
+    def __len__(self):
+        return self.n
+
+
+def _timed(payloads, parse, scale: int) -> tuple[int, float, int]:
+    collections = [0]
+    def on_gc(phase, info):
+        if phase == "start" and info["generation"] == 0:
+            collections[0] += 1
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    try:
+        rows, t0 = 0, time.perf_counter()
+        for _ in range(scale):
+            for p in payloads:
+                rows += len(parse(p))
+        return rows, time.perf_counter() - t0, collections[0]
+    finally:
+        gc.callbacks.remove(on_gc)
+
+
+def _peak_mib(payloads, parse, scale: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for _ in range(scale):
+            for p in payloads:
+                parse(p)
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def run(scales=SCALES, only=None, repeat: int = 3) -> dict:
+    cases = _cases(Universe(seed=0, now=NOW))
+    results = {}
+    for name, (payloads, parse) in cases.items():
+        if only and not any(o in name for o in only):
+            continue
+        for scale in scales:
+            peak = _peak_mib(payloads, parse, scale)
+            runs = [_timed(payloads, parse, scale) for _ in range(1 if scale >= 100 else repeat)]
+            rows, best, gc0 = min(runs, key=lambda r: r[1])
+            results[f"{name}@{scale}x"] = {"rows": rows, "seconds": round(best, 4),
+                                           "rows_per_s": round(rows / best), "peak_mib": round(peak, 2),
+                                           "gc0_per_krow": round(1000 * gc0 / max(rows, 1), 3)}
+            r = results[f"{name}@{scale}x"]
+            print(f"{name + '@' + str(scale) + 'x':32s} {rows:>10,d} rows {r['rows_per_s']:>12,d} rows/s "
+                  f"{r['peak_mib']:>8.2f} MiB peak {r['gc0_per_krow']:>7.3f} gc0/krow", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list[str]:
+    """Regressions against the baseline: slower, or more memory / churn, by more than `tolerance`."""
+    out = []
+    for key, r in results.items():
+        b = baseline.get("results", {}).get(key)
+        if b is None:
+            continue
+        if r["rows_per_s"] < b["rows_per_s"] * (1 - tolerance):
+            out.append(f"{key}: {r['rows_per_s']:,} rows/s vs {b['rows_per_s']:,} baseline")
+        if r["peak_mib"] > b["peak_mib"] * (1 + tolerance) + 0.5:
+            out.append(f"{key}: {r['peak_mib']} MiB peak vs {b['peak_mib']} baseline")
+        if r["gc0_per_krow"] > b["gc0_per_krow"] * (1 + tolerance) + 0.05:
+            out.append(f"{key}: {r['gc0_per_krow']} gc0/krow vs {b['gc0_per_krow']} baseline")
+    return out
+
+
+def _meta() -> dict:
+    return {"python": platform.python_version(), "pandas": pd.__version__, "machine": platform.machine(),
+            "date": datetime.now(timezone.utc).strftime("%Y-%m-%d")}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the JSON -> DataFrame parsers")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--only", nargs="+", help="substrings of case names to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--check", action="store_true", help="exit 1 when a case regressed")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.scales, args.only, args.repeat)
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as fh:
+            baseline = json.load(fh)
+    if args.update_baseline:
+        merged = {**baseline.get("results", {}), **results}
+        with open(BASELINE, "w") as fh:
+            json.dump({"meta": _meta(), "results": dict(sorted(merged.items()))}, fh, indent=1)
+        print(f"baseline written to {BASELINE}")
+        sys.exit(0)
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print("REGRESSION", line)
+    if not regressions:
+        print("no regression against the baseline" if baseline else "no baseline yet (--update-baseline)")
+    sys.exit(1 if args.check and regressions else 0)
@@ -0,0 +1,619 @@
+"""
+Offline stand-in for the providers we call, so ingestion can be benchmarked and load-tested
+without spending quota.
+
+Serves, on one port:
+  API-Football   /leagues /teams /fixtures (?league&season[&from&to] and ?ids=a-b-c)
+                 /fixtures/players /fixtures/lineups /fixtures/events
+                 /players (paged) /injuries /odds (paged) /standings
+  OpenLigaDB     /getmatchdata/{league}/{season}
+  The Odds API   /sports/{sport_key}/odds
+
+Payloads are synthetic but deterministic and production-sized (20 teams / 380 fixtures per
+season, 28-man squads, 20 players per /players page, 10 fixtures per /odds page, ...).
+Recorded payloads take precedence: put a real response body in
+<replay_dir>/<path>/<sorted query>.json (see recording_path) and it is served as-is.
+
+Faults: fixed latency + jitter, random 429s (with Retry-After, or API-Football's
+"200 + errors.rateLimit" variant), random 5xx, and a sliding per-minute window reported
+through the X-RateLimit-* headers.
+
+    python -m bench.standin --port 8765 --latency-ms 80 --p429 0.01 --p5xx 0.01
+    API_FOOTBALL_BASE=http://127.0.0.1:8765 ODDS_BASE=http://127.0.0.1:8765 \\
+    OLDB_BASE=http://127.0.0.1:8765 python run_ingest.py
+
+In-process: `with StandIn(...) as srv: srv.use()` points httpclient at it until exit.
+"""
+from __future__ import annotations
+import json, math, os, random, threading, time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+# league id -> (name, country, code, teams, The Odds API key, OpenLigaDB key)
+LEAGUES = {
+    39: ("Premier League", "England", "GB", 20, "soccer_epl", None),
+    61: ("Ligue 1", "France", "FR", 18, "soccer_france_ligue_one", None),
+    78: ("Bundesliga", "Germany", "DE", 18, "soccer_germany_bundesliga", "bl1"),
+    135: ("Serie A", "Italy", "IT", 20, "soccer_italy_serie_a", None),
+    140: ("La Liga", "Spain", "ES", 20, "soccer_spain_la_liga", None),
+}
+SQUAD = 28
+PLAYERS_PER_PAGE = 20
+ODDS_PER_PAGE = 10
+BOOKMAKERS = [(i, f"Book{i}") for i in range(1, 9)]        # API-Football /odds
+ODDS_API_BOOKS = [f"book{i}" for i in range(1, 21)]          # The Odds API, per region
+OU_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+
+
+def recording_path(root: str, path: str, params: dict) -> str:
+    """Where a recorded response for GET `path`?`params` lives under `root`."""
+    query = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if k != "apiKey") or "_"
+    return os.path.join(root, path.strip("/"), query + ".json")
+
+
+def _iso(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+
+class Universe:
+    """Deterministic synthetic leagues, teams, squads and fixtures; payloads built on demand."""
+
+    def __init__(self, seed: int = 0, now: datetime | None = None):
+        self.seed = seed
+        self.now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def _rng(self, *key) -> random.Random:
+        return random.Random(":".join(map(str, (self.seed,) + key)))
+
+    # --- entities ---
+    def teams(self, league_id: int) -> list[dict]:
+        name, country, _, n, _, _ = LEAGUES[league_id]
+        return [{"id": league_id * 100 + i, "name": f"{country} Team {i}", "country": country,
+                 "strength": 0.6 + 0.8 * self._rng("strength", league_id, i).random()}
+                for i in range(1, n + 1)]
+
+    def squad(self, team_id: int) -> list[dict]:
+        out = []
+        for k in range(1, SQUAD + 1):
+            pos = "G" if k <= 3 else "D" if k <= 11 else "M" if k <= 20 else "F"
+            out.append({"id": team_id * 100 + k, "name": f"P. Player{team_id}{k:02d}",
+                        "firstname": "P.", "lastname": f"Player{team_id}{k:02d}", "number": k, "pos": pos})
+        return out
+
+    @lru_cache(maxsize=64)
+    def fixtures(self, league_id: int, season: int) -> tuple:
+        """Double round robin, one round a week from mid-August."""
+        teams = self.teams(league_id)
+        ids = [t["id"] for t in teams]
+        n = len(ids)
+        rounds = []
+        rot = ids[1:]
+        for r in range(n - 1):
+            order = [ids[0]] + rot
+            pairs = [(order[i], order[n - 1 - i]) for i in range(n // 2)]
+            rounds.append([(a, b) if r % 2 == 0 else (b, a) for a, b in pairs])
+            rot = rot[-1:] + rot[:-1]
+        rounds += [[(b, a) for a, b in rnd] for rnd in rounds]
+
+        strength = {t["id"]: t["strength"] for t in teams}
+        start = datetime(season, 8, 12, 14, 0)
+        out = []
+        for r, rnd in enumerate(rounds, start=1):
+            for i, (home, away) in enumerate(rnd):
+                fid = league_id * 1_000_000 + (season % 100) * 10_000 + r * 100 + i
+                kickoff = start + timedelta(weeks=r - 1, days=i % 3, hours=2 * (i % 4))
+                rng = self._rng("fx", fid)
+                finished = kickoff + timedelta(hours=2) < self.now
+                gh = self._poisson(rng, 1.5 * strength[home] / strength[away]) if finished else None
+                ga = self._poisson(rng, 1.1 * strength[away] / strength[home]) if finished else None
+                out.append({"id": fid, "round": r, "date": kickoff, "home": home, "away": away,
+                            "status": "FT" if finished else "NS", "goals": (gh, ga)})
+        return tuple(out)
+
+    @staticmethod
+    def _poisson(rng: random.Random, lam: float) -> int:
+        k, p, limit = 0, 1.0, math.exp(-lam)
+        while True:
+            p *= rng.random()
+            if p <= limit:
+                return k
+            k += 1
+
+    @lru_cache(maxsize=4096)
+    def fixture(self, fid: int):
+        league_id, season = fid // 1_000_000, 2000 + (fid // 10_000) % 100
+        if league_id not in LEAGUES:
+            return None
+        for fx in self.fixtures(league_id, season):
+            if fx["id"] == fid:
+                return league_id, season, fx
+        return None
+
+    def team_name(self, team_id: int) -> str:
+        return f"{LEAGUES[team_id // 100][1]} Team {team_id % 100}"
+
+    # --- API-Football items ---
+    def fixture_item(self, league_id, season, fx) -> dict:
+        name, country = LEAGUES[league_id][:2]
+        gh, ga = fx["goals"]
+        return {
+            "fixture": {"id": fx["id"], "referee": f"Referee {fx['id'] % 23}", "timezone": "UTC",
+                        "date": _iso(fx["date"]), "timestamp": int(fx["date"].replace(tzinfo=timezone.utc).timestamp()),
+                        "venue": {"id": fx["home"], "name": f"{self.team_name(fx['home'])} Stadium", "city": country},
+                        "status": {"long": "Match Finished" if fx["status"] == "FT" else "Not Started",
+                                   "short": fx["status"], "elapsed": 90 if fx["status"] == "FT" else None}},
+            "league": {"id": league_id, "name": name, "country": country, "season": season,
+                       "round": f"Regular Season - {fx['round']}"},
+            "teams": {"home": {"id": fx["home"], "name": self.team_name(fx["home"]),
+                               "winner": None if gh is None or gh == ga else gh > ga},
+                      "away": {"id": fx["away"], "name": self.team_name(fx["away"]),
+                               "winner": None if ga is None or gh == ga else ga > gh}},
+            "goals": {"home": gh, "away": ga},
+            "score": {"fulltime": {"home": gh, "away": ga}},
+        }
+
+    def _lineup(self, team_id: int, rng: random.Random):
+        squad = self.squad(team_id)
+        keeper = rng.choice(squad[:3])
+        outfield = rng.sample(squad[3:], 19)
+        return [keeper] + outfield[:10], outfield[10:]
+
+    def lineups(self, fx) -> list[dict]:
+        out = []
+        for team_id in (fx["home"], fx["away"]):
+            xi, subs = self._lineup(team_id, self._rng("lineup", fx["id"], team_id))
+            entry = lambda p, grid=None: {"player": {"id": p["id"], "name": p["name"], "number": p["number"],
+                                                      "pos": p["pos"], "grid": grid}}
+            out.append({"team": {"id": team_id, "name": self.team_name(team_id)}, "formation": "4-3-3",
+                        "startXI": [entry(p, f"{1 + j // 4}:{1 + j % 4}") for j, p in enumerate(xi)],
+                        "substitutes": [entry(p) for p in subs]})
+        return out
+
+    def events(self, fx) -> list[dict]:
+        if fx["status"] != "FT":
+            return []
+        rng = self._rng("events", fx["id"])
+        out = []
+        for team_id, goals in zip((fx["home"], fx["away"]), fx["goals"]):
+            xi, subs = self._lineup(team_id, self._rng("lineup", fx["id"], team_id))
+            for _ in range(goals):
+                out.append((rng.randint(1, 90), team_id, rng.choice(xi[1:]), rng.choice(xi[1:]), "Goal", "Normal Goal"))
+            for _ in range(rng.randint(0, 3)):
+                out.append((rng.randint(10, 90), team_id, rng.choice(xi), None, "Card", "Yellow Card"))
+            for j in range(3):
+                out.append((rng.randint(46, 85), team_id, subs[j], xi[-1 - j], "subst", f"Substitution {j + 1}"))
+        out.sort(key=lambda e: e[0])
+        return [{"time": {"elapsed": t, "extra": None},
+                 "team": {"id": tid, "name": self.team_name(tid)},
+                 "player": {"id": p["id"], "name": p["name"]},
+                 "assist": {"id": a["id"] if a else None, "name": a["name"] if a else None},
+                 "type": typ, "detail": detail, "comments": None}
+                for t, tid, p, a, typ, detail in out]
+
+    def fixture_players(self, fx) -> list[dict]:
+        if fx["status"] != "FT":
+            return []
+        out = []
+        for team_id in (fx["home"], fx["away"]):
+            rng = self._rng("fxplayers", fx["id"], team_id)
+            xi, subs = self._lineup(team_id, self._rng("lineup", fx["id"], team_id))
+            players = []
+            for j, p in enumerate(xi + subs[:5]):
+                minutes = 90 if j < 8 else rng.randint(20, 90) if j < 11 else rng.randint(1, 44)
+                players.append({"player": {"id": p["id"], "name": p["name"]},
+                                "statistics": [self._stats_block(rng, p, minutes, j == 0)]})
+            out.append({"team": {"id": team_id, "name": self.team_name(team_id)}, "players": players})
+        return out
+
+    def _stats_block(self, rng, p, minutes, captain=False, games=None) -> dict:
+        scale = minutes / 90
+        r = lambda hi: int(rng.random() * hi * scale)
+        return {
+            "games": {"minutes": minutes, "number": p["number"], "position": p["pos"],
+                      "rating": f"{6 + 2 * rng.random():.1f}", "captain": captain, "substitute": False,
+                      **(games or {})},
+            "offsides": r(2) or None,
+            "shots": {"total": r(4), "on": r(2)},
+            "goals": {"total": r(1.3), "conceded": 0, "assists": r(1.2), "saves": r(5) if p["pos"] == "G" else None},
+            "passes": {"total": r(70), "key": r(3), "accuracy": str(70 + rng.randint(0, 25))},
+            "tackles": {"total": r(4), "blocks": r(2), "interceptions": r(3)},
+            "duels": {"total": r(14), "won": r(8)},
+            "dribbles": {"attempts": r(4), "success": r(2), "past": None},
+            "fouls": {"drawn": r(3), "committed": r(3)},
+            "cards": {"yellow": int(rng.random() < 0.12), "red": int(rng.random() < 0.01)},
+            "penalty": {"won": None, "commited": None, "scored": 0, "missed": 0, "saved": None},
+        }
+
+    def season_players(self, league_id: int, season: int) -> list[dict]:
+        out = []
+        n_played = sum(fx["status"] == "FT" for fx in self.fixtures(league_id, season)) * 2 // len(self.teams(league_id))
+        for t in self.teams(league_id):
+            for p in self.squad(t["id"]):
+                rng = self._rng("season", season, p["id"])
+                apps = rng.randint(0, n_played) if n_played else 0
+                block = self._stats_block(rng, p, apps * rng.randint(45, 90),
+                                          games={"appearences": apps, "lineups": apps * 3 // 4})
+                block["team"] = {"id": t["id"], "name": t["name"]}
+                block["league"] = {"id": league_id, "name": LEAGUES[league_id][0], "season": season}
+                out.append({"player": {"id": p["id"], "name": p["name"], "firstname": p["firstname"],
+                                       "lastname": p["lastname"], "age": 18 + p["id"] % 17,
+                                       "birth": {"date": f"{1990 + p['id'] % 15}-0{1 + p['id'] % 9}-1{p['id'] % 9}"},
+                                       "nationality": LEAGUES[league_id][1],
+                                       "height": f"{170 + p['id'] % 25} cm", "weight": f"{65 + p['id'] % 20} kg"},
+                            "statistics": [block]})
+        return out
+
+    def injuries(self, league_id: int, season: int) -> list[dict]:
+        out = []
+        for fx in self.fixtures(league_id, season):
+            rng = self._rng("injuries", fx["id"])
+            for team_id in (fx["home"], fx["away"]):
+                if rng.random() < 0.35:
+                    p = rng.choice(self.squad(team_id))
+                    out.append({"player": {"id": p["id"], "name": p["name"],
+                                           "type": rng.choice(["Missing Fixture", "Questionable"]),
+                                           "reason": rng.choice(["Knee Injury", "Hamstring", "Suspended", "Illness"])},
+                                "team": {"id": team_id, "name": self.team_name(team_id)},
+                                "fixture": {"id": fx["id"], "timezone": "UTC", "date": _iso(fx["date"])},
+                                "league": {"id": league_id, "season": season}})
+        return out
+
+    def _probs(self, fx):
+        s = {t["id"]: t["strength"] for t in self.teams(fx["id"] // 1_000_000)}
+        h = s[fx["home"]] * 1.25
+        a = s[fx["away"]]
+        d = 0.27
+        return (1 - d) * h / (h + a), d, (1 - d) * a / (h + a)
+
+    @staticmethod
+    def _price(p: float, rng: random.Random, margin=1.06) -> float:
+        return round(max(1.01, 1 / (p * margin) * (1 + 0.04 * (rng.random() - 0.5))), 2)
+
+    def odds_item(self, league_id, season, fx) -> dict:
+        ph, pd_, pa = self._probs(fx)
+        books = []
+        for bid, bname in BOOKMAKERS:
+            rng = self._rng("odds", fx["id"], bid)
+            over = {line: 1 - math.exp(-2.6) * sum(2.6 ** k / math.factorial(k) for k in range(int(line) + 1))
+                    for line in OU_LINES}
+            books.append({"id": bid, "name": bname, "bets": [
+                {"id": 1, "name": "Match Winner", "values": [
+                    {"value": "Home", "odd": str(self._price(ph, rng))},
+                    {"value": "Draw", "odd": str(self._price(pd_, rng))},
+                    {"value": "Away", "odd": str(self._price(pa, rng))}]},
+                {"id": 5, "name": "Goals Over/Under", "values": [
+                    v for line, p in over.items() for v in (
+                        {"value": f"Over {line}", "odd": str(self._price(p, rng))},
+                        {"value": f"Under {line}", "odd": str(self._price(1 - p, rng))})]},
+                {"id": 8, "name": "Both Teams Score", "values": [
+                    {"value": "Yes", "odd": str(self._price(0.52, rng))},
+                    {"value": "No", "odd": str(self._price(0.48, rng))}]},
+            ]})
+        return {"league": {"id": league_id, "season": season},
+                "fixture": {"id": fx["id"], "timezone": "UTC", "date": _iso(fx["date"])},
+                "update": _iso(self.now), "bookmakers": books}
+
+    def standings(self, league_id: int, season: int) -> list[dict]:
+        table = {t["id"]: {"played": 0, "win": 0, "draw": 0, "lose": 0, "for": 0, "against": 0, "form": ""}
+                 for t in self.teams(league_id)}
+        for fx in self.fixtures(league_id, season):
+            if fx["status"] != "FT":
+                continue
+            gh, ga = fx["goals"]
+            for tid, gf, gc in ((fx["home"], gh, ga), (fx["away"], ga, gh)):
+                row = table[tid]
+                res = "W" if gf > gc else "D" if gf == gc else "L"
+                row["played"] += 1
+                row[{"W": "win", "D": "draw", "L": "lose"}[res]] += 1
+                row["for"] += gf
+                row["against"] += gc
+                row["form"] = (row["form"] + res)[-5:]
+        ranked = sorted(table.items(), key=lambda kv: (-(3 * kv[1]["win"] + kv[1]["draw"]),
+                                                       -(kv[1]["for"] - kv[1]["against"]), -kv[1]["for"]))
+        rows = [{"rank": i, "team": {"id": tid, "name": self.team_name(tid)},
+                 "points": 3 * r["win"] + r["draw"], "goalsDiff": r["for"] - r["against"], "form": r["form"][::-1],
+                 "all": {"played": r["played"], "win": r["win"], "draw": r["draw"], "lose": r["lose"],
+                         "goals": {"for": r["for"], "against": r["against"]}}}
+                for i, (tid, r) in enumerate(ranked, start=1)]
+        return [{"league": {"id": league_id, "season": season, "name": LEAGUES[league_id][0], "standings": [rows]}}]
+
+    # --- other providers ---
+    def openligadb(self, league_key: str, season: int) -> list[dict]:
+        league_id = next((lid for lid, v in LEAGUES.items() if v[5] == league_key), None)
+        if league_id is None:
+            return []
+        out = []
+        for fx in self.fixtures(league_id, season):
+            gh, ga = fx["goals"]
+            local = fx["date"] + timedelta(hours=2)
+            out.append({
+                "matchID": fx["id"], "matchDateTime": local.strftime("%Y-%m-%dT%H:%M:%S"),
+                "matchDateTimeUTC": fx["date"].strftime("%Y-%m-%dT%H:%M:%SZ"), "leagueId": 4000 + season % 100,
+                "leagueName": f"1. Fußball-Bundesliga {season}/{season + 1}", "group": {"groupOrderID": fx["round"]},
+                "team1": {"teamId": fx["home"], "teamName": self.team_name(fx["home"])},
+                "team2": {"teamId": fx["away"], "teamName": self.team_name(fx["away"])},
+                "matchIsFinished": fx["status"] == "FT",
+                "matchResults": [] if gh is None else [{"resultTypeID": 2, "pointsTeam1": gh, "pointsTeam2": ga}],
+                "location": {"locationCity": LEAGUES[league_id][1], "locationStadium": f"{self.team_name(fx['home'])} Stadium"},
+            })
+        return out
+
+    def odds_api(self, sport_key: str, regions: str, markets: str) -> list[dict] | None:
+        league_id = next((lid for lid, v in LEAGUES.items() if v[4] == sport_key), None)
+        if league_id is None:
+            return None
+        season = self.now.year if self.now.month >= 7 else self.now.year - 1
+        upcoming = [fx for fx in self.fixtures(league_id, season) if fx["status"] == "NS"][:40]
+        return [self.odds_api_event(league_id, fx, regions, markets) for fx in upcoming]
+
+    def odds_api_event(self, league_id: int, fx, regions: str = "eu", markets: str = "h2h") -> dict:
+        ph, pd_, pa = self._probs(fx)
+        home, away = self.team_name(fx["home"]), self.team_name(fx["away"])
+        books = []
+        for region in regions.split(","):
+            for key in ODDS_API_BOOKS:
+                rng = self._rng("oddsapi", fx["id"], region, key)
+                mk = []
+                if "h2h" in markets:
+                    mk.append({"key": "h2h", "last_update": _iso(self.now), "outcomes": [
+                        {"name": home, "price": self._price(ph, rng)},
+                        {"name": away, "price": self._price(pa, rng)},
+                        {"name": "Draw", "price": self._price(pd_, rng)}]})
+                if "totals" in markets:
+                    mk.append({"key": "totals", "last_update": _iso(self.now), "outcomes": [
+                        {"name": "Over", "price": self._price(0.55, rng), "point": 2.5},
+                        {"name": "Under", "price": self._price(0.45, rng), "point": 2.5}]})
+                books.append({"key": f"{region}_{key}", "title": f"{key.title()} ({region})",
+                              "last_update": _iso(self.now), "markets": mk})
+        return {"id": f"{fx['id']:x}{'0' * 20}"[:32], "sport_key": LEAGUES[league_id][4],
+                "sport_title": LEAGUES[league_id][0], "commence_time": fx["date"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "home_team": home, "away_team": away, "bookmakers": books}
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    p429: float = 0.0            # chance of a rate-limit answer
+    p429_body: float = 0.5       # share of those sent as API-Football's 200 + errors.rateLimit
+    p5xx: float = 0.0
+    retry_after: float = 1.0
+    per_minute: int = 300        # X-RateLimit-Limit window; exceeding it answers 429
+    per_day: int = 75_000
+    seed: int = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "StandIn"
+    protocol_version = "HTTP/1.1"     # keep-alive, like the real providers
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        srv = self.server
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        path = url.path.rstrip("/") or "/"
+        if path == "/__stats":
+            return self._send(200, srv.stats())
+
+        status, body, headers = srv.respond(path, params)
+        self._send(status, body, headers)
+
+    def _send(self, status, body, headers=None):
+        raw = body if isinstance(body, bytes) else json.dumps(body, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, str(v))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+class StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, universe: Universe | None = None,
+                 faults: Faults | None = None, replay_dir: str | None = None):
+        super().__init__((host, port), _Handler)
+        self.universe = universe or Universe()
+        self.faults = faults or Faults()
+        self.replay_dir = replay_dir
+        self._rng = random.Random(self.faults.seed)
+        self._lock = threading.Lock()
+        self._window: deque = deque()
+        self._day_count = 0
+        self.counts: Counter = Counter()
+        self._thread = None
+        self._previous = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
+
+    # --- lifecycle ---
+    def start(self) -> "StandIn":
+        self._thread = threading.Thread(target=self.serve_forever, name="standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._previous is not None:
+            from src.ingest import httpclient
+            for name, url in self._previous.items():
+                httpclient.set_base_url(name, url)
+            self._previous = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def use(self):
+        """Point every provider in src.ingest.httpclient at this server until stop()."""
+        from src.ingest import httpclient
+        self._previous = {name: cfg["base_url"] for name, cfg in httpclient.PROVIDERS.items()}
+        for name in httpclient.PROVIDERS:
+            httpclient.set_base_url(name, self.url)
+        return self
+
+    # --- request handling ---
+    def _faults(self, path: str):
+        """(status, body, headers, fault name) for an injected failure; status is None when the call goes through."""
+        f = self.faults
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] > 60:
+                self._window.popleft()
+            self._window.append(now)
+            self._day_count += 1
+            in_window, day = len(self._window), self._day_count
+            roll, roll5, body_roll = self._rng.random(), self._rng.random(), self._rng.random()
+            delay = max(0.0, f.latency_ms + f.jitter_ms * (2 * self._rng.random() - 1)) / 1000
+        headers = {"X-RateLimit-Limit": f.per_minute, "X-RateLimit-Remaining": max(0, f.per_minute - in_window),
+                   "x-ratelimit-requests-limit": f.per_day,
+                   "x-ratelimit-requests-remaining": max(0, f.per_day - day)}
+        if delay:
+            time.sleep(delay)
+        if in_window > f.per_minute or roll < f.p429:
+            if body_roll < f.p429_body and not path.startswith(("/sports", "/getmatchdata")):
+                return 200, {"errors": {"rateLimit": "Too many requests. Your rate limit is exceeded."},
+                             "response": []}, {**headers, "Retry-After": f.retry_after}, "429_body"
+            return 429, {"message": "Too many requests"}, {**headers, "Retry-After": f.retry_after}, "429"
+        if roll5 < f.p5xx:
+            return 503, {"message": "Service Unavailable"}, headers, "5xx"
+        return None, None, headers, None
+
+    def respond(self, path: str, params: dict):
+        status, body, headers, fault = self._faults(path)
+        with self._lock:
+            self.counts[path] += 1
+            if fault:
+                self.counts[fault] += 1
+        if status is not None:
+            return status, body, headers
+
+        if self.replay_dir:
+            rec = recording_path(self.replay_dir, path, params)
+            if os.path.exists(rec):
+                with open(rec, "rb") as fh:
+                    return 200, fh.read(), headers
+
+        if path.startswith("/sports/") and path.endswith("/odds"):
+            return self._odds_api(path.split("/")[2], params, headers)
+        if path.startswith("/getmatchdata/"):
+            parts = path.split("/")
+            return 200, self.universe.openligadb(parts[2], int(parts[3]) if len(parts) > 3 else 2023), headers
+        return self._api_football(path, params, headers)
+
+    def _odds_api(self, sport_key, params, headers):
+        regions, markets = params.get("regions", "eu"), params.get("markets", "h2h")
+        events = self.universe.odds_api(sport_key, regions, markets)
+        if events is None:
+            return 404, {"message": "Unknown sport"}, headers
+        cost = len(regions.split(",")) * len(markets.split(","))
+        with self._lock:
+            self.counts["odds_api_credits"] += cost
+            used = self.counts["odds_api_credits"]
+        return 200, events, {"x-requests-last": cost, "x-requests-used": used,
+                             "x-requests-remaining": max(0, 100_000 - used)}
+
+    def _api_football(self, path, params, headers):
+        u = self.universe
+        league = int(params["league"]) if params.get("league") else None
+        season = int(params["season"]) if params.get("season") else None
+        page = int(params.get("page", 1))
+        total_pages = 1
+        if league is not None and league not in LEAGUES:
+            items = []
+        elif path == "/leagues":
+            items = [{"league": {"id": lid, "name": v[0], "type": "League"},
+                      "country": {"name": v[1], "code": v[2]},
+                      "seasons": [{"year": y, "coverage": {"standings": True, "players": True, "odds": True}}
+                                  for y in range(2020, u.now.year + 1)]}
+                     for lid, v in LEAGUES.items() if params.get("country") in (None, v[1])]
+        elif path == "/teams":
+            items = [{"team": {"id": t["id"], "name": t["name"], "country": t["country"]},
+                      "country": {"name": t["country"]},
+                      "venue": {"id": t["id"], "name": f"{t['name']} Stadium"}} for t in u.teams(league)]
+        elif path == "/fixtures" and params.get("ids"):
+            items = []
+            for fid in params["ids"].split("-")[:20]:
+                found = u.fixture(int(fid))
+                if found:
+                    lid, s, fx = found
+                    items.append({**u.fixture_item(lid, s, fx), "events": u.events(fx), "lineups": u.lineups(fx),
+                                  "players": u.fixture_players(fx), "statistics": []})
+        elif path == "/fixtures":
+            lo = datetime.fromisoformat(params["from"]) if params.get("from") else None
+            hi = datetime.fromisoformat(params["to"]) + timedelta(days=1) if params.get("to") else None
+            items = [u.fixture_item(league, season, fx) for fx in u.fixtures(league, season)
+                     if (lo is None or fx["date"] >= lo) and (hi is None or fx["date"] < hi)]
+        elif path in ("/fixtures/players", "/fixtures/lineups", "/fixtures/events"):
+            found = u.fixture(int(params.get("fixture", 0)))
+            build = {"/fixtures/players": u.fixture_players, "/fixtures/lineups": u.lineups,
+                     "/fixtures/events": u.events}[path]
+            items = build(found[2]) if found else []
+        elif path == "/players":
+            everyone = u.season_players(league, season)
+            total_pages = max(1, math.ceil(len(everyone) / PLAYERS_PER_PAGE))
+            items = everyone[(page - 1) * PLAYERS_PER_PAGE: page * PLAYERS_PER_PAGE]
+        elif path == "/injuries":
+            items = u.injuries(league, season)
+        elif path == "/odds":
+            fxs = u.fixtures(league, season)
+            total_pages = max(1, math.ceil(len(fxs) / ODDS_PER_PAGE))
+            items = [u.odds_item(league, season, fx) for fx in fxs[(page - 1) * ODDS_PER_PAGE: page * ODDS_PER_PAGE]]
+        elif path == "/standings":
+            items = u.standings(league, season)
+        else:
+            return 404, {"errors": {"endpoint": f"{path} does not exist"}, "response": []}, headers
+
+        return 200, {"get": path.lstrip("/"), "parameters": params, "errors": [], "results": len(items),
+                     "paging": {"current": page, "total": total_pages}, "response": items}, headers
+
+
+def env(url: str) -> dict:
+    """Environment that points a child process (e.g. run_ingest.py) at the stand-in."""
+    return {"API_FOOTBALL_BASE": url, "ODDS_BASE": url, "OLDB_BASE": url,
+            "API_FOOTBALL_KEY": "standin", "THEODDSAPI_KEY": "standin", "THE_ODDS_API_KEY": "standin"}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Offline stand-in for API-Football, The Odds API and OpenLigaDB")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--p429", type=float, default=0.0)
+    parser.add_argument("--p5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--per-minute", type=int, default=300)
+    parser.add_argument("--replay-dir", default=None, help="serve recorded payloads from here when present")
+    args = parser.parse_args()
+    srv = StandIn(args.host, args.port, Universe(seed=args.seed), replay_dir=args.replay_dir,
+                  faults=Faults(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, p429=args.p429,
+                                p5xx=args.p5xx, retry_after=args.retry_after, per_minute=args.per_minute,
+                                seed=args.seed))
+    print(f"stand-in listening on {srv.url}; point the pipeline at it with:")
+    print("  " + " ".join(f"{k}={v}" for k, v in env(srv.url).items()))
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -1,4 +1,16 @@
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Ingest API-Football data and odds snapshots into DuckDB")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only fetch deltas since the last run (watermarks in ingest_watermark)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from ingest_journal; prints what is left and its request cost")
+    parser.add_argument("--parallel", type=int, default=None,
+                        help="stages run at once (default INGEST_PARALLEL or 4)")
+    parser.add_argument("--lake", metavar="DIR", default=None,
+                        help="afterwards, sync the fact tables to a Parquet lake in DIR (changed partitions only)")
+    args = parser.parse_args()
+
     # we switched from OpenDB to API-football
     from src.ingest.loaders import ingest_matches_openligadb, ingest_odds_snapshot 
     from src.ingest.explore_data_pipeline import run_full_ingest
@@ -12,7 +24,8 @@ if __name__ == "__main__":
         "Spain": 140,      # La Liga
     }
     seasons = list(range(2020, 2023))  # We ran [2020, 2021, 2022, 2023, 2024, 2025] for EPL, otherwise [2023, 2024, 2025]
-    run_full_ingest(leagues, seasons)
+    run_full_ingest(leagues, seasons, incremental=args.incremental, parallel=args.parallel,
+                    resume=args.resume)
 
 
     print("→ Ingesting odds snapshot (H2H, The Odds API)…") # For now, we can only get 2025 quotes. We got it for all 5 leagues. Would have to get a plan to have more history.
@@ -23,9 +36,37 @@ if __name__ == "__main__":
         'SerieA': 'soccer_italy_serie_a',
         'Bundesliga': 'soccer_germany_bundesliga'
     }
-    for league in dic_sport_key.keys():
+    from src.ingest import quota
+    # one h2h/eu pull per league; skip what doesn't fit this month's budget rather than failing mid-run
+    per_call = quota.odds_call_cost("eu", "h2h")
+    left = quota.get_ledger().remaining(quota.ODDS)
+    affordable = list(dic_sport_key)[: left // per_call]
+    skipped = [lg for lg in dic_sport_key if lg not in affordable]
+    if skipped:
+        print(f"[quota] {left} The Odds API requests left this month ({per_call}/league): skipping {skipped}")
+    for league in affordable:
         print(f"Gathering quotes for {league}")
         res2 = ingest_odds_snapshot(sport_key=dic_sport_key[league])
         print("   inserted:", res2)
 
+    import duckdb
+    from src.ingest.explore_data_pipeline import DB_PATH
+    from src.features import prekickoff_odds, standings, player_form, team_strength, availability
+    with duckdb.connect(DB_PATH) as con:
+        res = standings.refresh(con)         # only seasons with newly finished / corrected fixtures
+        print(f"→ Standings per matchday: {res['seasons']} seasons refreshed ({res['rows']} rows)")
+        res = player_form.refresh(con)       # only the tails of players with new matches
+        print(f"→ Player form: {res['players']} players refreshed ({res['rows']} rows)")
+        res = team_strength.refresh(con, [(l, s) for l in leagues.values() for s in seasons])
+        print(f"→ Team strength: {res['team_match_stats']} team matches, {res['team_strength']} expected XIs")
+        res = availability.refresh(con)      # rebuilt whole: a few thousand spells
+        print(f"→ Availability: {res['injury_spells']} injury spells, {res['fixture_absences']} absences")
+        res = prekickoff_odds.refresh(con)   # only fixtures whose odds before a cutoff moved
+        print(f"→ Pre-kickoff odds: {res['pairs']} fixture cutoffs refreshed ({res['rows']} prices)")
+        if args.lake:
+            from src.warehouse import lake
+            print(f"→ Syncing Parquet lake in {args.lake}…")
+            for table, res in lake.sync(con, args.lake).items():
+                print(f"   {table}: {res['written']} partitions written, {res['unchanged']} unchanged, {res['deleted']} deleted")
+
     print("Done. You can query the DuckDB at DUCKDB_PATH.")
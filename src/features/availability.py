@@ -0,0 +1,161 @@
+# src/features/availability.py
+"""
+Who was out for every fixture, and how much of their team's football they play.
+
+fact_injuries has no dates (start_date / expected_return are never sent): each row says a player
+misses, or is a doubt for, one fixture of their team. Those are turned into intervals over the
+team's fixtures, and the intervals joined back onto every fixture in one pass.
+
+injury_spells: a player's run of consecutive team fixtures on the injury list, as an interval
+    [start_ts, end_ts) - the kickoff of the first fixture missed, and of the team's next fixture
+    they weren't listed for (NULL: none yet).
+fixture_absences: every (fixture, side, player) inside a spell - one interval join of the
+    fixtures onto the spells - with the report's status / reason, how many fixtures into the
+    spell it is, and the player's share of the team's minutes in its last LAST_N matches and in
+    the season so far, before kickoff (team_match_stats, so run team_strength.refresh first).
+
+team_absences() rolls those up per fixture and side for training: players out / doubtful, and
+the minutes shares they take with them. refresh(con) rebuilds both tables in one transaction;
+the whole history is a few thousand spells, well under a second.
+"""
+from __future__ import annotations
+from . import team_strength
+from ..warehouse.writer import atomic, transaction
+
+LAST_N = team_strength.LAST_N
+DOUBTFUL = ("Questionable",)    # any other status (or none, pulls from before it was read) is out
+
+
+def ensure_availability(con):
+    team_strength.ensure_team_strength(con)
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS injury_spells (
+        player_id INTEGER,
+        team_id INTEGER,
+        league_id INTEGER,       -- of the first fixture missed
+        season INTEGER,
+        start_ts TIMESTAMP,      -- kickoff of the first fixture missed
+        end_ts TIMESTAMP,        -- kickoff of the team's next fixture without them on the list
+        first_fixture_id INTEGER,
+        last_fixture_id INTEGER,
+        fixtures INTEGER,        -- team fixtures inside [start_ts, end_ts)
+        reason VARCHAR,          -- latest reported
+        PRIMARY KEY (player_id, team_id, start_ts)
+    );
+    CREATE TABLE IF NOT EXISTS fixture_absences (
+        fixture_id INTEGER,
+        team_id INTEGER,
+        player_id INTEGER,
+        league_id INTEGER,
+        season INTEGER,
+        date_utc TIMESTAMP,
+        status VARCHAR,          -- 'Missing Fixture', 'Questionable'
+        doubtful BOOLEAN,
+        reason VARCHAR,
+        reported_ts TIMESTAMP,   -- fact_injuries.updated_ts
+        spell_start_ts TIMESTAMP,
+        spell_fixture INTEGER,   -- 1 = first fixture of the spell
+        minutes_share_l5 DOUBLE, -- player's minutes / team's, in the team's last LAST_N matches before kickoff
+        minutes_share_season DOUBLE,
+        PRIMARY KEY (fixture_id, team_id, player_id)
+    );
+    """)
+
+
+def refresh(con) -> dict:
+    """Rebuild injury_spells and fixture_absences from fact_injuries; rows of each."""
+    ensure_availability(con)
+    return atomic(con, _refresh)
+
+
+def _refresh(con) -> dict:
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE _av_sides AS   -- every team's fixtures in order
+        SELECT *, row_number() OVER (PARTITION BY team_id ORDER BY date_utc, fixture_id) AS n
+        FROM (SELECT fixture_id, league_id, season, date_utc, home_team_id AS team_id FROM fact_fixtures
+              UNION ALL
+              SELECT fixture_id, league_id, season, date_utc, away_team_id FROM fact_fixtures)
+        WHERE date_utc IS NOT NULL AND team_id IS NOT NULL;
+
+        CREATE OR REPLACE TEMP TABLE _av_reports AS   -- reports on a side of a known fixture
+        SELECT r.fixture_id, r.team_id, r.player_id, arg_max(r.status, r.updated_ts) AS status,
+               arg_max(r.reason, r.updated_ts) AS reason, max(r.updated_ts) AS reported_ts, any_value(s.n) AS n
+        FROM fact_injuries r JOIN _av_sides s USING (fixture_id, team_id)
+        WHERE r.player_id IS NOT NULL
+        GROUP BY r.fixture_id, r.team_id, r.player_id;
+    """)
+    try:
+        with transaction(con):
+            con.execute("DELETE FROM injury_spells; DELETE FROM fixture_absences")
+            spells = con.execute("""
+                INSERT INTO injury_spells
+                WITH islands AS (   -- consecutive team fixtures share n - (the player's reports so far)
+                    SELECT *, n - row_number() OVER (PARTITION BY player_id, team_id ORDER BY n) AS island
+                    FROM _av_reports
+                ), spells AS (
+                    SELECT player_id, team_id, min(n) AS first_n, max(n) AS last_n, count(*) AS fixtures,
+                           arg_min(fixture_id, n) AS first_fixture_id, arg_max(fixture_id, n) AS last_fixture_id,
+                           arg_max(reason, n) AS reason
+                    FROM islands GROUP BY player_id, team_id, island
+                )
+                SELECT sp.player_id, sp.team_id, f.league_id, f.season, f.date_utc, nxt.date_utc,
+                       sp.first_fixture_id, sp.last_fixture_id, sp.fixtures, sp.reason
+                FROM spells sp
+                JOIN _av_sides f ON f.team_id = sp.team_id AND f.n = sp.first_n
+                LEFT JOIN _av_sides nxt ON nxt.team_id = sp.team_id AND nxt.n = sp.last_n + 1
+            """).fetchone()[0]
+            absences = con.execute(f"""
+                INSERT INTO fixture_absences
+                WITH a AS (     -- the interval join: every side's fixtures inside one of its players' spells
+                    SELECT s.fixture_id, s.team_id, sp.player_id, s.league_id, s.season, s.date_utc,
+                           sp.start_ts AS spell_start_ts,
+                           row_number() OVER (PARTITION BY sp.player_id, sp.team_id, sp.start_ts
+                                              ORDER BY s.date_utc, s.fixture_id) AS spell_fixture
+                    FROM _av_sides s JOIN injury_spells sp
+                      ON s.team_id = sp.team_id AND s.date_utc >= sp.start_ts
+                     AND s.date_utc < coalesce(sp.end_ts, 'infinity'::TIMESTAMP)
+                ), played AS (  -- team matches with stats, and where the last {LAST_N} up to each one start
+                    SELECT fixture_id, team_id, season, date_utc, minutes,
+                           min(date_utc) OVER (PARTITION BY team_id ORDER BY date_utc, fixture_id
+                                               ROWS {LAST_N - 1} PRECEDING) AS l5_from
+                    FROM team_match_stats
+                ), windows AS (
+                    SELECT a.*, p.l5_from FROM a
+                    ASOF LEFT JOIN played p ON a.team_id = p.team_id AND a.date_utc > p.date_utc
+                )
+                SELECT a.fixture_id, a.team_id, a.player_id, any_value(a.league_id), any_value(a.season),
+                       any_value(a.date_utc), any_value(r.status), coalesce(list_contains(?, any_value(r.status)), false),
+                       any_value(r.reason), any_value(r.reported_ts), any_value(a.spell_start_ts), any_value(a.spell_fixture),
+                       sum(coalesce(m.minutes, 0)) FILTER (w.date_utc >= a.l5_from)
+                           / nullif(sum(w.minutes) FILTER (w.date_utc >= a.l5_from), 0),
+                       sum(coalesce(m.minutes, 0)) FILTER (w.season = a.season)
+                           / nullif(sum(w.minutes) FILTER (w.season = a.season), 0)
+                FROM windows a
+                JOIN _av_reports r USING (fixture_id, team_id, player_id)
+                LEFT JOIN played w ON w.team_id = a.team_id AND w.date_utc < a.date_utc
+                                  AND (w.date_utc >= a.l5_from OR w.season = a.season)
+                LEFT JOIN fact_player_stats_match m
+                       ON m.fixture_id = w.fixture_id AND m.team_id = w.team_id AND m.player_id = a.player_id
+                GROUP BY a.fixture_id, a.team_id, a.player_id
+            """, [list(DOUBTFUL)]).fetchone()[0]
+    finally:
+        con.execute("DROP TABLE IF EXISTS _av_sides; DROP TABLE IF EXISTS _av_reports")
+    return {"injury_spells": int(spells), "fixture_absences": int(absences)}
+
+
+def team_absences(con, fixture_ids=None):
+    """Per fixture and side with anyone listed: players out / doubtful and their minutes shares."""
+    only = "" if fixture_ids is None else \
+        f"WHERE fixture_id IN ({', '.join(str(int(f)) for f in fixture_ids) or 'NULL'})"
+    return con.execute(f"""
+        SELECT fixture_id, team_id, any_value(league_id) AS league_id, any_value(season) AS season,
+               any_value(date_utc) AS date_utc,
+               count(*) FILTER (NOT doubtful) AS n_out, count(*) FILTER (doubtful) AS n_doubtful,
+               coalesce(sum(minutes_share_l5) FILTER (NOT doubtful), 0) AS out_share_l5,
+               coalesce(sum(minutes_share_season) FILTER (NOT doubtful), 0) AS out_share_season,
+               coalesce(sum(minutes_share_l5) FILTER (doubtful), 0) AS doubtful_share_l5,
+               coalesce(sum(minutes_share_season) FILTER (doubtful), 0) AS doubtful_share_season
+        FROM fixture_absences {only}
+        GROUP BY fixture_id, team_id
+        ORDER BY date_utc, fixture_id, team_id
+    """).fetchdf()
@@ -0,0 +1,222 @@
+# src/features/dataset.py
+"""
+Fixture-level training matrix, point-in-time correct, streamed to a memory-mapped file.
+
+One row per fixture: keys, then home_* / away_* features, then the odds, then the labels (y_*).
+Everything but the labels is as of cutoff_ts = kickoff - offset, in SQL, by construction:
+
+    team form       team_match_stats, last match with kickoff + FINAL_WHISTLE <= cutoff (ASOF)
+    expected XI     team_strength: 'previous' (last match's XI, if that match was over by the
+                    cutoff), or the published lineup when offset <= LINEUPS_OUT
+    table           fact_standings_snapshot, the latest table (snapshot_ts: its round's last game
+                    played in turn) over by the cutoff; a postponed game doesn't hold it back
+    absences        fixture_absences, the reports for this fixture whose latest status was pulled
+                    (updated_ts) by the cutoff; minutes shares from matches before kickoff. Only
+                    the latest status is kept, so a report changed after the cutoff drops out,
+                    and a season backfilled after the fact has none
+    odds            odds_prekickoff: last price of every bookmaker set before the cutoff, averaged
+
+It reads the feature tables, so refresh them first (run_ingest.py does). The query is streamed
+straight into the file in chunk_rows chunks, never whole in memory:
+
+    build(con, "train.arrow")     # Arrow IPC file, uncompressed: load() maps it, zero-copy
+    build(con, "train.npy", offset=pd.Timedelta(hours=24))   # float64 matrix (+ .columns.json)
+    table = load("train.arrow"); X, columns = load("train.npy")
+
+.npy needs only NumPy (timestamps as epoch seconds); .arrow needs pyarrow (`pip install .[arrow]`).
+
+    python -m src.features.dataset --db warehouse.duckdb --out train.arrow --offset-hours 1
+"""
+from __future__ import annotations
+import json, os
+import duckdb, numpy as np, pandas as pd
+from . import prekickoff_odds, team_strength
+from ..ingest.watermarks import FINISHED
+from ..warehouse.io import DB_PATH
+
+try:
+    import pyarrow as pa
+except ImportError:     # .npy output only
+    pa = None
+
+OFFSET = prekickoff_odds.OFFSETS[1]             # T-1h
+LINEUPS_OUT = pd.Timedelta(minutes=20)          # API-Football publishes lineups 20-40 min before kickoff
+FINAL_WHISTLE = pd.Timedelta(hours=2)           # a match counts as known from kickoff + this
+CHUNK_ROWS = 100_000
+H2H = ("match winner", "h2h")                   # API-Football / The Odds API name of the 1X2 market
+
+LAST_N = team_strength.LAST_N
+_FORM = [f"{c}_l{LAST_N}" for c in team_strength.ROLLED]
+_XI = [f"xi_{c}" for c in team_strength.XI_FORM] + ["xi_players", "xi_with_form"]
+_TABLE = ["rank", "points", "played", "gd", "form_points"]
+_ABSENT = ["n_out", "n_doubtful", "out_share_l5", "out_share_season", "doubtful_share_l5"]
+SIDE_FEATURES = ["rest_days"] + _FORM + _XI + _TABLE + _ABSENT
+
+
+def query(offset=OFFSET, leagues=None, seasons=None, finished: bool = True) -> tuple[str, list]:
+    """(SQL, params) of the matrix, ordered by kickoff."""
+    minutes = int(pd.Timedelta(offset).total_seconds() // 60)
+    if minutes not in prekickoff_odds._minutes(prekickoff_odds.OFFSETS):
+        raise ValueError(f"no materialised odds {offset} before kickoff; use one of prekickoff_odds.OFFSETS")
+    where, params = ["date_utc IS NOT NULL"], []
+    for col, vals in (("league_id", leagues), ("season", seasons)):
+        if vals is not None:
+            where.append(f"{col} IN ({', '.join(str(int(v)) for v in vals) or 'NULL'})")
+    if finished:
+        where.append("list_contains(?, status_short) AND home_goals IS NOT NULL")
+        params.append(list(FINISHED))
+    whistle = int(FINAL_WHISTLE.total_seconds() // 60)
+    xi_sources = ["previous", "lineup"] if pd.Timedelta(offset) <= LINEUPS_OUT else ["previous"]
+    sides = ",\n".join(f"{s}.{c} AS {s}_{c}" for s in ("home", "away") for c in SIDE_FEATURES)
+    sql = f"""
+    WITH fx AS (
+        SELECT fixture_id, league_id, season, date_utc, date_utc - to_minutes({minutes}) AS cutoff_ts,
+               home_team_id, away_team_id, home_goals, away_goals
+        FROM fact_fixtures WHERE {" AND ".join(where)}
+    ),
+    sides AS (
+        SELECT fixture_id, league_id, season, date_utc, cutoff_ts, home_team_id AS team_id, 'home' AS side FROM fx
+        UNION ALL
+        SELECT fixture_id, league_id, season, date_utc, cutoff_ts, away_team_id, 'away' FROM fx
+    ),
+    form AS (   -- last match over by the cutoff
+        SELECT s.*, t.date_utc AS form_ts, {", ".join(f"t.{c}" for c in _FORM)}
+        FROM sides s ASOF LEFT JOIN (SELECT *, date_utc + to_minutes({whistle}) AS known_ts FROM team_match_stats) t
+          ON s.team_id = t.team_id AND s.cutoff_ts >= t.known_ts
+    ),
+    prev AS (   -- last match before kickoff, over by the cutoff or not
+        SELECT s.fixture_id, s.side, t.date_utc AS prev_ts
+        FROM sides s ASOF LEFT JOIN team_match_stats t ON s.team_id = t.team_id AND s.date_utc > t.date_utc
+    ),
+    xi AS (
+        SELECT s.fixture_id, s.team_id, {", ".join(f"x.{c}" for c in _XI)}
+        FROM sides s JOIN team_strength x USING (fixture_id, team_id)
+        WHERE list_contains(?, x.xi_source)
+        QUALIFY row_number() OVER (PARTITION BY s.fixture_id, s.team_id ORDER BY x.xi_source = 'lineup' DESC) = 1
+    ),
+    tbl AS (
+        SELECT s.fixture_id, s.side, t.rank, t.points, t.played, t.gd,
+               3 * (length(t.form) - length(replace(t.form, 'W', ''))) + length(t.form) - length(replace(t.form, 'D', ''))
+                   AS form_points
+        FROM sides s
+        ASOF LEFT JOIN (SELECT *, snapshot_ts + to_minutes({whistle}) AS known_ts FROM fact_standings_snapshot) t
+          ON s.league_id = t.league_id AND s.season = t.season AND s.team_id = t.team_id AND s.cutoff_ts >= t.known_ts
+    ),
+    absent AS (
+        SELECT fixture_id, team_id, count(*) FILTER (NOT doubtful) AS n_out, count(*) FILTER (doubtful) AS n_doubtful,
+               sum(minutes_share_l5) FILTER (NOT doubtful) AS out_share_l5,
+               sum(minutes_share_season) FILTER (NOT doubtful) AS out_share_season,
+               sum(minutes_share_l5) FILTER (doubtful) AS doubtful_share_l5
+        FROM fixture_absences a JOIN fx USING (fixture_id)
+        WHERE a.reported_ts <= fx.cutoff_ts
+        GROUP BY fixture_id, team_id
+    ),
+    feats AS (  -- one row per fixture and side
+        SELECT f.fixture_id, f.side,
+               datediff('hour', f.form_ts, f.date_utc) / 24.0 AS rest_days,
+               {", ".join(f"f.{c}" for c in _FORM)},
+               {", ".join(f"CASE WHEN p.prev_ts + to_minutes({whistle}) <= f.cutoff_ts THEN x.{c} END AS {c}"
+                          for c in _XI)},
+               {", ".join(f"t.{c}" for c in _TABLE)},
+               {", ".join(f"coalesce(a.{c}, 0) AS {c}" for c in _ABSENT)}
+        FROM form f
+        JOIN prev p USING (fixture_id, side)
+        JOIN tbl t USING (fixture_id, side)
+        LEFT JOIN xi x USING (fixture_id, team_id)
+        LEFT JOIN absent a USING (fixture_id, team_id)
+    ),
+    odds AS (
+        SELECT fixture_id, count(DISTINCT (source, bookmaker)) AS n_books,
+               avg(price) FILTER (selection = 'home') AS odds_home, avg(price) FILTER (selection = 'draw') AS odds_draw,
+               avg(price) FILTER (selection = 'away') AS odds_away
+        FROM odds_prekickoff
+        WHERE offset_min = {minutes} AND list_contains(?, market) AND fixture_id IN (SELECT fixture_id FROM fx)
+        GROUP BY fixture_id
+    )
+    SELECT fx.fixture_id, fx.league_id, fx.season, fx.date_utc, fx.cutoff_ts, fx.home_team_id, fx.away_team_id,
+           {sides},
+           coalesce(o.n_books, 0) AS n_books, o.odds_home, o.odds_draw, o.odds_away,
+           (1 / o.odds_home) / (1 / o.odds_home + 1 / o.odds_draw + 1 / o.odds_away) AS p_home,
+           (1 / o.odds_draw) / (1 / o.odds_home + 1 / o.odds_draw + 1 / o.odds_away) AS p_draw,
+           (1 / o.odds_away) / (1 / o.odds_home + 1 / o.odds_draw + 1 / o.odds_away) AS p_away,
+           fx.home_goals AS y_home_goals, fx.away_goals AS y_away_goals,
+           sign(fx.home_goals - fx.away_goals) AS y_result
+    FROM fx
+    JOIN feats home ON home.fixture_id = fx.fixture_id AND home.side = 'home'
+    JOIN feats away ON away.fixture_id = fx.fixture_id AND away.side = 'away'
+    LEFT JOIN odds o ON o.fixture_id = fx.fixture_id
+    ORDER BY fx.date_utc, fx.fixture_id
+    """
+    return sql, params + [xi_sources, list(H2H)]    # fx's filters come first in the text
+
+
+def build(con, path: str, offset=OFFSET, leagues=None, seasons=None, finished: bool = True,
+          chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Write the matrix to `path` (.arrow / .npy), chunk by chunk; rows and columns written."""
+    sql, params = query(offset, leagues, seasons, finished)
+    tmp = f"{path}.tmp"
+    if path.endswith((".arrow", ".feather", ".ipc")):
+        if pa is None:
+            raise ImportError("Arrow IPC output needs pyarrow (pip install .[arrow]); or write a .npy")
+        reader = con.execute(sql, params).to_arrow_reader(chunk_rows)
+        rows = 0
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        columns = reader.schema.names
+    elif path.endswith(".npy"):
+        rows, columns = _build_npy(con, sql, params, tmp, chunk_rows)
+        with open(f"{path}.columns.json", "w") as fh:
+            json.dump({"columns": columns, "rows": rows, "offset": str(pd.Timedelta(offset))}, fh, indent=1)
+    else:
+        raise ValueError(f"{path}: write a .arrow (Arrow IPC) or a .npy file")
+    os.replace(tmp, path)
+    return {"rows": rows, "columns": len(columns)}
+
+
+def _build_npy(con, sql: str, params: list, tmp: str, chunk_rows: int) -> tuple[int, list]:
+    types = con.execute(f"DESCRIBE ({sql})", params).fetchall()
+    columns = [t[0] for t in types]
+    # every column as DOUBLE: timestamps in epoch seconds
+    cast = ", ".join(f"epoch({c})" if t[1].startswith("TIMESTAMP") else f"CAST({c} AS DOUBLE)"
+                     for c, t in zip(columns, types))
+    rows = con.execute(f"SELECT count(*) FROM ({sql})", params).fetchone()[0]
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64, shape=(rows, len(columns)))
+    res = con.execute(f"SELECT {cast} FROM ({sql})", params)
+    i = 0
+    while i < rows:
+        chunk = res.fetch_df_chunk(max(1, chunk_rows // duckdb.__standard_vector_size__))
+        if chunk.empty:
+            break
+        out[i:i + len(chunk)] = chunk.to_numpy(dtype=np.float64, na_value=np.nan)
+        i += len(chunk)
+    out.flush()
+    del out
+    return rows, columns
+
+
+def load(path: str):
+    """The matrix at `path`, memory-mapped: a pyarrow Table (.arrow), or (array, columns) (.npy)."""
+    if path.endswith(".npy"):
+        with open(f"{path}.columns.json") as fh:
+            columns = json.load(fh)["columns"]
+        return np.load(path, mmap_mode="r"), columns
+    if pa is None:
+        raise ImportError("reading Arrow IPC needs pyarrow (pip install .[arrow])")
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the point-in-time training matrix")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--out", required=True, help="train.arrow (Arrow IPC) or train.npy")
+    parser.add_argument("--offset-hours", type=float, default=OFFSET.total_seconds() / 3600,
+                        help="features as of kickoff minus this (one of the materialised odds cutoffs)")
+    parser.add_argument("--leagues", type=int, nargs="+")
+    parser.add_argument("--seasons", type=int, nargs="+")
+    args = parser.parse_args()
+    con = duckdb.connect(args.db, read_only=True)
+    res = build(con, args.out, pd.Timedelta(hours=args.offset_hours), args.leagues, args.seasons)
+    print(f"[dataset] {args.out}: {res['rows']} fixtures x {res['columns']} columns")
@@ -0,0 +1,131 @@
+# src/features/player_form.py
+"""
+Rolling player form from fact_player_stats_match, materialised in player_form.
+
+One row per (player, fixture), ordered by the fixture's kickoff, with the player's form *after*
+that match: means over the last LAST_N matches, exponentially decayed means (half-life HALFLIFE
+matches, as pandas .ewm(halflife=HALFLIFE).mean()), and season-to-date totals / rates. Every
+squad appearance counts as a match (unused subs with 0 minutes); rating is parsed from VARCHAR
+and averaged over the matches that have one. Counting stats are NULL in the source when zero
+and are read as 0.
+
+For features entering a fixture, take each player's last row with date_utc < kickoff
+(form_before(), or an ASOF join on player_form).
+
+Incremental: every row keeps the hash of the source row it was computed from (stats + team +
+kickoff). A refresh diffs those against fact_player_stats_match and, for the players with new,
+changed or removed matches, recomputes only their rows from the earliest changed kickoff on:
+a new matchday rewrites one row per player that played.
+"""
+from __future__ import annotations
+import pandas as pd
+from ..warehouse.writer import atomic, transaction
+
+LAST_N = 5
+HALFLIFE = 5        # matches; the decayed weights are d^-i with i < ~5000 matches, well inside a DOUBLE
+STATS = ("minutes", "rating", "shots_on", "shots_total", "passes_key", "goals", "assists")
+PER90 = ("shots_on", "shots_total", "passes_key", "goals", "assists")
+
+# typed source values: NULL rating stays NULL (no rating), NULL counts are zeros
+_VALUES = ",\n".join(
+    "TRY_CAST(s.rating AS DOUBLE) AS rating" if c == "rating" else f"coalesce(s.{c}, 0) AS {c}" for c in STATS)
+_HASH = f"hash(s.team_id, f.date_utc, {', '.join('s.' + c for c in STATS)})"
+
+
+def ensure_player_form(con):
+    cols = ",\n        ".join(
+        [f"{c}_l{LAST_N} DOUBLE" for c in STATS] + [f"{c}_ewm DOUBLE" for c in STATS]
+        + ["season_matches INTEGER", "season_minutes INTEGER", "season_rating DOUBLE"]
+        + [f"season_{c}_p90 DOUBLE" for c in PER90])
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS player_form (
+        player_id INTEGER,
+        fixture_id INTEGER,
+        team_id INTEGER,
+        league_id INTEGER,
+        season INTEGER,
+        date_utc TIMESTAMP,      -- kickoff of the fixture: the form below holds from the final whistle
+        matches INTEGER,         -- career matches so far, this one included
+        {cols},
+        src_hash UBIGINT,        -- source row it was computed from
+        PRIMARY KEY (player_id, fixture_id)
+    );
+    """)
+
+
+def refresh(con) -> dict:
+    """Recompute the players whose matches changed, from their first changed kickoff; counts."""
+    ensure_player_form(con)
+    return atomic(con, _refresh)
+
+
+def _refresh(con) -> dict:
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _pf_src AS
+        SELECT s.player_id, s.fixture_id, any_value(s.team_id) AS team_id, any_value(s.league_id) AS league_id,
+               any_value(s.season) AS season, any_value(f.date_utc) AS date_utc,
+               any_value({_HASH}) AS src_hash
+        FROM fact_player_stats_match s JOIN fact_fixtures f USING (fixture_id)
+        WHERE s.player_id > 0 AND f.date_utc IS NOT NULL
+        GROUP BY s.player_id, s.fixture_id;
+
+        CREATE OR REPLACE TEMP TABLE _pf_dirty AS
+        SELECT player_id, min(least(n.date_utc, o.date_utc)) AS from_ts   -- a match moved later: from its old kickoff
+        FROM _pf_src n FULL OUTER JOIN (SELECT player_id, fixture_id, date_utc, src_hash FROM player_form) o
+             USING (player_id, fixture_id)
+        WHERE n.src_hash IS DISTINCT FROM o.src_hash
+        GROUP BY player_id;
+    """)
+    l = LAST_N - 1
+    rolling = ",\n".join(
+        [f"avg({c}) OVER last_n AS {c}_l{LAST_N}" for c in STATS]
+        + [f"sum({c} * w) OVER career / sum(CASE WHEN {c} IS NOT NULL THEN w END) OVER career AS {c}_ewm" for c in STATS]
+        + ["count(*) OVER season AS season_matches", "sum(minutes) OVER season AS season_minutes",
+           "avg(rating) OVER season AS season_rating"]
+        + [f"sum({c}) OVER season * 90.0 / nullif(sum(minutes) OVER season, 0) AS season_{c}_p90" for c in PER90])
+    try:
+        with transaction(con):
+            con.execute("""
+                DELETE FROM player_form p USING _pf_dirty d
+                WHERE p.player_id = d.player_id AND p.date_utc >= d.from_ts
+            """)
+            rows = con.execute(f"""
+                INSERT INTO player_form
+                SELECT * EXCLUDE (from_ts) FROM (
+                    SELECT player_id, fixture_id, team_id, league_id, season, date_utc,
+                           row_number() OVER career AS matches,
+                           {rolling},
+                           src_hash, from_ts
+                    FROM (
+                        SELECT x.*, d.from_ts,
+                               pow(0.5, -(row_number() OVER (PARTITION BY x.player_id ORDER BY x.date_utc, x.fixture_id) - 1)
+                                        / {HALFLIFE}) AS w,
+                               {_VALUES}
+                        FROM _pf_src x JOIN _pf_dirty d USING (player_id)
+                        JOIN fact_player_stats_match s
+                          ON s.player_id = x.player_id AND s.fixture_id = x.fixture_id AND s.team_id = x.team_id
+                    )
+                    WINDOW career AS (PARTITION BY player_id ORDER BY date_utc, fixture_id
+                                      ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW),
+                           last_n AS (PARTITION BY player_id ORDER BY date_utc, fixture_id
+                                      ROWS BETWEEN {l} PRECEDING AND CURRENT ROW),
+                           season AS (PARTITION BY player_id, season ORDER BY date_utc, fixture_id
+                                      ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+                ) WHERE date_utc >= from_ts
+            """).fetchone()[0]
+            players = con.execute("SELECT count(*) FROM _pf_dirty").fetchone()[0]
+    finally:
+        con.execute("DROP TABLE IF EXISTS _pf_src; DROP TABLE IF EXISTS _pf_dirty")
+    return {"players": int(players), "rows": int(rows)}
+
+
+def form_before(con, ts, player_ids=None) -> pd.DataFrame:
+    """Each player's form entering `ts` (UTC, naive): their last row with a kickoff before it."""
+    only = "" if player_ids is None else \
+        f"AND player_id IN ({', '.join(str(int(p)) for p in player_ids) or 'NULL'})"
+    return con.execute(f"""
+        SELECT * EXCLUDE (src_hash) FROM player_form
+        WHERE date_utc < ? {only}
+        QUALIFY row_number() OVER (PARTITION BY player_id ORDER BY date_utc DESC, fixture_id DESC) = 1
+        ORDER BY player_id
+    """, [pd.Timestamp(ts).to_pydatetime()]).fetchdf()
@@ -0,0 +1,122 @@
+# src/features/prekickoff_odds.py
+"""
+Odds as they stood before kickoff: per fixture, cutoff, and (source, bookmaker, market,
+selection), the last price set strictly before kickoff - offset.
+
+odds_prekickoff is materialised from odds_history with one ASOF join (fixtures x keys, each key
+matched to its last change before the cutoff) and kept up to date incrementally: for every
+(fixture, cutoff) odds_prekickoff_state holds the cutoff time and how many history rows fell
+before it. odds_history only appends, so a (fixture, cutoff) is recomputed only when that count
+or the kickoff moved; refreshing after an odds pull touches the fixtures whose pre-cutoff odds
+changed, not the seasons behind them.
+
+    refresh(con)                               # default cutoffs: T-24h, T-1h, kickoff
+    refresh(con, offsets=[pd.Timedelta(hours=6)])
+    prekickoff_odds(con, pd.Timedelta(hours=24), market="h2h")
+"""
+from __future__ import annotations
+import pandas as pd
+from ..ingest.quota import DEFAULT_OFFSETS
+from ..warehouse import odds_history
+from ..warehouse.writer import atomic, transaction
+
+OFFSETS = DEFAULT_OFFSETS + (pd.Timedelta(0),)     # T-24h, T-1h, closing
+_KEYS = "source, event_id, bookmaker, market, selection"
+
+
+def ensure_prekickoff(con):
+    odds_history.ensure_history(con)
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS odds_prekickoff (
+        fixture_id BIGINT,
+        offset_min INTEGER,      -- cutoff = kickoff - offset_min minutes
+        cutoff_ts TIMESTAMP,     -- UTC
+        source VARCHAR,
+        event_id VARCHAR,
+        bookmaker VARCHAR,
+        market VARCHAR,
+        selection VARCHAR,
+        ts TIMESTAMP,            -- when that price was set (< cutoff_ts)
+        price DOUBLE,
+        PRIMARY KEY (fixture_id, offset_min, {_KEYS})
+    );
+    CREATE TABLE IF NOT EXISTS odds_prekickoff_state (
+        fixture_id BIGINT,
+        offset_min INTEGER,
+        cutoff_ts TIMESTAMP,
+        n_prices BIGINT,         -- odds_history rows of the fixture before cutoff_ts
+        PRIMARY KEY (fixture_id, offset_min)
+    );
+    """)
+
+
+def _minutes(offsets) -> list[int]:
+    return sorted({int(pd.Timedelta(o).total_seconds() // 60) for o in offsets})
+
+
+def refresh(con, offsets=OFFSETS, fixture_ids=None) -> dict:
+    """Recompute the (fixture, cutoff) pairs whose pre-cutoff odds changed; counts of both."""
+    ensure_prekickoff(con)
+    return atomic(con, _refresh, _minutes(offsets), fixture_ids)
+
+
+def _refresh(con, minutes: list[int], fixture_ids) -> dict:
+    only = "" if fixture_ids is None else \
+        f"AND f.fixture_id IN ({', '.join(str(int(f)) for f in fixture_ids) or 'NULL'})"
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _prekickoff_dirty AS
+        WITH cur AS (
+            SELECT f.fixture_id, o.offset_min, f.date_utc - to_minutes(o.offset_min) AS cutoff_ts,
+                   count(h.ts) FILTER (h.ts < f.date_utc - to_minutes(o.offset_min)) AS n_prices
+            FROM fact_fixtures f
+            CROSS JOIN (SELECT unnest(?::INTEGER[]) AS offset_min) o
+            LEFT JOIN odds_history h ON h.fixture_id = f.fixture_id
+            WHERE f.date_utc IS NOT NULL {only}
+            GROUP BY ALL
+        )
+        SELECT c.* FROM cur c LEFT JOIN odds_prekickoff_state s USING (fixture_id, offset_min)
+        WHERE CASE WHEN s.fixture_id IS NULL THEN c.n_prices > 0
+                   ELSE s.n_prices <> c.n_prices OR s.cutoff_ts IS DISTINCT FROM c.cutoff_ts END
+    """, [minutes])
+    try:
+        with transaction(con):
+            con.execute("""
+                DELETE FROM odds_prekickoff p USING _prekickoff_dirty d
+                WHERE p.fixture_id = d.fixture_id AND p.offset_min = d.offset_min
+            """)
+            rows = con.execute(f"""
+                INSERT INTO odds_prekickoff
+                SELECT d.fixture_id, d.offset_min, d.cutoff_ts, d.source, d.event_id, d.bookmaker,
+                       d.market, d.selection, h.ts, h.price
+                FROM (
+                    SELECT * FROM _prekickoff_dirty JOIN (
+                        SELECT DISTINCT fixture_id, {_KEYS} FROM odds_history
+                        WHERE fixture_id IN (SELECT fixture_id FROM _prekickoff_dirty)
+                    ) USING (fixture_id)
+                ) d
+                ASOF JOIN odds_history h
+                  ON d.fixture_id = h.fixture_id AND d.source = h.source AND d.event_id = h.event_id
+                 AND d.bookmaker = h.bookmaker AND d.market = h.market AND d.selection = h.selection
+                 AND d.cutoff_ts > h.ts
+            """).fetchone()[0]
+            pairs = con.execute("""
+                INSERT OR REPLACE INTO odds_prekickoff_state
+                SELECT fixture_id, offset_min, cutoff_ts, n_prices FROM _prekickoff_dirty
+            """).fetchone()[0]
+    finally:
+        con.execute("DROP TABLE IF EXISTS _prekickoff_dirty")
+    return {"pairs": int(pairs), "rows": int(rows)}
+
+
+def prekickoff_odds(con, offset=DEFAULT_OFFSETS[0], market=None, fixture_ids=None) -> pd.DataFrame:
+    """Materialised prices at kickoff - offset (one row per fixture x key)."""
+    where, params = ["offset_min = ?"], _minutes([offset])
+    if market is not None:
+        where.append("market = ?")
+        params.append(market)
+    if fixture_ids is not None:
+        where.append(f"fixture_id IN ({', '.join(str(int(f)) for f in fixture_ids) or 'NULL'})")
+    return con.execute(f"""
+        SELECT * FROM odds_prekickoff WHERE {" AND ".join(where)}
+        ORDER BY fixture_id, {_KEYS}
+    """, params).fetchdf()
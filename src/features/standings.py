@@ -0,0 +1,210 @@
+# src/features/standings.py
+"""
+League tables after every matchday, rebuilt from fact_fixtures into fact_standings_snapshot.
+
+The standings endpoint only gives the table as it stands when it's called (one row per team and
+season); results give all of them. Matchday m's snapshot_ts is the last kickoff of round m's games
+played in turn (within ROUND_DAYS of the round's median date), and its table counts every
+finished fixture that kicked off by then, whatever its round: a postponed round-2 game played in
+April shows up in the tables from April on, and never moves an earlier matchday's snapshot_ts.
+
+Everything is one SQL pass per refresh: per-team rows of the results, running totals in kickoff
+order (window) as-of-joined onto each snapshot_ts, form as the last 5 results (newest last),
+head-to-head points / goal difference among teams level on points, then rank() with the
+league's tiebreakers:
+points, goal difference, goals for, head-to-head - or, where H2H_FIRST, points, head-to-head
+points, head-to-head goal difference, goal difference, goals for.
+
+Incremental: standings_state fingerprints the finished fixtures of every (league, season,
+matchday). A refresh recomputes the seasons where one changed, and rewrites their matchdays from
+the first kickoff that changed: a new round writes one matchday per league, a corrected score from
+round 12 rewrites the tables from its kickoff onwards.
+"""
+from __future__ import annotations
+from ..ingest.watermarks import FINISHED
+from ..warehouse.writer import atomic, transaction
+
+H2H_FIRST = (135, 140)      # Serie A, La Liga: head-to-head before goal difference
+FORM_GAMES = 5
+ROUND_DAYS = 4              # a round's games later than this after its median date were played out of turn
+_MATCHDAY = r"TRY_CAST(regexp_extract(round, '(\d+)\s*$', 1) AS INTEGER)"     # 'Regular Season - 12'
+
+
+def ensure_standings(con):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS fact_standings_snapshot (
+        league_id INTEGER,
+        season INTEGER,
+        matchday INTEGER,
+        team_id INTEGER,
+        rank INTEGER,
+        points INTEGER,
+        played INTEGER,
+        wins INTEGER,
+        draws INTEGER,
+        losses INTEGER,
+        gf INTEGER,
+        ga INTEGER,
+        gd INTEGER,
+        form VARCHAR,
+        snapshot_ts TIMESTAMP,
+        PRIMARY KEY (league_id, season, matchday, team_id)
+    );
+    CREATE TABLE IF NOT EXISTS standings_state (
+        league_id INTEGER,
+        season INTEGER,
+        matchday INTEGER,
+        n_fixtures BIGINT,
+        fingerprint UBIGINT,     -- bit_xor of the finished fixtures' (id, teams, score, kickoff) hashes
+        first_ts TIMESTAMP,      -- earliest kickoff among them
+        PRIMARY KEY (league_id, season, matchday)
+    );
+    """)
+    if not con.execute("""SELECT count(*) FROM duckdb_columns()
+                          WHERE table_name = 'standings_state' AND column_name = 'first_ts'""").fetchone()[0]:
+        # state from before snapshots went by date: rebuild every season once
+        con.execute("DELETE FROM standings_state; ALTER TABLE standings_state ADD COLUMN first_ts TIMESTAMP")
+
+
+def refresh(con, league_id: int | None = None, season: int | None = None) -> dict:
+    """Bring fact_standings_snapshot up to date; seasons recomputed and rows written."""
+    ensure_standings(con)
+    return atomic(con, _refresh, league_id, season)
+
+
+def _refresh(con, league_id, season) -> dict:
+    where = " ".join(f"AND {c} = {int(v)}" for c, v in (("league_id", league_id), ("season", season)) if v is not None)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _st_games AS
+        SELECT league_id, season, {_MATCHDAY} AS matchday, fixture_id, date_utc,
+               home_team_id, away_team_id, home_goals, away_goals, list_contains(?, status_short) AS finished
+        FROM fact_fixtures WHERE {_MATCHDAY} IS NOT NULL {where}
+    """, [list(FINISHED)])
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE _st_dirty AS
+        WITH cur AS (
+            SELECT league_id, season, matchday, count(*) AS n_fixtures,
+                   bit_xor(hash(fixture_id, home_team_id, away_team_id, home_goals, away_goals, date_utc)) AS fingerprint,
+                   min(date_utc) AS first_ts
+            FROM _st_games WHERE finished AND home_goals IS NOT NULL AND away_goals IS NOT NULL
+            GROUP BY ALL
+        ), old AS (
+            SELECT * FROM standings_state WHERE true {where}
+        )
+        SELECT league_id, season,
+               coalesce(least(min(cur.first_ts), min(old.first_ts)), '-infinity'::TIMESTAMP) AS from_ts
+        FROM cur FULL OUTER JOIN old USING (league_id, season, matchday)
+        WHERE cur.n_fixtures IS DISTINCT FROM old.n_fixtures OR cur.fingerprint IS DISTINCT FROM old.fingerprint
+        GROUP BY ALL
+    """)
+    try:
+        with transaction(con):
+            con.execute("""
+                DELETE FROM fact_standings_snapshot s USING _st_dirty d
+                WHERE s.league_id = d.league_id AND s.season = d.season AND s.snapshot_ts >= d.from_ts
+            """)
+            rows = con.execute(_SNAPSHOT_SQL.format(form=FORM_GAMES - 1, round_days=ROUND_DAYS),
+                               [list(H2H_FIRST)]).fetchone()[0]
+            con.execute("""
+                DELETE FROM standings_state s USING _st_dirty d WHERE s.league_id = d.league_id AND s.season = d.season;
+                INSERT INTO standings_state
+                SELECT league_id, season, matchday, count(*),
+                       bit_xor(hash(fixture_id, home_team_id, away_team_id, home_goals, away_goals, date_utc)), min(date_utc)
+                FROM _st_games SEMI JOIN _st_dirty USING (league_id, season)
+                WHERE finished AND home_goals IS NOT NULL AND away_goals IS NOT NULL
+                GROUP BY ALL;
+            """)
+            seasons = con.execute("SELECT count(*) FROM _st_dirty").fetchone()[0]
+    finally:
+        con.execute("DROP TABLE IF EXISTS _st_games; DROP TABLE IF EXISTS _st_dirty")
+    return {"seasons": int(seasons), "rows": int(rows)}
+
+
+_SNAPSHOT_SQL = """
+INSERT OR REPLACE INTO fact_standings_snapshot
+WITH g AS (
+    SELECT * FROM _st_games SEMI JOIN _st_dirty USING (league_id, season)
+),
+side AS (   -- one row per team and finished fixture
+    SELECT league_id, season, matchday, date_utc, fixture_id, home_team_id AS team_id, away_team_id AS opp_id,
+           home_goals AS gf, away_goals AS ga
+    FROM g WHERE finished AND home_goals IS NOT NULL AND away_goals IS NOT NULL
+    UNION ALL
+    SELECT league_id, season, matchday, date_utc, fixture_id, away_team_id, home_team_id, away_goals, home_goals
+    FROM g WHERE finished AND home_goals IS NOT NULL AND away_goals IS NOT NULL
+),
+res AS (
+    SELECT *, CASE WHEN gf > ga THEN 3 WHEN gf = ga THEN 1 ELSE 0 END AS pts,
+              CASE WHEN gf > ga THEN 'W' WHEN gf = ga THEN 'D' ELSE 'L' END AS result
+    FROM side
+),
+cum AS (    -- every team's running totals after each of its games, in kickoff order
+    SELECT league_id, season, team_id, date_utc,
+           count(*) OVER w AS played, sum(pts) OVER w AS points, sum((pts = 3)::INTEGER) OVER w AS wins,
+           sum((pts = 1)::INTEGER) OVER w AS draws, sum((pts = 0)::INTEGER) OVER w AS losses,
+           sum(gf) OVER w AS gf, sum(ga) OVER w AS ga,
+           string_agg(result, '') OVER (PARTITION BY league_id, season, team_id
+                                        ORDER BY date_utc, fixture_id ROWS {form} PRECEDING) AS form
+    FROM res
+    WINDOW w AS (PARTITION BY league_id, season, team_id ORDER BY date_utc, fixture_id
+                 ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+),
+rounds AS ( -- a matchday is as of the last kickoff of its games played in turn
+    SELECT league_id, season, matchday,
+           max(date_utc) FILTER (finished AND home_goals IS NOT NULL AND away_goals IS NOT NULL
+                                 AND date_utc <= mid + INTERVAL {round_days} DAY) AS snapshot_ts
+    FROM g JOIN (SELECT league_id, season, matchday, quantile_disc(date_utc, 0.5) AS mid FROM g GROUP BY ALL)
+         USING (league_id, season, matchday)
+    GROUP BY ALL
+    HAVING snapshot_ts IS NOT NULL
+),
+grid AS (   -- every team of the season at every matchday played
+    SELECT t.league_id, t.season, t.team_id, r.matchday, r.snapshot_ts
+    FROM (SELECT league_id, season, home_team_id AS team_id FROM g
+          UNION SELECT league_id, season, away_team_id FROM g) t
+    JOIN rounds r USING (league_id, season)
+),
+snap AS (
+    SELECT grid.league_id, grid.season, grid.matchday, grid.team_id, grid.snapshot_ts,
+           coalesce(c.points, 0) AS points, coalesce(c.played, 0) AS played,
+           coalesce(c.wins, 0) AS wins, coalesce(c.draws, 0) AS draws, coalesce(c.losses, 0) AS losses,
+           coalesce(c.gf, 0) AS gf, coalesce(c.ga, 0) AS ga, c.form
+    FROM grid ASOF LEFT JOIN cum c
+      ON c.league_id = grid.league_id AND c.season = grid.season AND c.team_id = grid.team_id
+     AND grid.snapshot_ts >= c.date_utc
+),
+h2h AS (    -- games so far against the teams level on points at that matchday
+    SELECT s.league_id, s.season, s.matchday, s.team_id, sum(r.pts) AS h2h_pts, sum(r.gf - r.ga) AS h2h_gd
+    FROM snap s
+    JOIN res r ON r.league_id = s.league_id AND r.season = s.season AND r.team_id = s.team_id
+              AND r.date_utc <= s.snapshot_ts
+    JOIN snap o ON o.league_id = s.league_id AND o.season = s.season AND o.matchday = s.matchday
+               AND o.team_id = r.opp_id AND o.points = s.points
+    GROUP BY ALL
+),
+ranked AS (
+    SELECT s.*, s.gf - s.ga AS gd, coalesce(h.h2h_pts, 0) AS h2h_pts, coalesce(h.h2h_gd, 0) AS h2h_gd,
+           list_contains(?, s.league_id) AS h2h_first
+    FROM snap s LEFT JOIN h2h h USING (league_id, season, matchday, team_id)
+)
+SELECT league_id, season, matchday, team_id,
+       rank() OVER (PARTITION BY league_id, season, matchday ORDER BY points DESC,
+                    CASE WHEN h2h_first THEN h2h_pts ELSE gd END DESC,
+                    CASE WHEN h2h_first THEN h2h_gd ELSE gf END DESC,
+                    CASE WHEN h2h_first THEN gd ELSE h2h_pts END DESC,
+                    CASE WHEN h2h_first THEN gf ELSE h2h_gd END DESC) AS rank,
+       points, played, wins, draws, losses, gf, ga, gd, form, snapshot_ts
+FROM ranked SEMI JOIN _st_dirty d ON d.league_id = ranked.league_id AND d.season = ranked.season
+                                 AND ranked.snapshot_ts >= d.from_ts
+"""
+
+
+def table_at(con, league_id: int, season: int, matchday: int | None = None):
+    """The table after `matchday` (default: the latest one), ordered by rank."""
+    return con.execute("""
+        SELECT * FROM fact_standings_snapshot
+        WHERE league_id = ? AND season = ?
+          AND matchday = coalesce(?, (SELECT max(matchday) FROM fact_standings_snapshot
+                                      WHERE league_id = ? AND season = ?))
+        ORDER BY rank, team_id
+    """, [league_id, season, matchday, league_id, season]).fetchdf()
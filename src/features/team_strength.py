@@ -0,0 +1,141 @@
+# src/features/team_strength.py
+"""
+Team features per fixture, rolled up from the players.
+
+team_match_stats: what a team did in a fixture, from fact_player_stats_match - totals, and the
+    minutes-weighted rating - plus the team's last-LAST_N means of those (this fixture included).
+team_strength: what a team is expected to field, each player with their player_form as of
+    before kickoff (ASOF join), averaged with their recent minutes as weights. One row per
+    xi_source: 'previous', the 11 who played most minutes in the team's previous fixture (known
+    as soon as that one is over), and 'lineup', the starting XI from fact_lineups (published
+    shortly before kickoff) where there is one.
+
+Both are set-based: one INSERT ... SELECT each for any number of (league, season) partitions,
+which DuckDB runs on all cores; refresh(con) rebuilds everything (5 leagues x 6 seasons in about
+a second), refresh(con, [(39, 2025)]) only the partitions given. Run player_form.refresh first.
+"""
+from __future__ import annotations
+from . import player_form
+from ..warehouse.keys import rekey
+from ..warehouse.writer import atomic, transaction
+
+LAST_N = player_form.LAST_N
+XI = 11
+TEAM_STATS = ("shots_total", "shots_on", "passes_key", "goals", "assists", "tackles", "interceptions",
+              "duels_total", "duels_won", "yellow", "red")
+ROLLED = ("rating", "shots_on", "passes_key", "goals")
+XI_FORM = ("rating_ewm", f"rating_l{LAST_N}", "season_rating", "season_shots_on_p90",
+           "season_passes_key_p90", "season_goals_p90")
+
+
+def ensure_team_strength(con):
+    player_form.ensure_player_form(con)
+    stats = ",\n        ".join([f"{c} INTEGER" for c in TEAM_STATS] + [f"{c}_l{LAST_N} DOUBLE" for c in ROLLED])
+    xi = ",\n        ".join(f"xi_{c} DOUBLE" for c in XI_FORM)
+    con.execute(f"""
+    CREATE TABLE IF NOT EXISTS team_match_stats (
+        fixture_id INTEGER,
+        team_id INTEGER,
+        league_id INTEGER,
+        season INTEGER,
+        date_utc TIMESTAMP,
+        players INTEGER,         -- players who got minutes
+        minutes INTEGER,
+        rating DOUBLE,           -- minutes-weighted mean rating
+        {stats},
+        PRIMARY KEY (fixture_id, team_id)
+    );
+    CREATE TABLE IF NOT EXISTS team_strength (
+        fixture_id INTEGER,
+        team_id INTEGER,
+        league_id INTEGER,
+        season INTEGER,
+        date_utc TIMESTAMP,
+        xi_source VARCHAR,       -- 'lineup', 'previous'
+        xi_players INTEGER,
+        xi_with_form INTEGER,    -- XI players with a match before this one
+        {xi},
+        PRIMARY KEY (fixture_id, team_id, xi_source)
+    );
+    """)
+    rekey(con, "team_strength", ["fixture_id", "team_id", "xi_source"], latest="date_utc")   # was one row per side
+
+
+def _partitions(partitions) -> str:
+    if partitions is None:
+        return "true"
+    values = ", ".join(f"({int(l)}, {int(s)})" for l, s in partitions) or "(NULL, NULL)"
+    return f"(league_id, season) IN (SELECT (l, s) FROM (VALUES {values}) p(l, s))"
+
+
+def refresh(con, partitions=None) -> dict:
+    """Rebuild both tables for the (league_id, season) partitions (default: all); rows written."""
+    ensure_team_strength(con)
+    return atomic(con, _refresh, _partitions(partitions))
+
+
+def _refresh(con, where: str) -> dict:
+    totals = ",\n".join(f"sum(coalesce({c}, 0)) AS {c}" for c in TEAM_STATS)
+    rolled = ",\n".join(f"avg({c}) OVER last_n AS {c}_l{LAST_N}" for c in ROLLED)
+    xi = ",\n".join(
+        f"sum(f.{c} * w) FILTER (f.{c} IS NOT NULL) / nullif(sum(w) FILTER (f.{c} IS NOT NULL), 0) AS xi_{c}"
+        for c in XI_FORM)
+    with transaction(con):
+        con.execute(f"DELETE FROM team_match_stats WHERE {where}; DELETE FROM team_strength WHERE {where}")
+        matches = con.execute(f"""
+            INSERT INTO team_match_stats BY NAME
+            WITH per_team AS (
+                SELECT s.fixture_id, s.team_id, any_value(f.league_id) AS league_id, any_value(f.season) AS season,
+                       any_value(f.date_utc) AS date_utc,
+                       count(*) FILTER (s.minutes > 0) AS players, sum(coalesce(s.minutes, 0)) AS minutes,
+                       sum(TRY_CAST(s.rating AS DOUBLE) * s.minutes)
+                           / nullif(sum(s.minutes) FILTER (TRY_CAST(s.rating AS DOUBLE) IS NOT NULL), 0) AS rating,
+                       {totals}
+                FROM fact_player_stats_match s JOIN fact_fixtures f USING (fixture_id)
+                WHERE f.date_utc IS NOT NULL AND s.team_id IS NOT NULL
+                GROUP BY s.fixture_id, s.team_id
+            ), rolled AS (  -- windows over all of a team's fixtures, before keeping the partitions
+                SELECT *, {rolled} FROM per_team
+                WINDOW last_n AS (PARTITION BY team_id ORDER BY date_utc, fixture_id
+                                  ROWS BETWEEN {LAST_N - 1} PRECEDING AND CURRENT ROW)
+            )
+            SELECT * FROM rolled WHERE {where}
+        """).fetchone()[0]
+        strength = con.execute(f"""
+            INSERT INTO team_strength BY NAME
+            WITH sides AS (
+                SELECT fixture_id, league_id, season, date_utc, home_team_id AS team_id FROM fact_fixtures
+                WHERE date_utc IS NOT NULL AND {where}
+                UNION ALL
+                SELECT fixture_id, league_id, season, date_utc, away_team_id FROM fact_fixtures
+                WHERE date_utc IS NOT NULL AND {where}
+            ),
+            lineup AS (
+                SELECT s.*, l.player_id, 'lineup' AS xi_source
+                FROM sides s JOIN fact_lineups l USING (fixture_id, team_id) WHERE l.is_starter
+            ),
+            prev AS (   -- the team's previous fixture with player stats
+                SELECT s.*, t.fixture_id AS prev_fixture_id
+                FROM sides s
+                ASOF JOIN (SELECT fixture_id, team_id, date_utc FROM team_match_stats) t
+                  ON s.team_id = t.team_id AND s.date_utc > t.date_utc
+            ),
+            xi AS (
+                SELECT fixture_id, team_id, league_id, season, date_utc, player_id, xi_source FROM lineup
+                UNION ALL
+                SELECT p.fixture_id, p.team_id, p.league_id, p.season, p.date_utc, m.player_id, 'previous'
+                FROM prev p JOIN fact_player_stats_match m ON m.fixture_id = p.prev_fixture_id AND m.team_id = p.team_id
+                WHERE m.player_id > 0
+                QUALIFY row_number() OVER (PARTITION BY p.fixture_id, p.team_id
+                                           ORDER BY m.minutes DESC NULLS LAST, m.player_id) <= {XI}
+            )
+            SELECT x.fixture_id, x.team_id, any_value(x.league_id) AS league_id, any_value(x.season) AS season,
+                   any_value(x.date_utc) AS date_utc, x.xi_source,
+                   count(*) AS xi_players, count(f.player_id) AS xi_with_form,
+                   {xi}
+            FROM xi x
+            ASOF LEFT JOIN (SELECT *, greatest(coalesce(minutes_l{LAST_N}, 0), 1.0) AS w FROM player_form) f
+              ON x.player_id = f.player_id AND x.date_utc > f.date_utc
+            GROUP BY x.fixture_id, x.team_id, x.xi_source
+        """).fetchone()[0]
+    return {"team_match_stats": int(matches), "team_strength": int(strength)}
@@ -1,23 +1,18 @@
 import os
-import httpx
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
+from . import httpclient
 
 load_dotenv()
 
 APIFOOTBALL_KEY = os.getenv("APIFOOTBALL_KEY")
-APIFOOTBALL_BASE = "https://v3.football.api-sports.io"
-
-HEADERS = {"x-apisports-key": APIFOOTBALL_KEY} if APIFOOTBALL_KEY else {}
+APIFOOTBALL_BASE = httpclient.API_FOOTBALL_BASE
 
 def _get(endpoint: str, params: dict):
     if not APIFOOTBALL_KEY:
         raise RuntimeError("APIFOOTBALL_KEY not set. Put it in .env")
-    with httpx.Client(base_url=APIFOOTBALL_BASE, headers=HEADERS, timeout=30) as client:
-        r = client.get(endpoint, params=params)
-        r.raise_for_status()
-        return r.json()
+    return httpclient.get_json(httpclient.API_FOOTBALL, endpoint, params)
 
 def fetch_fixtures(league_id: int, season: int) -> pd.DataFrame:
     data = _get("/fixtures", {"league": league_id, "season": season})
@@ -1,16 +1,14 @@
-import os, time, requests, duckdb, pandas as pd
+import os, time, duckdb, pandas as pd
 from dateutil import tz
+from . import httpclient
+from ..warehouse.io import DB_PATH
 
-API_KEY = os.getenv("API_FOOTBALL_KEY") 
-BASE    = "https://v3.football.api-sports.io"
+BASE    = httpclient.API_FOOTBALL_BASE
 LEAGUE  = 78
 SEASON  = 2025
-DB_PATH = r"C:/Users/campo/Desktop/sports betting/warehouse.duckdb"
-
-HEADERS = {"x-apisports-key": API_KEY, "x-rapidapi-host": "v3.football.api-sports.io"}
 
 def get(endpoint, params):
-    r = requests.get(f"{BASE}/{endpoint}", headers=HEADERS, params=params, timeout=30)
+    r = httpclient.request(httpclient.API_FOOTBALL, f"/{endpoint}", params)
     r.raise_for_status()
     j = r.json()
     return j.get("response", [])
@@ -20,7 +18,7 @@ con = duckdb.connect(DB_PATH)
 def get_debug(endpoint, params):
     # help understand why we have issues. typically, we saw that when trying 2025 data:
     # {'get': 'standings', 'parameters': {'league': '78', 'season': '2025'}, 'errors': {'plan': 'Free plans do not have access to this season, try from 2021 to 2023.'}, 'results': 0, 'paging': {'current': 1, 'total': 1}, 'response': []}
-    r = requests.get(f"{BASE}/{endpoint}", headers=HEADERS, params=params, timeout=30)
+    r = httpclient.request(httpclient.API_FOOTBALL, f"/{endpoint}", params, retries=1)
     print("status:", r.status_code)
     j = r.json()
     print("errors:", j.get("errors"))
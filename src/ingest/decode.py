@@ -0,0 +1,80 @@
+"""
+JSON decoding for the HTTP clients.
+
+loads(body): the whole payload, with orjson when it's installed (2-3x faster than stdlib json),
+stdlib json otherwise.
+
+iter_payload(body): the same dict, except that its `response` list is a generator that decodes
+one item at a time while the row builders consume it. Only the raw body and the current item are
+alive at once instead of the whole object tree, which matters for season-wide bodies (/fixtures,
+/injuries); on 10-20 item pages plain loads is as lean and faster. Keys before `response` (API-Football sends get, parameters, errors, results, paging first)
+are there right away; keys after it appear once the generator is exhausted. The items can be
+iterated only once, so it suits builders that make a single pass (one flatten Spec).
+"""
+from __future__ import annotations
+import json, re
+
+try:
+    import orjson
+except ImportError:     # optional speedup
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+_raw = json.JSONDecoder().raw_decode    # C scanner, decodes one value starting at an index
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+def loads(body: bytes | str):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _ws(s: str, i: int) -> int:
+    return _WS.match(s, i).end()
+
+
+def _members(s: str, i: int, out: dict, key: str) -> int | None:
+    """Decode object members from s[i:] into `out` until `key`'s array; its index, or None at the '}'."""
+    while True:
+        i = _ws(s, i)
+        if s[i] == ",":
+            i = _ws(s, i + 1)
+        if s[i] == "}":
+            return None
+        k, i = _raw(s, i)
+        i = _ws(s, _ws(s, i) + 1)    # past ':'
+        if k == key and s[i] == "[":
+            return i
+        out[k], i = _raw(s, i)
+
+
+def _items(s: str, i: int, out: dict, key: str):
+    try:
+        i = _ws(s, i + 1)
+        while s[i] != "]":
+            item, i = _raw(s, i)
+            yield item
+            i = _ws(s, i)
+            if s[i] == ",":
+                i = _ws(s, i + 1)
+        _members(s, i + 1, out, key)
+    except IndexError:
+        raise json.JSONDecodeError("truncated payload", s, len(s)) from None
+
+
+def iter_payload(body: bytes | str, key: str = "response") -> dict:
+    """Payload dict whose `key` array is decoded lazily (see module doc)."""
+    s = body.decode() if isinstance(body, (bytes, bytearray)) else body
+    i = _ws(s, 0)
+    if not s.startswith("{", i):
+        return loads(s)
+    out = {}
+    try:
+        start = _members(s, i + 1, out, key)
+    except IndexError:
+        raise json.JSONDecodeError("truncated payload", s, len(s)) from None
+    if start is not None:
+        out[key] = _items(s, start, out, key)
+    return out
@@ -1,19 +1,25 @@
-import os, time, requests, certifi, duckdb, pandas as pd
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-DB_PATH = r"C:/Users/campo/Desktop/sports betting/warehouse.duckdb"
-BASE = "https://v3.football.api-sports.io"
-HDRS = {"x-apisports-key": os.getenv("API_FOOTBALL_KEY")}
-SLEEP = 0.15
-
-session = requests.Session()
-session.headers.update(HDRS)
-session.verify = certifi.where()
-session.mount("https://", HTTPAdapter(max_retries=Retry(
-    total=5, backoff_factor=0.4, status_forcelist=[429,500,502,503,504],
-    allowed_methods=["GET"]
-)))
+import os, re, pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from . import httpclient
+from .ratelimit import retry_after_seconds
+from .paging import iter_pages
+from . import journal, decode
+from .players import ingest_players
+from .flatten import Spec, flatten, flatten_arrow, prefixed, INT, FLOAT, BOOL, TS, DATE
+from ..warehouse.writer import atomic
+from ..warehouse import frames, odds_history
+from ..warehouse.buffer import WriteBehind
+from ..warehouse.io import DB_PATH
+from ..warehouse.keys import INJURY_KEY, rekey
+from .watermarks import ensure_watermarks, DIM_TTL, FINISHED
+
+BASE = httpclient.API_FOOTBALL_BASE
+WORKERS = int(os.getenv("API_FOOTBALL_WORKERS", "8"))
+MAX_429 = 5
+PLAYER_SINKS_FULL = ("dim_player", "player_stats")
+
+# pooled client, retries/backoff and the per-minute token bucket live in httpclient
+limiter = httpclient.limiter(httpclient.API_FOOTBALL)
 
 def ensure_schema(con):
     # === Dimension tables ===
@@ -107,6 +113,58 @@ def ensure_schema(con):
     );
     """)
 
+    # === Fact: Lineups per Fixture ===
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS fact_lineups (
+        fixture_id INTEGER,
+        league_id INTEGER,
+        season INTEGER,
+        team_id INTEGER,
+        player_id INTEGER,
+        player_name VARCHAR,
+        number INTEGER,
+        position VARCHAR,
+        grid VARCHAR,
+        is_starter BOOLEAN,
+        formation VARCHAR,
+        updated_ts TIMESTAMP,
+        PRIMARY KEY (fixture_id, team_id, player_id)
+    );
+    """)
+
+    # === Fact: Match events (goals, cards, subst, VAR) ===
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS fact_events (
+        fixture_id INTEGER,
+        league_id INTEGER,
+        season INTEGER,
+        event_idx INTEGER,
+        elapsed INTEGER,
+        extra INTEGER,
+        team_id INTEGER,
+        player_id INTEGER,
+        assist_id INTEGER,
+        type VARCHAR,
+        detail VARCHAR,
+        comments VARCHAR,
+        updated_ts TIMESTAMP,
+        PRIMARY KEY (fixture_id, event_idx)
+    );
+    """)
+
+    # === Fact: Player season aggregates (same table as python_ingester) ===
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS player_stats (
+      league_id INTEGER, season INTEGER, team_id INTEGER, player_id INTEGER,
+      minutes INTEGER, appearances INTEGER, lineups INTEGER, rating VARCHAR,
+      shots_total INTEGER, shots_on INTEGER, goals INTEGER, assists INTEGER,
+      passes_total INTEGER, passes_key INTEGER, tackles INTEGER,
+      duels_total INTEGER, duels_won INTEGER, yellow INTEGER, red INTEGER,
+      source VARCHAR, updated_ts TIMESTAMP,
+      PRIMARY KEY (league_id, season, player_id, team_id)
+    );
+    """)
+
     # === Fact: Standings snapshots ===
     con.execute("""
     CREATE TABLE IF NOT EXISTS fact_standings_snapshot (
@@ -142,10 +200,12 @@ def ensure_schema(con):
         start_date DATE,
         expected_return DATE,
         fixture_id INTEGER,
-        updated_ts TIMESTAMP,
-        PRIMARY KEY (league_id, season, team_id, player_id, updated_ts)
+        updated_ts TIMESTAMP,    -- pull in which status / reason last changed
+        PRIMARY KEY (league_id, season, team_id, player_id, fixture_id)
     );
     """)
+    # was keyed on updated_ts: every pull re-inserted the season, and a player's fixtures collided
+    rekey(con, "fact_injuries", INJURY_KEY)
     # === Fact: Odds ===
     con.execute("""
     CREATE TABLE IF NOT EXISTS fact_odds (
@@ -162,30 +222,53 @@ def ensure_schema(con):
         PRIMARY KEY (fixture_id, bookmaker_id, market_key, selection)
     );
     """)
+    ensure_watermarks(con)
+    journal.ensure_journal(con)
+
+def api_get(endpoint, params, stream=False):
+    return api_get_json(endpoint, params, stream)["response"]
 
-def api_get(endpoint, params):
-    r = session.get(f"{BASE}/{endpoint}", params=params, timeout=30)
-    r.raise_for_status()
-    j = r.json()
-    if j.get("errors"):
-        raise RuntimeError(f"{endpoint} error: {j['errors']} params={params}")
-    time.sleep(SLEEP)
-    return j["response"]
-
-def upsert(con, table, df, keys):
-    if df.empty: return 0
-    con.register("df_src", df)
-    cols = ", ".join(df.columns)
+def api_get_json(endpoint, params, stream=False):
+    """
+    Full payload (response + paging); api_get only keeps `response`.
+    stream: `response` is decoded item by item while it's consumed (decode.iter_payload);
+    only for callers that read it once. Pays off on season-wide bodies, not on 10-20 item pages.
+    """
+    for _ in range(MAX_429):
+        r = httpclient.request(httpclient.API_FOOTBALL, f"/{endpoint}", params)
+        r.raise_for_status()
+        j = decode.iter_payload(r.content) if stream else decode.loads(r.content)
+        errors = j.get("errors")
+        if isinstance(errors, dict) and "rateLimit" in errors:
+            # API-Football sometimes answers 200 with a rateLimit error instead of a 429
+            limiter.pause(retry_after_seconds(r.headers))
+            continue
+        if errors:
+            raise RuntimeError(f"{endpoint} error: {errors} params={params}")
+        return j
+    raise RuntimeError(f"{endpoint} still rate limited after {MAX_429} tries params={params}")
+def upsert(con, table, df, keys, changed_only=False):
+    """df: a DataFrame or Arrow data (table, batches, reader), scanned in place (warehouse.frames).
+    changed_only: existing rows are only rewritten (updated_ts included) when another column changed."""
+    src = frames.as_source(df)
+    if src is None: return 0
+    # one unit on the writer thread when the orchestrator shares `con` across stages
+    return atomic(con, _upsert, table, src, keys, changed_only)
+
+def _upsert(con, table, src, keys, changed_only=False):
+    cols = frames.columns(src)
     pk = ", ".join(keys)
-    set_cols = [c for c in df.columns if c not in keys]
+    set_cols = [c for c in cols if c not in keys]
     set_clause = ", ".join([f"{c}=excluded.{c}" for c in set_cols])
-    con.execute(f"""
-        INSERT INTO {table} ({cols})
-        SELECT {cols} FROM df_src
+    cmp = [c for c in set_cols if c != "updated_ts"]
+    if changed_only and cmp:
+        set_clause += (f" WHERE ({', '.join(f'{table}.{c}' for c in cmp)})"
+                       f" IS DISTINCT FROM ({', '.join(f'excluded.{c}' for c in cmp)})")
+    return frames.insert_from(con, "df_src", src, f"""
+        INSERT INTO {table} ({", ".join(cols)})
+        SELECT {", ".join(cols)} FROM df_src
         ON CONFLICT ({pk}) DO UPDATE SET {set_clause}
     """)
-    con.unregister("df_src")
-    return len(df)
 
 def parse_matchday(round_txt: str) -> int | None:
     if not round_txt:
@@ -194,301 +277,329 @@ def parse_matchday(round_txt: str) -> int | None:
     tail = parts[-1].strip()
     return int(tail) if tail.isdigit() else None
 
+LEAGUE_SPEC = Spec(("league.id", "league_id", INT), ("league.name", "league_name"),
+                   ("country.name", "country_name"), ("country.code", "country_code"))
+TEAM_SPEC = Spec(("team.id", "team_id", INT), ("team.name", "team_name"), ("country.name", "country_name"))
+
 def ingest_dim_league(con):
     resp = api_get("leagues", {})   # can filter by country later
-    rows = []
-    for d in resp:
-        lg = d.get("league",{}) or {}
-        ct = d.get("country",{}) or {}
-        rows.append({
-            "league_id": lg.get("id"),
-            "league_name": lg.get("name"),
-            "country_name": ct.get("name"),
-            "country_code": ct.get("code"),
-        })
-    df = pd.DataFrame(rows).drop_duplicates("league_id")
+    df = flatten(LEAGUE_SPEC, resp).drop_duplicates("league_id")
     return upsert(con, "dim_league", df, ["league_id"])
 
 def ingest_dim_team(con, league_id:int, season:int):
     teams = api_get("teams", {"league": league_id, "season": season})
-    rows=[]
-    for t in teams:
-        tm = t.get("team",{}) or {}
-        rows.append({
-            "team_id": tm.get("id"),
-            "team_name": tm.get("name"),
-            "country_name": (t.get("country") or {}).get("name"),
-        })
-    df = pd.DataFrame(rows).drop_duplicates("team_id")
+    df = flatten(TEAM_SPEC, teams).drop_duplicates("team_id")
     return upsert(con, "dim_team", df, ["team_id"])
 
 def ingest_dim_player(con, league_id:int, season:int):
-    page = 1; total=0
-    while True:
-        resp = api_get("players", {"league": league_id, "season": season, "page": page})
-        if not resp: break
-        rows=[]
-        for rec in resp:
-            pl = rec.get("player",{}) or {}
-            rows.append({
-                "player_id": pl.get("id"),
-                "player_name": pl.get("name"),
-                "firstname": pl.get("firstname"),
-                "lastname": pl.get("lastname"),
-                "nationality": pl.get("nationality"),
-                "birth_date": (pl.get("birth") or {}).get("date"),
-                "height": pl.get("height"),
-                "weight": pl.get("weight"),
-            })
-        df = pd.DataFrame(rows).drop_duplicates("player_id")
-        total += upsert(con, "dim_player", df, ["player_id"])
-        page += 1
-    return total
-
-def ingest_fixtures(con, league_id:int, season:int):
+    return ingest_players(con, api_get_json, upsert, league_id, season,
+                          sinks=("dim_player",), workers=WORKERS)["dim_player"]
+
+# updated_ts is a constant: one timestamp per frame, not one utcnow() per row
+FIXTURE_SPEC = Spec(
+    ("fixture.id", "fixture_id", INT),
+    ("league.id", "league_id", INT),
+    ("league.season", "season", INT),
+    ("league.round", "round"),
+    ("fixture.date", "date_utc", TS),
+    ("fixture.venue.id", "venue_id", INT),
+    ("fixture.venue.name", "venue_name"),
+    ("fixture.status.short", "status_short"),
+    ("teams.home.id", "home_team_id", INT),
+    ("teams.away.id", "away_team_id", INT),
+    ("goals.home", "home_goals", INT),
+    ("goals.away", "away_goals", INT),
+    ("fixture.referee", "referee"),
+    "updated_ts",
+)
+
+def ingest_fixtures(con, league_id:int, season:int, date_from=None):
     # Pull season fixtures (API allows filters like from/to, round, date)
-    resp = api_get("fixtures", {"league": league_id, "season": season})
-    rows=[]
-    for fx in resp:
-        league = fx.get("league",{}) or {}
-        fixture = fx.get("fixture",{}) or {}
-        teams = fx.get("teams",{}) or {}
-        goals = fx.get("goals",{}) or {}
-        rows.append({
-            "fixture_id": fixture.get("id"),
-            "league_id": league.get("id"),
-            "season": league.get("season"),
-            "round": league.get("round"),
-            "date_utc": pd.to_datetime(fixture.get("date"), utc=True, errors="coerce"),
-            "venue_id": (fixture.get("venue") or {}).get("id"),
-            "venue_name": (fixture.get("venue") or {}).get("name"),
-            "status_short": (fixture.get("status") or {}).get("short"),
-            "home_team_id": (teams.get("home") or {}).get("id"),
-            "away_team_id": (teams.get("away") or {}).get("id"),
-            "home_goals": goals.get("home"),
-            "away_goals": goals.get("away"),
-            "referee": fixture.get("referee"),
-            "updated_ts": pd.Timestamp.utcnow(),
-        })
-    df = pd.DataFrame(rows)
-    return upsert(con, "fact_fixtures", df, ["fixture_id"])
+    params = {"league": league_id, "season": season}
+    if date_from is not None:
+        # incremental: only fixtures from date_from to the end of the season
+        params.update({"from": str(date_from), "to": f"{season + 1}-12-31"})
+    resp = api_get("fixtures", params, stream=True)
+    # Arrow straight into the upsert: a season body never becomes a DataFrame
+    rows = flatten_arrow(FIXTURE_SPEC, resp, updated_ts=pd.Timestamp.utcnow())
+    return upsert(con, "fact_fixtures", rows, ["fixture_id"])
 
 def ingest_player_stats(con, league_id:int, season:int):
-    page=1; total=0
-    while True:
-        resp = api_get("players", {"league": league_id, "season": season, "page": page})
-        if not resp: break
-        rows=[]
-        for rec in resp:
-            player = rec.get("player",{}) or {}
-            for s in rec.get("statistics") or []:
-                team   = s.get("team",{}) or {}
-                games  = s.get("games",{}) or {}
-                shots  = s.get("shots",{}) or {}
-                goals  = s.get("goals",{}) or {}
-                passes = s.get("passes",{}) or {}
-                tackles= s.get("tackles",{}) or {}
-                duels  = s.get("duels",{}) or {}
-                drib   = s.get("dribbles",{}) or {}
-                fouls  = s.get("fouls",{}) or {}
-                cards  = s.get("cards",{}) or {}
-                rows.append({
-                    "league_id": league_id,
-                    "season": season,
-                    "fixture_id": None,  # this endpoint is season aggregates per player/team
-                    "team_id": team.get("id"),
-                    "player_id": player.get("id"),
-                    "minutes": games.get("minutes"),
-                    "rating": games.get("rating"),
-                    "shots_total": shots.get("total"), "shots_on": shots.get("on"),
-                    "goals": goals.get("total"), "assists": goals.get("assists"),
-                    "passes_total": passes.get("total"), "passes_key": passes.get("key"),
-                    "tackles": tackles.get("total"),
-                    "interceptions": tackles.get("interceptions"),
-                    "duels_total": duels.get("total"), "duels_won": duels.get("won"),
-                    "dribbles_attempts": drib.get("attempts"), "dribbles_success": drib.get("success"),
-                    "fouls_committed": fouls.get("committed"), "fouls_drawn": fouls.get("drawn"),
-                    "yellow": cards.get("yellow"), "red": cards.get("red"),
-                    "updated_ts": pd.Timestamp.utcnow(),
-                })
-        df = pd.DataFrame(rows)
-        total += upsert(con, "fact_player_stats", df, ["league_id","season","player_id","team_id","fixture_id"])
-        page += 1
-    return total
+    return ingest_players(con, api_get_json, upsert, league_id, season,
+                          sinks=("fact_player_stats",), workers=WORKERS)["fact_player_stats"]
+
+INJURY_SPEC = Spec(
+    "league_id", "season",
+    ("team.id", "team_id", INT),
+    ("player.id", "player_id", INT),
+    ("player.name", "player_name"),
+    ("player.type", "status"),          # 'Missing Fixture', 'Questionable'
+    ("player.reason", "reason"),
+    ("start", "start_date", DATE),
+    ("end", "expected_return", DATE),
+    ("fixture.id", "fixture_id", INT),
+    "updated_ts",
+)
 
 def ingest_injuries(con, league_id:int, season:int):
-    resp = api_get("injuries", {"league": league_id, "season": season})
-    rows=[]
-    for e in resp:
-        player = e.get("player",{}) or {}
-        team   = e.get("team",{}) or {}
-        fixture= e.get("fixture",{}) or {}
-        rows.append({
-            "league_id": league_id, "season": season,
-            "team_id": team.get("id"),
-            "player_id": player.get("id"),
-            "player_name": player.get("name"),
-            "status": e.get("status"),
-            "reason": e.get("reason"),
-            "start_date": pd.to_datetime(e.get("start"), errors="coerce"),
-            "expected_return": pd.to_datetime(e.get("end"), errors="coerce"),
-            "fixture_id": fixture.get("id"),
-            "updated_ts": pd.Timestamp.utcnow(),
-        })
-    df = pd.DataFrame(rows)
-    return upsert(con, "fact_injuries", df, ["league_id","season","team_id","player_id","updated_ts"])
+    resp = api_get("injuries", {"league": league_id, "season": season}, stream=True)
+    rows = flatten_arrow(INJURY_SPEC, resp, league_id=league_id, season=season, updated_ts=pd.Timestamp.utcnow())
+    # one row per player and fixture; a re-pull only touches the ones whose status / reason changed
+    return upsert(con, "fact_injuries", rows, INJURY_KEY, changed_only=True)
+
+# one row per bookmaker x bet x value
+ODDS_SPEC = Spec(
+    ("fixture.id", "fixture_id", INT),
+    "league_id", "season",
+    ("bookmakers[].id", "bookmaker_id", INT),
+    ("bookmakers[].name", "bookmaker_name"),
+    ("bookmakers[].bets[].name", "market_key"),
+    ("bookmakers[].bets[].values[].value", "selection"),
+    ("bookmakers[].bets[].values[].odd", "value", FLOAT),
+    ("bookmakers[].bets[].values[].last_update", "last_update", DATE),
+    "updated_ts",
+)
+
+def odds_frame(resp, league_id:int, season:int, markets=("h2h","over_under","btts")) -> pd.DataFrame:
+    df = flatten(ODDS_SPEC, resp, league_id=league_id, season=season, updated_ts=pd.Timestamp.utcnow())
+    df["market_key"] = df["market_key"].fillna("").str.lower()
+    if markets:
+        df = df[df["market_key"].str.contains("|".join(map(re.escape, markets)))]
+    return df.reset_index(drop=True)
 
 def ingest_odds_by_season(con, league_id:int, season:int,
-                          markets=("h2h","over_under","btts")):
-    total = 0
-    page = 1
-    while True:
-        resp = api_get("odds", {"league": league_id, "season": season, "page": page})
-        if not resp: break
-        rows = []
-        for r in resp:
-            fid = (r.get("fixture") or {}).get("id")
-            for bk in r.get("bookmakers") or []:
-                bkid = bk.get("id"); bkname = bk.get("name")
-                for m in bk.get("bets") or []:
-                    market_key = (m.get("name") or "").lower()
-                    if markets and all(k not in market_key for k in markets):
-                        continue
-                    for v in m.get("values") or []:
-                        rows.append({
-                            "fixture_id": fid,
-                            "league_id": league_id,
-                            "season": season,
-                            "bookmaker_id": bkid,
-                            "bookmaker_name": bkname,
-                            "market_key": market_key,
-                            "selection": v.get("value"),
-                            "value": float(v.get("odd")) if v.get("odd") else None,
-                            "last_update": pd.to_datetime(v.get("last_update"), errors="coerce"),
-                            "updated_ts": pd.Timestamp.utcnow(),
-                        })
-        df = pd.DataFrame(rows)
-        total += upsert(con, "fact_odds", df,
-                        ["fixture_id","bookmaker_id","market_key","selection"])
-        page += 1
-    return total
-
-def _fixture_ids_for(con, league_id:int, season:int, only_finished=True):
+                          markets=("h2h","over_under","btts"), ckpt=None):
+    pages = iter_pages(api_get_json, "odds", {"league": league_id, "season": season}, workers=WORKERS,
+                       **journal.page_args(ckpt))
+    with WriteBehind(con, upsert, ckpt=ckpt) as wb:
+        for page, resp in pages:
+            wb.add("fact_odds", odds_frame(resp, league_id, season, markets),
+                   ["fixture_id","bookmaker_id","market_key","selection"])
+            wb.done(f"page:{page}")
+    # fact_odds only keeps the latest price: append what moved since the last pull
+    odds_history.capture_fact_odds(con, league_id, season)
+    return wb.totals.get("fact_odds", 0)
+
+def _fixture_ids_for(con, league_id:int, season:int, only_finished=True, missing_from=None):
+    """
+    missing_from: skip fixtures that already have rows in that table (finished matches never change).
+    """
     q = """
       SELECT fixture_id
-      FROM fact_fixtures
+      FROM fact_fixtures f
       WHERE league_id = ? AND season = ?
     """
+    params = [league_id, season]
     if only_finished:
-        q += " AND status_short IN ('FT','AET','PEN')"
-    return con.execute(q, [league_id, season]).fetchdf()["fixture_id"].tolist()
-
-def ingest_player_stats_per_fixture(con, league_id:int, season:int, fixture_ids=None, only_finished=True):
+        q += " AND list_contains(?, status_short)"
+        params.append(list(FINISHED))
+    if missing_from:
+        q += f" AND NOT EXISTS (SELECT 1 FROM {missing_from} m WHERE m.fixture_id = f.fixture_id)"
+    return con.execute(q + " ORDER BY date_utc", params).fetchdf()["fixture_id"].tolist()
+
+def _last_finished_ts(con, league_id:int, season:int):
+    return con.execute("""
+        SELECT max(date_utc) FROM fact_fixtures
+        WHERE league_id = ? AND season = ? AND list_contains(?, status_short)
+    """, [league_id, season, list(FINISHED)]).fetchone()[0]
+
+# fact_player_stats_match fields, relative to one team block of /fixtures/players
+PLAYER_MATCH_FIELDS = [
+    "fixture_id", "league_id", "season",
+    ("team.id", "team_id", INT),
+    ("players[].player.id", "player_id", INT),
+
+    ("players[].player.name", "player_name"),
+    ("team.name", "team_name"),
+    ("players[].statistics[0].games.position", "position"),
+    ("players[].statistics[0].games.number", "number", INT),
+    ("players[].statistics[0].games.captain", "is_captain", BOOL),
+
+    ("players[].statistics[0].games.minutes", "minutes", INT),
+    ("players[].statistics[0].games.rating", "rating"),
+
+    ("players[].statistics[0].shots.total", "shots_total", INT),
+    ("players[].statistics[0].shots.on", "shots_on", INT),
+    ("players[].statistics[0].goals.total", "goals", INT),
+    ("players[].statistics[0].goals.assists", "assists", INT),
+    ("players[].statistics[0].goals.saves", "saves", INT),
+
+    ("players[].statistics[0].passes.total", "passes_total", INT),
+    ("players[].statistics[0].passes.key", "passes_key", INT),
+    ("players[].statistics[0].passes.accuracy", "passes_accuracy", INT),
+
+    ("players[].statistics[0].tackles.total", "tackles", INT),
+    ("players[].statistics[0].tackles.interceptions", "interceptions", INT),
+    ("players[].statistics[0].tackles.blocks", "blocks", INT),
+
+    ("players[].statistics[0].duels.total", "duels_total", INT),
+    ("players[].statistics[0].duels.won", "duels_won", INT),
+
+    ("players[].statistics[0].dribbles.attempts", "dribbles_attempts", INT),
+    ("players[].statistics[0].dribbles.success", "dribbles_success", INT),
+
+    ("players[].statistics[0].fouls.committed", "fouls_committed", INT),
+    ("players[].statistics[0].fouls.drawn", "fouls_drawn", INT),
+
+    ("players[].statistics[0].cards.yellow", "yellow", INT),
+    ("players[].statistics[0].cards.red", "red", INT),
+    ("players[].statistics[0].offsides", "offsides", INT),
+
+    "updated_ts",
+]
+PLAYER_MATCH_SPEC = Spec(*PLAYER_MATCH_FIELDS)
+
+def player_match_frame(fid, league_id:int, season:int, resp) -> pd.DataFrame:
+    """Flatten one /fixtures/players response into fact_player_stats_match rows."""
+    return flatten(PLAYER_MATCH_SPEC, resp, fixture_id=fid, league_id=league_id, season=season,
+                   updated_ts=pd.Timestamp.utcnow())
+
+def fetch_concurrently(calls, workers:int=WORKERS):
+    """
+    Run api_get(endpoint, params) for each (endpoint, params) in `calls` on a thread pool.
+    Yields (index, response) in submission order; pacing is left to the shared limiter.
+    """
+    if workers <= 1:
+        for i, (endpoint, params) in enumerate(calls):
+            yield i, api_get(endpoint, params)
+        return
+    ex = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [ex.submit(api_get, endpoint, params) for endpoint, params in calls]
+        for i, fut in enumerate(futures):
+            yield i, fut.result()
+    finally:
+        # on error, don't keep spending quota on calls nobody will read
+        ex.shutdown(wait=True, cancel_futures=True)
+
+def ingest_player_stats_per_fixture(con, league_id:int, season:int, fixture_ids=None, only_finished=True,
+                                    workers:int=WORKERS):
     """
     Pulls per-fixture player stats (/fixtures/players) and upserts into fact_player_stats_match.
+    HTTP calls run on `workers` threads paced by the shared token bucket; DuckDB writes stay on this thread.
     """
     if fixture_ids is None:
         fixture_ids = _fixture_ids_for(con, league_id, season, only_finished=only_finished)
 
-    total = 0
-    for i, fid in enumerate(fixture_ids):
-        # One call per fixture
-        resp = api_get("fixtures/players", {"fixture": fid})
-        rows = []
-        for tb in resp:
-            team  = tb.get("team", {}) or {}
-            t_id  = team.get("id")
-            t_nm  = team.get("name")
-            for p in tb.get("players") or []:
-                pl    = p.get("player", {}) or {}
-                stats = (p.get("statistics") or [{}])[0]
-
-                player_id   = pl.get("id")
-                player_name = pl.get("name")
-
-                games   = stats.get("games", {}) or {}
-                shots   = stats.get("shots", {}) or {}
-                goals   = stats.get("goals", {}) or {}
-                passes  = stats.get("passes", {}) or {}
-                tackles = stats.get("tackles", {}) or {}
-                duels   = stats.get("duels", {}) or {}
-                drib    = stats.get("dribbles", {}) or {}
-                fouls   = stats.get("fouls", {}) or {}
-                cards   = stats.get("cards", {}) or {}
-                offsides= stats.get("offsides")
-
-                rows.append({
-                    "fixture_id": fid,
-                    "league_id": league_id,
-                    "season": season,
-                    "team_id": t_id,
-                    "player_id": player_id,
-
-                    "player_name": player_name,
-                    "team_name": t_nm,
-                    "position": games.get("position"),
-                    "number": games.get("number"),
-                    "is_captain": bool(games.get("captain")) if games.get("captain") is not None else None,
-
-                    "minutes": games.get("minutes"),
-                    "rating": games.get("rating"),
-
-                    "shots_total": shots.get("total"), "shots_on": shots.get("on"),
-                    "goals": goals.get("total"), "assists": goals.get("assists"), "saves": goals.get("saves"),
-
-                    "passes_total": passes.get("total"), "passes_key": passes.get("key"),
-                    "passes_accuracy": passes.get("accuracy"),
-
-                    "tackles": tackles.get("total"), "interceptions": tackles.get("interceptions"),
-                    "blocks": tackles.get("blocks"),
-
-                    "duels_total": duels.get("total"), "duels_won": duels.get("won"),
-
-                    "dribbles_attempts": drib.get("attempts"), "dribbles_success": drib.get("success"),
-
-                    "fouls_committed": fouls.get("committed"), "fouls_drawn": fouls.get("drawn"),
-
-                    "yellow": cards.get("yellow"), "red": cards.get("red"),
-                    "offsides": offsides,
-
-                    "updated_ts": pd.Timestamp.utcnow(),
-                })
-
-        df = pd.DataFrame(rows)
-        total += upsert(con, "fact_player_stats_match",
-                        df, ["fixture_id", "player_id", "team_id"])
-
-        if (i + 1) % 50 == 0:
-            print(f"[players/match] {i+1}/{len(fixture_ids)} fixtures processed")
-
-    return total
-
-def run_full_ingest(leagues: dict[str,int], seasons: list[int]):
-    con = duckdb.connect(DB_PATH)
-    ensure_schema(con)
-    ingest_dim_league(con)
-
-    for country, league_id in leagues.items():
-        for season in seasons:
-            print(f"== {country} {season} ==")
-            # dimensions
-            ingest_dim_team(con, league_id, season)
-            ingest_dim_player(con, league_id, season)
-            # facts
-            ingest_fixtures(con, league_id, season)
-            # ingest_player_stats(con, league_id, season)
-            ingest_fixtures(con, league_id, season)  # make sure fixtures exist first
-            ingest_player_stats_per_fixture(con, league_id, season, only_finished=True)
-            try:
-                ingest_injuries(con, league_id, season)
-            except RuntimeError as e:
-                print(f"Injuries skip: {e}")  # some seasons may not have data
-
-            # odds for this league/season (example: only fixtures in this season)
-            fids = con.execute("""
-                SELECT fixture_id FROM fact_fixtures
-                WHERE league_id=? AND season=? AND date_utc IS NOT NULL
-            """, [league_id, season]).fetchdf()["fixture_id"].tolist()
-            
-
-    con.close()
\ No newline at end of file
+    calls = [("fixtures/players", {"fixture": fid}) for fid in fixture_ids]
+    # ~30 rows per fixture: buffered and upserted in large batches, not one statement per fixture
+    with WriteBehind(con, upsert) as wb:
+        for i, resp in fetch_concurrently(calls, workers=workers):
+            wb.add("fact_player_stats_match", player_match_frame(fixture_ids[i], league_id, season, resp),
+                   ["fixture_id", "player_id", "team_id"])
+
+            if (i + 1) % 50 == 0:
+                print(f"[players/match] {i+1}/{len(fixture_ids)} fixtures processed")
+
+    return wb.totals.get("fact_player_stats_match", 0)
+
+FIXTURE_IDS_PER_CALL = 20   # /fixtures?ids= accepts at most 20 ids joined by "-"
+DETAIL_KEYS = {
+    "fact_fixtures": ["fixture_id"],
+    "fact_player_stats_match": ["fixture_id", "player_id", "team_id"],
+    "fact_lineups": ["fixture_id", "team_id", "player_id"],
+    "fact_events": ["fixture_id", "event_idx"],
+}
+
+# relative to one /fixtures?ids= item; the fixture's own fields fill what was a constant per fixture
+_FIXTURE_ID = {"fixture_id": ("fixture.id", INT)}
+DETAIL_PLAYER_SPEC = Spec(*prefixed("players[].", PLAYER_MATCH_FIELDS, **_FIXTURE_ID))
+
+def _lineup_fields(key: str) -> list:
+    # one spec per list: startXI and substitutes explode separately, the
+    # positions (#) put the rows back into API order once both are concatenated
+    return [
+        ("fixture.id", "fixture_id", INT), "league_id", "season",
+        ("lineups[].team.id", "team_id", INT),
+        (f"lineups[].{key}[].player.id", "player_id", INT),
+        (f"lineups[].{key}[].player.name", "player_name"),
+        (f"lineups[].{key}[].player.number", "number", INT),
+        (f"lineups[].{key}[].player.pos", "position"),
+        (f"lineups[].{key}[].player.grid", "grid"),
+        "is_starter",
+        ("lineups[].formation", "formation"),
+        "updated_ts",
+        ("#", "_fixture"), ("lineups[].#", "_team"), (f"lineups[].{key}[].#", "_pos"),
+    ]
+DETAIL_LINEUP_SPECS = {True: Spec(*_lineup_fields("startXI")), False: Spec(*_lineup_fields("substitutes"))}
+
+DETAIL_EVENT_SPEC = Spec(
+    ("fixture.id", "fixture_id", INT), "league_id", "season",
+    ("events[].#", "event_idx", INT),   # API order is stable once the match is finished
+    ("events[].time.elapsed", "elapsed", INT),
+    ("events[].time.extra", "extra", INT),
+    ("events[].team.id", "team_id", INT),
+    ("events[].player.id", "player_id", INT),
+    ("events[].assist.id", "assist_id", INT),
+    ("events[].type", "type"),
+    ("events[].detail", "detail"),
+    ("events[].comments", "comments"),
+    "updated_ts",
+)
+
+def _lineups_frame(resp, **consts) -> pd.DataFrame:
+    df = pd.concat([flatten(spec, resp, is_starter=starter, **consts)
+                    for starter, spec in DETAIL_LINEUP_SPECS.items()], ignore_index=True)
+    df = df[df["player_id"].notna()]
+    df = df.sort_values(["_fixture", "_team", "is_starter", "_pos"], ascending=[True, True, False, True],
+                        kind="stable")
+    return df.drop(columns=["_fixture", "_team", "_pos"]).reset_index(drop=True)
+
+def fixture_detail_frames(resp, league_id:int, season:int) -> dict[str, pd.DataFrame]:
+    """
+    Fan one /fixtures?ids= response out into one DataFrame per table (see DETAIL_KEYS).
+    Each item carries the fixture itself plus its players, lineups and events.
+    """
+    now = pd.Timestamp.utcnow()
+    consts = {"league_id": league_id, "season": season, "updated_ts": now}
+    return {
+        "fact_fixtures": flatten(FIXTURE_SPEC, resp, updated_ts=now),
+        "fact_player_stats_match": flatten(DETAIL_PLAYER_SPEC, resp, **consts),
+        "fact_lineups": _lineups_frame(resp, **consts),
+        "fact_events": flatten(DETAIL_EVENT_SPEC, resp, **consts),
+    }
+
+def ingest_fixture_details(con, league_id:int, season:int, fixture_ids=None, only_finished=True,
+                           workers:int=WORKERS, ckpt=None):
+    """
+    Batched replacement for ingest_player_stats_per_fixture: one /fixtures?ids= call per
+    20 fixtures, fanned out into fact_fixtures, fact_player_stats_match, fact_lineups and fact_events.
+    ckpt: journal.Checkpoint; fixtures are journaled in the transaction that flushes their rows.
+    """
+    if fixture_ids is None:
+        fixture_ids = _fixture_ids_for(con, league_id, season, only_finished=only_finished)
+    if ckpt is not None:
+        ckpt.set_total(max(len(fixture_ids), ckpt.total or 0))
+        fixture_ids = [f for f in fixture_ids if f"fixture:{f}" not in ckpt.done]
+
+    chunks = [fixture_ids[i:i + FIXTURE_IDS_PER_CALL]
+              for i in range(0, len(fixture_ids), FIXTURE_IDS_PER_CALL)]
+    calls = [("fixtures", {"ids": "-".join(str(f) for f in chunk)}) for chunk in chunks]
+    with WriteBehind(con, upsert, ckpt=ckpt) as wb:
+        for i, resp in fetch_concurrently(calls, workers=workers):
+            for table, df in fixture_detail_frames(resp, league_id, season).items():
+                wb.add(table, df, DETAIL_KEYS[table])
+            wb.done([f"fixture:{f}" for f in chunks[i]])
+
+            if (i + 1) % 10 == 0:
+                print(f"[fixtures/details] {i+1}/{len(chunks)} batches processed")
+
+    return {table: wb.totals.get(table, 0) for table in DETAIL_KEYS}
+
+def run_full_ingest(leagues: dict[str,int], seasons: list[int], incremental: bool = False, dim_ttl=DIM_TTL,
+                    stages=None, parallel: int | None = None, resume: bool = False):
+    """
+    Runs the ingest DAG (see orchestrator.py): league-seasons and independent stages in
+    parallel, all writes through one writer thread.
+    incremental=True only fetches deltas, driven by the ingest_watermark table:
+    dimensions older than `dim_ttl`, fixtures from the earliest unfinished one (or the last run),
+    details for finished fixtures not yet in fact_player_stats_match, and injuries/odds only
+    when the season's fixtures changed since their last run.
+    Closed seasons (every fixture terminal) cost no request once they have been ingested.
+    resume=True continues an interrupted run from ingest_journal after printing what is left.
+    """
+    from . import orchestrator
+    return orchestrator.run(leagues, seasons, db_path=DB_PATH,
+                            stages=stages or orchestrator.DEFAULT_STAGES,
+                            incremental=incremental, dim_ttl=dim_ttl,
+                            parallel=parallel or orchestrator.PARALLEL, resume=resume)
@@ -0,0 +1,236 @@
+"""
+Columnar flattening of JSON payloads, driven by declared field paths.
+
+    FIXTURE = Spec(
+        ("fixture.id", "fixture_id", INT),
+        "league_id",                                   # constant, passed to flatten()
+        ("fixture.date", "date_utc", TS),
+        ("players[].statistics[0].passes.key", "passes_key", INT),
+    )
+    df = flatten(FIXTURE, resp, league_id=78)
+
+Path syntax: `a.b` dict keys, `a[0]` a list index, `a[]` one output row per list item
+(nested `[]` give one row per innermost item, outer fields repeat), `#` the position of
+the row in its innermost list, `a|A` the first key present. Missing keys, nulls and empty
+lists anywhere on the way yield None, like the `.get(...) or {}` chains they replace.
+
+A spec compiles once into a generated extraction loop that resolves every shared prefix
+once per record and appends straight into one list per column (no dict per row);
+conversions (INT, FLOAT, TS, ...) then run once per column. The generated source is kept in
+spec.source and in linecache under '<flatten.Spec n: columns>', so tracebacks show its lines.
+
+flatten_arrow() builds a pyarrow Table from the same lists, for the warehouse writers
+(warehouse.frames), skipping the DataFrame when nothing else needs one.
+"""
+from __future__ import annotations
+import itertools, linecache, re
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:     # optional, flatten_arrow falls back to flatten
+    pa = None
+
+INT, FLOAT, STR, BOOL, TS, DATE = "int", "float", "str", "bool", "ts", "date"
+
+_TOKEN = re.compile(r"\[(\d*)\]|#|[^.\[\]#]+")
+_SPEC_IDS = itertools.count(1)
+
+
+def _parse(path: str) -> tuple:
+    """'a.b[0].c[]' -> (('key', ('a',)), ('key', ('b',)), ('idx', 0), ('key', ('c',)), ('each',))"""
+    out = []
+    for m in _TOKEN.finditer(path):
+        tok = m.group(0)
+        if tok == "#":
+            out.append(("pos",))
+        elif tok.startswith("["):
+            out.append(("each",) if m.group(1) == "" else ("idx", int(m.group(1))))
+        else:
+            out.append(("key", tuple(tok.split("|"))))
+    return tuple(out)
+
+
+def _first(d: dict, keys: tuple):
+    for k in keys:
+        v = d.get(k)
+        if v is not None:
+            return v
+    return None
+
+
+def _convert(values: list, kind):
+    if kind is None or kind == STR:
+        return values
+    if callable(kind):
+        return kind(values)
+    if kind == INT:
+        # plain int64 without nulls, a masked Int64 array (not float) with them
+        try:
+            return np.array(values, dtype=np.int64)
+        except (TypeError, ValueError, OverflowError):
+            pass
+        try:
+            mask = np.array([v is None for v in values], dtype=bool)
+            data = np.array([0 if v is None else v for v in values], dtype=np.int64)
+            return pd.arrays.IntegerArray(data, mask)
+        except (TypeError, ValueError, OverflowError):
+            # junk strings
+            return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("Int64").array
+    if kind == FLOAT:
+        try:
+            return np.array(values, dtype=np.float64)   # None -> nan, "1.85" parses too
+        except (TypeError, ValueError):
+            return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy()
+    if kind == BOOL:
+        return pd.array(values, dtype="boolean")
+    if kind == TS:
+        return pd.to_datetime(pd.Series(values, dtype=object), utc=True, errors="coerce", format="ISO8601").array
+    if kind == DATE:
+        return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce", format="ISO8601").array
+    raise ValueError(f"unknown kind {kind!r}")
+
+
+class Spec:
+    """Declared columns: (path, column[, kind]) tuples, or a bare column name for a constant."""
+
+    def __init__(self, *fields):
+        self.columns, self.kinds, self.paths, self.consts = [], {}, {}, []
+        for f in fields:
+            if isinstance(f, str):
+                self.columns.append(f)
+                self.consts.append(f)
+                continue
+            path, col, kind = (*f, None) if len(f) == 2 else f
+            self.columns.append(col)
+            self.kinds[col] = kind
+            self.paths[col] = _parse(path)
+        self._extract = self._compile()
+
+    def _compile(self):
+        # the explode chain: every path must explode along (a prefix of) the deepest one
+        chains = {}
+        for col, toks in self.paths.items():
+            cut = max((i + 1 for i, t in enumerate(toks) if t == ("each",)), default=0)
+            chains[col] = toks[:cut]
+        deepest = max(chains.values(), key=len, default=())
+        for col, chain in chains.items():
+            if deepest[:len(chain)] != chain:
+                raise ValueError(f"{col}: explodes along {chain}, not along {deepest}")
+        # split the deepest chain into the segment leading to each level's list
+        segments, start = [], 0
+        for i, t in enumerate(deepest):
+            if t == ("each",):
+                segments.append(deepest[start:i])
+                start = i + 1
+        level_of = {col: sum(t == ("each",) for t in chain) for col, chain in chains.items()}
+
+        lines, names = [], {}
+        def resolve(level: int, toks: tuple, indent: str) -> str:
+            """Emit code resolving `toks` from the level's item; returns the variable holding it."""
+            var = f"x{level}"
+            for n in range(1, len(toks) + 1):
+                key = (level, toks[:n])
+                if key in names:
+                    var = names[key]
+                    continue
+                t, new = toks[n - 1], f"v{len(names)}"
+                if t[0] == "key":
+                    if len(t[1]) == 1:
+                        expr = f"{var}.get({t[1][0]!r}) if {var}.__class__ is dict else None"
+                    else:
+                        expr = f"_first({var}, {t[1]!r}) if {var}.__class__ is dict else None"
+                elif t[0] == "idx":
+                    expr = f"{var}[{t[1]}] if {var}.__class__ is list and len({var}) > {t[1]} else None"
+                else:   # pos
+                    expr = f"i{level}"
+                lines.append(f"{indent}{new} = {expr}")
+                names[key] = var = new
+            return var
+
+        lines.append("def _extract(records, cols):")
+        appends = {col: f"a{j}" for j, col in enumerate(self.paths)}
+        for j, col in enumerate(self.paths):
+            lines.append(f"    a{j} = cols[{j}].append")
+        lines.append("    for i0, x0 in enumerate(records):")
+        values = {}
+        for level in range(len(segments) + 1):
+            indent = "    " * (level + 2)
+            for col, toks in self.paths.items():
+                if level_of[col] == level:
+                    values[col] = resolve(level, toks[len(chains[col]):], indent)
+            if level < len(segments):
+                lst = resolve(level, segments[level], indent)
+                lines.append(f"{indent}for i{level + 1}, x{level + 1} in "
+                             f"enumerate({lst} if {lst}.__class__ is list else ()):")
+        indent = "    " * (len(segments) + 2)
+        for col in self.paths:
+            lines.append(f"{indent}{appends[col]}({values[col]})")
+        self.source = "\n".join(lines) + "\n"
+        cols = ", ".join(self.paths)
+        filename = f"<flatten.Spec {next(_SPEC_IDS)}: {cols if len(cols) <= 60 else cols[:57] + '...'}>"
+        linecache.cache[filename] = (len(self.source), None, self.source.splitlines(True), filename)
+        ns = {"_first": _first}
+        exec(compile(self.source, filename, "exec"), ns)
+        return ns["_extract"]
+
+    def columns_of(self, records) -> dict[str, list]:
+        """Raw extracted values, one list per path column."""
+        cols = [[] for _ in self.paths]
+        self._extract(records or (), cols)
+        return dict(zip(self.paths, cols))
+
+
+def prefixed(prefix: str, fields, **bind) -> list:
+    """
+    Re-root relative fields under `prefix` (e.g. 'players[].'). Constants stay constants,
+    unless `bind` maps them to an absolute (path, kind), e.g. fixture_id=("fixture.id", INT).
+    """
+    out = []
+    for f in fields:
+        if isinstance(f, str):
+            out.append((bind[f][0], f, bind[f][1]) if f in bind else f)
+        else:
+            out.append((prefix + f[0], *f[1:]))
+    return out
+
+
+def flatten(spec: Spec, records, **consts) -> pd.DataFrame:
+    """One DataFrame from `records` following `spec`; `consts` fill the bare-name columns."""
+    raw = spec.columns_of(records)
+    n = len(next(iter(raw.values()))) if raw else len(records or ())
+    # constants go in as scalars, pandas broadcasts them without inferring a list per column
+    data = {col: _convert(raw[col], spec.kinds[col]) if col in raw else consts[col] for col in spec.columns}
+    return pd.DataFrame(data, index=pd.RangeIndex(n))
+
+
+def _arrow(values: list, kind):
+    if kind in (INT, FLOAT, BOOL):
+        try:
+            return pa.array(values, {INT: pa.int64(), FLOAT: pa.float64(), BOOL: pa.bool_()}[kind])
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # "1.85", junk strings: the pandas conversion, NaN -> null
+            return pa.array(_convert(values, kind), from_pandas=True)
+    if kind in (TS, DATE) or callable(kind):
+        return pa.array(_convert(values, kind), from_pandas=True)
+    try:
+        return pa.array(values, None if kind is None else pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # mixed scalars (an id sent as 7 and as "7")
+        return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def flatten_arrow(spec: Spec, records, **consts):
+    """
+    flatten() as a pyarrow Table, straight from the extracted lists (no DataFrame in between).
+    A DataFrame from flatten() when pyarrow isn't installed; the warehouse writers take both.
+    """
+    if pa is None:
+        return flatten(spec, records, **consts)
+    raw = spec.columns_of(records)
+    n = len(next(iter(raw.values()))) if raw else len(records or ())
+    data = {col: _arrow(raw[col], spec.kinds[col]) if col in raw
+            else pa.nulls(n) if consts[col] is None else pa.array([consts[col]] * n)
+            for col in spec.columns}
+    return pa.table(data)
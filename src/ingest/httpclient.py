@@ -0,0 +1,167 @@
+"""
+Shared, pooled HTTP clients for every provider (API-Football, The Odds API, OpenLigaDB).
+
+One long-lived httpx.Client per provider keeps TLS connections warm (keep-alive, HTTP/2
+when the `h2` package is installed) with a per-host connection cap. `request` adds the
+unified retry/backoff: 5xx and transport errors back off exponentially, 429s honour
+Retry-After through the provider's limiter, and every call the provider bills is recorded in the
+quota ledger: a success, or another 4xx that reports the provider's quota headers (never 429s/5xx).
+"""
+from __future__ import annotations
+import importlib.util, os, threading, time
+import httpx
+from . import quota, decode
+from .ratelimit import TokenBucket, retry_after_seconds
+
+API_FOOTBALL = "api-football"
+ODDS = "theoddsapi"
+OPENLIGADB = "openligadb"
+
+# overridable so the whole pipeline can run against a stand-in server (bench/standin.py)
+API_FOOTBALL_BASE = os.getenv("API_FOOTBALL_BASE", "https://v3.football.api-sports.io")
+ODDS_BASE = os.getenv("ODDS_BASE", "https://api.the-odds-api.com/v4")
+OLDB_BASE = os.getenv("OLDB_BASE", "https://api.openligadb.de")
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+TIMEOUT = 30.0
+RETRIES = 5
+BACKOFF = 0.4          # seconds, doubled on each retry
+RETRY_STATUS = {500, 502, 503, 504}
+USER_AGENT = "sports-betting/0.1"
+
+def _api_football_headers():
+    key = os.getenv("API_FOOTBALL_KEY") or os.getenv("APIFOOTBALL_KEY")
+    return {"x-apisports-key": key} if key else {}
+
+# name -> base_url, headers (callable, read at client creation), max connections,
+# limiter shared by every caller of that provider, quota ledger provider, headers only a billed call carries
+PROVIDERS = {
+    API_FOOTBALL: {
+        "base_url": API_FOOTBALL_BASE,
+        "headers": _api_football_headers,
+        "max_connections": int(os.getenv("API_FOOTBALL_WORKERS", "8")) + 2,
+        "limiter": TokenBucket(int(os.getenv("API_FOOTBALL_RATE_PER_MIN", "300"))),  # Pro plan; headers override it
+        "quota": quota.API_FOOTBALL,
+        "quota_headers": ("x-ratelimit-requests-remaining",),
+    },
+    ODDS: {
+        "base_url": ODDS_BASE,
+        "headers": dict,
+        "max_connections": 4,
+        "limiter": None,
+        "quota": quota.ODDS,
+        "quota_headers": ("x-requests-last", "x-requests-used"),
+    },
+    OPENLIGADB: {
+        "base_url": OLDB_BASE,
+        "headers": dict,
+        "max_connections": 4,
+        "limiter": None,
+        "quota": None,
+        "quota_headers": (),
+    },
+}
+
+_clients: dict[str, httpx.Client] = {}
+_lock = threading.Lock()
+
+
+def _client_kwargs(name: str) -> dict:
+    cfg = PROVIDERS[name]
+    n = cfg["max_connections"]
+    return dict(
+        base_url=cfg["base_url"],
+        headers={"User-Agent": USER_AGENT, **cfg["headers"]()},
+        timeout=TIMEOUT,
+        http2=HTTP2,
+        limits=httpx.Limits(max_connections=n, max_keepalive_connections=n, keepalive_expiry=60),
+    )
+
+
+def client(name: str) -> httpx.Client:
+    """Pooled client for `name`, created on first use and shared across threads."""
+    with _lock:
+        c = _clients.get(name)
+        if c is None or c.is_closed:
+            c = _clients[name] = httpx.Client(**_client_kwargs(name))
+        return c
+
+
+def close_all():
+    with _lock:
+        for c in _clients.values():
+            c.close()
+        _clients.clear()
+
+
+def set_base_url(name: str, url: str):
+    """Point provider `name` at another server from now on (drops its pooled clients)."""
+    with _lock:
+        PROVIDERS[name]["base_url"] = url
+        c = _clients.pop(name, None)
+    if c is not None:
+        c.close()
+
+
+def limiter(name: str) -> TokenBucket | None:
+    return PROVIDERS[name]["limiter"]
+
+
+def _billed(name: str, r: httpx.Response) -> bool:
+    if r.is_success:
+        return True
+    if r.status_code == 429 or r.status_code >= 500:
+        return False    # repeated by the retry loop
+    return any(h in r.headers for h in PROVIDERS[name]["quota_headers"])
+
+
+def _after_response(name: str, path: str, r: httpx.Response):
+    cfg = PROVIDERS[name]
+    if cfg["quota"] and _billed(name, r):
+        quota.get_ledger().record(cfg["quota"], path, r.headers)
+    if cfg["limiter"] is not None:
+        cfg["limiter"].update_from_headers(r.headers)
+
+
+def _retry_delay(name: str, r: httpx.Response | None, attempt: int) -> float | None:
+    """Seconds to wait before the next attempt, or None when `r` is final."""
+    if r is not None and r.status_code == 429:
+        wait = retry_after_seconds(r.headers)
+        lim = limiter(name)
+        if lim is not None:
+            lim.pause(wait)     # stop every other caller of this provider too
+            return 0.0
+        return wait
+    if r is None or r.status_code in RETRY_STATUS:
+        return BACKOFF * (2 ** attempt)
+    return None
+
+
+def request(name: str, path: str, params: dict | None = None, retries: int = RETRIES,
+            timeout: float | None = None) -> httpx.Response:
+    """GET `path` on provider `name`. Returns the last response; raises on repeated transport errors."""
+    timeout = httpx.USE_CLIENT_DEFAULT if timeout is None else timeout
+    lim = limiter(name)
+    for attempt in range(retries):
+        if lim is not None:
+            lim.acquire()
+        try:
+            r = client(name).get(path, params=params, timeout=timeout)
+        except httpx.TransportError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(BACKOFF * (2 ** attempt))
+            continue
+        _after_response(name, path, r)
+        delay = _retry_delay(name, r, attempt)
+        if delay is None or attempt == retries - 1:
+            return r
+        time.sleep(delay)
+    return r
+
+
+def get_json(name: str, path: str, params: dict | None = None, retries: int = RETRIES,
+             timeout: float | None = None):
+    r = request(name, path, params, retries=retries, timeout=timeout)
+    r.raise_for_status()
+    return decode.loads(r.content)
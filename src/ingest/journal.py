@@ -0,0 +1,134 @@
+"""
+Checkpoint journal for long backfills.
+
+`ingest_journal` gets one row per (league, season, stage, item) as soon as the item's data is
+written, in the same transaction as its upserts. An item is a page ("page:3") or a fixture
+("fixture:1035046"); item "*" marks the whole stage as done and "#total" holds how many items
+the stage planned. A crashed run (exception, Ctrl-C, quota exhausted) leaves the journal behind,
+and a run with resume=True skips everything it already holds. A run that completes clears it.
+"""
+from __future__ import annotations
+from datetime import datetime, timezone
+import pandas as pd
+from ..warehouse.writer import atomic, transaction
+from . import quota
+
+DONE = "*"
+TOTAL = "#total"
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def ensure_journal(con):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_journal (
+        league_id INTEGER,
+        season INTEGER,
+        stage VARCHAR,
+        item VARCHAR,          -- page:N / fixture:ID, '*' = stage done, '#total' = items planned
+        n_rows INTEGER,
+        done_ts TIMESTAMP,
+        PRIMARY KEY (league_id, season, stage, item)
+    );
+    """)
+
+
+def _mark(con, league_id, season, stage, item, n_rows=None):
+    con.execute("""
+        INSERT INTO ingest_journal VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (league_id, season, stage, item) DO UPDATE SET
+            n_rows = excluded.n_rows, done_ts = excluded.done_ts
+    """, [league_id, season, stage, item, n_rows, _now()])
+
+
+def clear(con):
+    con.execute("DELETE FROM ingest_journal")
+
+
+class Checkpoint:
+    """Journal handle for one (league, season, stage); `done` holds the items already committed."""
+
+    def __init__(self, con, league_id: int, season: int, stage: str):
+        self.con, self.league_id, self.season, self.stage = con, league_id, season, stage
+        rows = con.execute("""
+            SELECT item, n_rows FROM ingest_journal WHERE league_id = ? AND season = ? AND stage = ?
+        """, [league_id, season, stage]).fetchall()
+        marks = dict(rows)
+        self.finished = DONE in marks
+        self.total = marks.pop(TOTAL, None)
+        marks.pop(DONE, None)
+        self.done = set(marks)
+
+    def set_total(self, n: int):
+        if n != self.total:
+            self.total = n
+            _mark(self.con, self.league_id, self.season, self.stage, TOTAL, n)
+
+    def commit(self, upsert, writes, item) -> dict:
+        """
+        Upsert every (table, df, keys) in `writes` and journal `item` (or a list of items, e.g. the
+        fixtures of one batched call), all in one transaction. Returns rows written per table.
+        """
+        items = [item] if isinstance(item, str) else list(item)
+        def _tx(con):
+            with transaction(con):
+                out = {table: upsert(con, table, df, keys) for table, df, keys in writes}
+                n = sum(out.values()) if len(items) == 1 else None
+                for it in items:
+                    _mark(con, self.league_id, self.season, self.stage, it, n)
+            return out
+        out = atomic(self.con, _tx)
+        self.done.update(items)
+        return out
+
+    def finish(self, n_rows: int | None = None):
+        _mark(self.con, self.league_id, self.season, self.stage, DONE, n_rows)
+        self.finished = True
+
+
+def page_args(ckpt: Checkpoint | None) -> dict:
+    """iter_pages kwargs that skip the pages a checkpoint already holds."""
+    if ckpt is None:
+        return {}
+    return {"skip": {int(i.split(":")[1]) for i in ckpt.done if i.startswith("page:")},
+            "total": ckpt.total, "on_total": ckpt.set_total}
+
+
+def write(con, upsert, writes, ckpt: Checkpoint | None = None, item=None) -> dict:
+    """Upsert `writes`; through the checkpoint (one transaction with its journal row) when there is one."""
+    if ckpt is not None:
+        return ckpt.commit(upsert, writes, item)
+    return {table: upsert(con, table, df, keys) for table, df, keys in writes}
+
+
+def remaining(con, planned, cost) -> pd.DataFrame:
+    """
+    What a resumed run still has to do. planned: (league_id, season, stage) triples;
+    cost(con, stage, ckpt) estimates the requests left for a stage (None = unknown until page 1).
+    """
+    rows = []
+    for league_id, season, stage in planned:
+        ckpt = Checkpoint(con, league_id, season, stage)
+        if ckpt.finished:
+            continue
+        rows.append({"league_id": league_id, "season": season, "stage": stage, "done": len(ckpt.done),
+                     "total": ckpt.total, "requests": cost(con, stage, ckpt)})
+    return pd.DataFrame(rows, columns=["league_id", "season", "stage", "done", "total", "requests"])
+
+
+def pages_left(ckpt: Checkpoint) -> int | None:
+    return None if ckpt.total is None else max(0, ckpt.total - len(ckpt.done))
+
+
+def print_remaining(df: pd.DataFrame, provider: str = quota.API_FOOTBALL):
+    if df.empty:
+        print("[resume] nothing left to do")
+        return
+    print(df.to_string(index=False))
+    known = df["requests"].dropna()
+    unknown = len(df) - len(known)
+    print(f"[resume] {len(df)} stages left, ~{int(known.sum())} requests"
+          + (f" + {unknown} stages of unknown size (at least 1 each)" if unknown else "")
+          + f"; {quota.get_ledger().remaining(provider)} left in the {provider} budget")
@@ -1,12 +1,15 @@
 from __future__ import annotations
-import requests
+import numpy as np
 import pandas as pd
 # from src.warehouse.io import Warehouse
 from datetime import timezone
 from typing import Dict, Any, List
 from .openligadb import fetch_fixtures_openligadb
-from .odds_theoddsapi import fetch_h2h_odds_snapshot, fetch_h2h
+from .odds_theoddsapi import fetch_h2h_odds_snapshot, fetch_h2h, normalize_odds, odds_wide
 from ..warehouse.io import DB
+from ..warehouse import odds_history
+from . import httpclient, teams
+from .flatten import Spec, flatten, INT, TS
 import os
 from dotenv import load_dotenv
 
@@ -34,6 +37,7 @@ def _coerce_odds_dtypes(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 def ingest_odds_snapshot(sport_key) -> dict:
+    db = DB()   # DB_PATH: the warehouse the ledger, fact_fixtures and the feature builders use
     payload = fetch_h2h(sport_key=sport_key)
     odds = build_odds_df_from_theoddsapi(payload, league_key="soccer_germany_bundesliga")
     odds = _coerce_odds_dtypes(odds)
@@ -42,9 +46,11 @@ def ingest_odds_snapshot(sport_key) -> dict:
     missing = required - set(odds.columns)
     if missing:
         raise ValueError(f"odds df missing required cols: {missing}")
-    db = DB()
+    # fixture_id from fact_fixtures when the API-Football warehouse shares the file
+    odds["fixture_id"] = teams.resolve_events(db.con, odds)["fixture_id"]
     n = db.insert_df("odds", odds)
-    return {"odds_rows": int(n)}
+    moved = odds_history.record(db.con, odds_history.theoddsapi_rows(odds))
+    return {"odds_rows": int(n), "history_rows": int(moved)}
 
 # def ingest_matches_openligadb():
 #     db = DB()
@@ -62,7 +68,6 @@ def ingest_odds_snapshot(sport_key) -> dict:
 #     return {"matches": n1}
 
 # src/ingest/loaders.py
-import requests
 import pandas as pd
 
 def ingest_matches_openligadb(league="bl1", season="2023"):
@@ -70,85 +75,14 @@ def ingest_matches_openligadb(league="bl1", season="2023"):
        Returns: {"matches": <rows_inserted>, "dropped": <rows_dropped>}
     """
     def _fetch(league, season_key):
-        url = f"https://api.openligadb.de/getmatchdata/{league}/{season_key}"
-        r = requests.get(url, timeout=20, headers={"User-Agent": "sports-betting/0.1"})
-        r.raise_for_status()
-        return r.json()
-
-    def _lower_keys(d):
-        return {k.lower(): v for k, v in d.items()} if isinstance(d, dict) else {}
+        return httpclient.get_json(httpclient.OPENLIGADB, f"/getmatchdata/{league}/{season_key}", timeout=20)
 
     # OpenLigaDB BL1 wants start year like "2023"
     data = _fetch(league, str(season))
     if not isinstance(data, list) or not data:
         raise RuntimeError(f"No data for league='{league}', season='{season}'")
 
-    rows = []
-    dropped_no_id = 0
-    dropped_no_teams = 0
-
-    for m in data:
-        ml = _lower_keys(m)
-
-        match_id = ml.get("matchid")
-        if match_id in (None, ""):
-            dropped_no_id += 1
-            continue
-
-        # teams
-        t1 = _lower_keys(ml.get("team1") or {})
-        t2 = _lower_keys(ml.get("team2") or {})
-        home_id = t1.get("teamid")
-        away_id = t2.get("teamid")
-        if home_id in (None, "") or away_id in (None, ""):
-            dropped_no_teams += 1
-            continue
-
-        # kickoff
-        kickoff = ml.get("matchdatetimeutc") or ml.get("matchdatetime")
-        kickoff_ts = pd.to_datetime(kickoff, utc=True, errors="coerce")
-
-        # venue (best-effort)
-        loc = _lower_keys(ml.get("location") or {})
-        stadium = _lower_keys(loc.get("stadium") or {})
-        venue = stadium.get("name") or loc.get("locationstadium")
-
-        # referee usually not present in BL1 feed; leave None
-        referee = None
-
-        # status
-        is_finished = bool(ml.get("matchisfinished"))
-        status = "FT" if is_finished else "NS"
-        if not is_finished and kickoff_ts is not pd.NaT:
-            try:
-                if pd.Timestamp.utcnow() >= kickoff_ts:
-                    status = "LIVE"
-            except Exception:
-                pass
-
-        # numeric season (start year)
-        try:
-            season_num = int(str(season)[:4])
-        except Exception:
-            season_num = None
-
-        rows.append({
-            "match_id":   match_id,
-            "league_id":  ml.get("leagueid"),   # optional, can be None
-            "season":     season_num,
-            "kickoff_ts": kickoff_ts,
-            "home_id":    home_id,
-            "away_id":    away_id,
-            "venue":      venue,
-            "referee":    referee,
-            "status":     status,
-            "join_key":   f"{home_id}||{away_id}",
-        })
-
-    df = pd.DataFrame(rows, columns=[
-        "match_id","league_id","season","kickoff_ts","home_id","away_id",
-        "venue","referee","status","join_key"
-    ])
+    df, dropped_no_id, dropped_no_teams = openligadb_matches_frame(data, season)
 
     total = len(data)
     valid = len(df)
@@ -164,72 +98,60 @@ def ingest_matches_openligadb(league="bl1", season="2023"):
     n_inserted = db.insert_df("matches", df)
     return {"matches": int(n_inserted), "dropped": int(dropped_no_id + dropped_no_teams)}
 
-def _normalize_team(s: str) -> str:
-    # Make sure these names match your fixtures' naming
-    # Add mappings like {"Bayern Munich":"FC Bayern München"} if needed.
-    return (s or "").strip()
-
-def _mk_join_key(commence_iso: str, home: str, away: str) -> str:
-    # date-only (UTC) + normalized team names
-    dt = pd.to_datetime(commence_iso, utc=True)
-    d = dt.strftime("%Y-%m-%d")
-    return f"{d}|{_normalize_team(home)}|{_normalize_team(away)}"
+# OpenLigaDB answers camelCase (older dumps PascalCase); `a|A` takes whichever is there
+OLDB_MATCH_SPEC = Spec(
+    ("matchID|MatchID|matchId", "match_id", INT),
+    ("leagueId|LeagueId|leagueID|LeagueID", "league_id"),   # optional, can be None
+    ("matchDateTimeUTC|MatchDateTimeUTC|matchDateTime|MatchDateTime", "kickoff_ts", TS),
+    ("team1|Team1.teamId|TeamId|teamID|TeamID", "home_id", INT),
+    ("team2|Team2.teamId|TeamId|teamID|TeamID", "away_id", INT),
+    ("location|Location.stadium|Stadium.name|Name", "_stadium"),
+    ("location|Location.locationStadium|LocationStadium", "_location"),
+    ("matchIsFinished|MatchIsFinished", "_finished"),
+)
+
+def openligadb_matches_frame(data: list, season) -> tuple[pd.DataFrame, int, int]:
+    """/getmatchdata payload -> (matches frame, dropped without id, dropped without teams)."""
+    df = flatten(OLDB_MATCH_SPEC, data)
+    no_id = df["match_id"].isna()
+    no_teams = ~no_id & (df["home_id"].isna() | df["away_id"].isna())
+    df = df[~no_id & ~no_teams].reset_index(drop=True)
+
+    # numeric season (start year)
+    try:
+        season_num = int(str(season)[:4])
+    except Exception:
+        season_num = None
+    df["season"] = pd.array([season_num] * len(df), dtype="Int64")
+
+    # venue (best-effort); referee usually not present in BL1 feed
+    df["venue"] = df.pop("_stadium").where(lambda v: v.notna() & (v != ""), df.pop("_location"))
+    df["referee"] = None
+
+    finished = df.pop("_finished").astype(bool)
+    started = df["kickoff_ts"].notna() & (df["kickoff_ts"] <= pd.Timestamp.utcnow())
+    df["status"] = np.select([finished, started], ["FT", "LIVE"], "NS")
+    df["join_key"] = df["home_id"].astype(str) + "||" + df["away_id"].astype(str)
+
+    df = df[["match_id","league_id","season","kickoff_ts","home_id","away_id",
+             "venue","referee","status","join_key"]]
+    return df, int(no_id.sum()), int(no_teams.sum())
 
 def build_odds_df_from_theoddsapi(payload: List[Dict[str, Any]], league_key: str | None = None) -> pd.DataFrame:
-    rows = []
-    for ev in payload:
-        event_id      = ev.get("id")
-        sport_key     = ev.get("sport_key")
-        sport_title   = ev.get("sport_title")
-        commence_time = ev.get("commence_time")   # ISO8601
-        home_team     = ev.get("home_team")
-        away_team     = ev.get("away_team")
-        join_key      = _mk_join_key(commence_time, home_team, away_team)
-
-        # Each bookmaker…
-        for bm in ev.get("bookmakers", []):
-            bookmaker   = bm.get("title")
-            last_update = bm.get("last_update")   # ISO8601
-            # Find H2H market (3-way) — usually key == "h2h"
-            for market in bm.get("markets", []):
-                mkey = market.get("key")  # "h2h"
-                if mkey != "h2h":
-                    continue
-
-                # Normalize outcomes to home/draw/away
-                price_home, price_draw, price_away = None, None, None
-                for out in market.get("outcomes", []):
-                    name  = out.get("name")   # "Home" / "Away" / "Draw" (provider-dependent)
-                    price = out.get("price")
-                    # Be defensive about naming; map by matching team names too
-                    if name in ("Home", home_team):
-                        price_home = price
-                    elif name in ("Away", away_team):
-                        price_away = price
-                    elif name in ("Draw", "Tie", "X"):
-                        price_draw = price
-
-                rows.append({
-                    "event_id": event_id,
-                    "sport_key": sport_key,
-                    "sport_title": sport_title,
-                    "league_key": league_key,
-                    "market": mkey,
-                    "bookmaker": bookmaker,
-                    "last_update": pd.to_datetime(last_update, utc=True),
-                    "commence_time": pd.to_datetime(commence_time, utc=True),
-                    "home_team": home_team,
-                    "away_team": away_team,
-                    "price_home": float(price_home) if price_home is not None else None,
-                    "price_draw": float(price_draw) if price_draw is not None else None,
-                    "price_away": float(price_away) if price_away is not None else None,
-                    "join_key": join_key,
-                })
-
-    df = pd.DataFrame(rows)
+    # H2H market (3-way), pivoted out of the long normalizer: one row per event x bookmaker
+    wide = odds_wide(normalize_odds(payload, markets=("h2h",)))
+    if wide.empty:
+        return pd.DataFrame()
+    df = pd.DataFrame({
+        "event_id": wide["event_id"], "sport_key": wide["sport_key"], "sport_title": wide["sport_title"],
+        "league_key": league_key, "market": wide["market"], "bookmaker": wide["book_title"],
+        "last_update": wide["last_update"], "commence_time": wide["commence_time"],
+        "home_team": wide["home_team"], "away_team": wide["away_team"],
+        "price_home": wide["price_home"], "price_draw": wide["price_draw"], "price_away": wide["price_away"],
+    })
+    df["join_key"] = teams.join_key(df["commence_time"], df["home_team"], df["away_team"])
     # (Optional) add season if you need it for joins
-    if not df.empty:
-        df["season"] = df["commence_time"].dt.year.astype("Int64")
+    df["season"] = df["commence_time"].dt.year.astype("Int64")
     return df
 
 
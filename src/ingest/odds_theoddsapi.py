@@ -1,41 +1,32 @@
 """
-The Odds API v4 client for H2H odds snapshots.
-Builds a fuzzy join key (date + normalized team names).
+The Odds API v4 client for odds snapshots.
+normalize_odds flattens a response into one long row per outcome (all markets and regions);
+odds_wide and odds_snapshot_frame are views over it. event_join_key is teams.join_key (date + normalized
+team names); teams.resolve_events maps events to fixture_id.
 """
-import os, re, httpx, pandas as pd
-import requests
+import os, httpx, numpy as np, pandas as pd
 from datetime import datetime, timezone
 from typing import Optional
 from dotenv import load_dotenv
+from . import httpclient, decode, teams
+from .flatten import Spec
+from .quota import get_ledger, odds_call_cost, ODDS
 
 load_dotenv()
 THEODDSAPI_KEY = os.getenv("THEODDSAPI_KEY")
-ODDS_BASE = "https://api.the-odds-api.com/v4"
-
-def _norm_team(name: str) -> str:
-    if not name: return ""
-    s = name.lower()
-    s = re.sub(r"[^a-z0-9]+", " ", s).strip()
-    return re.sub(r"\s+", " ", s.replace(" fc","").replace(" sc",""))
-
-def _join_key(commence_iso: str, home: str, away: str) -> str:
-    try:
-        dt = datetime.fromisoformat(commence_iso.replace("Z","+00:00")).strftime("%Y-%m-%d")
-    except Exception:
-        dt = ""
-    return f"{dt}|{_norm_team(home)}|{_norm_team(away)}"
+ODDS_BASE = httpclient.ODDS_BASE
 
 def _get(path: str, params: dict):
     if not THEODDSAPI_KEY:
         raise RuntimeError("THEODDSAPI_KEY not set. Put it in .env")
-    with httpx.Client(base_url=ODDS_BASE, timeout=30) as client:
-        r = client.get(path, params={"apiKey": THEODDSAPI_KEY, **params})
-        try:
-            r.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            print("TheOddsAPI error:", e.response.status_code, e.response.text)
-            raise
-        return r.json()
+    get_ledger().check(ODDS, odds_call_cost(params.get("regions", ""), params.get("markets", "")))
+    r = httpclient.request(httpclient.ODDS, path, {"apiKey": THEODDSAPI_KEY, **params})
+    try:
+        r.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        print("TheOddsAPI error:", e.response.status_code, e.response.text)
+        raise
+    return decode.loads(r.content)
 
 def _api_key() -> str:
     k = os.getenv("THE_ODDS_API_KEY") or os.getenv("ODDS_API_KEY")
@@ -56,7 +47,7 @@ def fetch_h2h(
     Each event has: id, sport_key, sport_title, commence_time, home_team, away_team, bookmakers[…]
     """
     key = _api_key()
-    url = f"{ODDS_BASE}/sports/{sport_key}/odds"
+    path = f"/sports/{sport_key}/odds"
     params = {
         "apiKey": key,
         "regions": regions,
@@ -64,11 +55,12 @@ def fetch_h2h(
         "oddsFormat": odds_format,
         "dateFormat": date_format,
     }
-    r = requests.get(url, params=params, timeout=timeout)
+    get_ledger().check(ODDS, odds_call_cost(regions, markets))
+    r = httpclient.request(httpclient.ODDS, path, params, timeout=timeout)
     if r.status_code != 200:
         # Keep it graceful so your pipeline doesn’t crash without context
         raise RuntimeError(f"The Odds API error {r.status_code}: {r.text}")
-    data = r.json()
+    data = decode.loads(r.content)
     # Always return a list
     return data if isinstance(data, list) else []
 
@@ -86,37 +78,138 @@ def fetch_h2h_odds_snapshot(
         "dateFormat": "iso",
         "oddsFormat": "decimal",
     })
-    rows, pulled_ts = [], datetime.now(timezone.utc)
-    for ev in events:
-        event_id = ev.get("id")
-        home     = ev.get("home_team")
-        away     = ev.get("away_team")
-        commence = ev.get("commence_time")
-        jkey     = _join_key(commence, home, away)
-        for book in ev.get("bookmakers", []):
-            book_key = book.get("key")
-            for mk in book.get("markets", []):
-                if mk.get("key") != "h2h":
-                    continue
-                for o in mk.get("outcomes", []):
-                    name, price = o.get("name"), o.get("price")
-                    norm = None
-                    if name in {"home","Home","1",home}: norm = "home"
-                    elif name in {"draw","Draw","X"}:  norm = "draw"
-                    elif name in {"away","Away","2",away}: norm = "away"
-                    else:
-                        if name and home and name.lower()==home.lower(): norm="home"
-                        if name and away and name.lower()==away.lower(): norm="away"
-                    if norm is None: continue
-                    rows.append({
-                        "event_id": str(event_id),
-                        "match_id": None,
-                        "book": book_key,
-                        "market": "h2h",
-                        "outcome": norm,
-                        "price_dec": float(price) if price is not None else None,
-                        "ts": pulled_ts,
-                        "event_join_key": jkey,
-                        "is_closing": False,
-                    })
-    return pd.DataFrame(rows)
+    return odds_snapshot_frame(events, datetime.now(timezone.utc), markets.split(","))
+
+# one row per (event, bookmaker, market, outcome): every market and region of a response
+ODDS_SPEC = Spec(
+    ("#", "_event"),
+    ("bookmakers[].key", "book"),
+    ("bookmakers[].title", "book_title"),
+    ("bookmakers[].last_update", "_book_update"),
+    ("bookmakers[].markets[].key", "market"),
+    ("bookmakers[].markets[].last_update", "_market_update"),
+    ("bookmakers[].markets[].outcomes[].name", "name"),
+    ("bookmakers[].markets[].outcomes[].point", "point"),        # totals / spreads line
+    ("bookmakers[].markets[].outcomes[].price", "price_dec"),
+)
+# what a snapshot row needs: no titles or update times
+_SNAPSHOT_SPEC = Spec(
+    ("#", "_event"),
+    ("bookmakers[].key", "book"),
+    ("bookmakers[].markets[].key", "market"),
+    ("bookmakers[].markets[].outcomes[].name", "name"),
+    ("bookmakers[].markets[].outcomes[].point", "point"),
+    ("bookmakers[].markets[].outcomes[].price", "price_dec"),
+)
+SIDES = ("home", "draw", "away")
+# outcome names that aren't team names; anything else keeps its lowercased name (over, under, yes, no)
+_SIDE_TOKENS = {"home": "home", "1": "home", "draw": "draw", "x": "draw", "tie": "draw", "away": "away", "2": "away"}
+
+def _sides(names, home_lc, away_lc) -> np.ndarray:
+    """Outcome side: compare the names with the event's team columns, then the generic tokens."""
+    # one pass of dict lookups: a call is a few hundred outcomes, too few for np.char to pay off
+    out = np.empty(len(names), dtype=object)
+    out[:] = [None if x is None else
+              "home" if (n := str(x).lower()) == h else "away" if n == a else _SIDE_TOKENS.get(n, n)
+              for x, h, a in zip(names, home_lc, away_lc)]
+    return out
+
+def normalize_odds(events: list[dict], markets=None) -> pd.DataFrame:
+    """
+    Long format, one row per outcome: event_id, sport_key, sport_title, commence_time, home_team,
+    away_team, event_join_key, book, book_title, market, outcome (home/draw/away, or the lowercased
+    name: over/under/yes/no), name, point, price_dec, last_update. `markets`: keep only these keys.
+    """
+    data = _normalized(events, markets)
+    return pd.DataFrame(data, index=pd.RangeIndex(len(data["book"])))
+
+def _normalized(events: list[dict], markets=None, snapshot: bool = False) -> dict:
+    """normalize_odds' columns as arrays; snapshot=True: only those odds_snapshot_frame keeps."""
+    c = (_SNAPSHOT_SPEC if snapshot else ODDS_SPEC).columns_of(events)
+    ev = np.array(c["_event"], dtype=np.intp)
+    keep = np.flatnonzero(np.isin(np.array(c["market"], dtype=object), list(markets))) if markets else None
+    def col(name, dtype=object):
+        a = np.array(c[name], dtype=dtype)    # float: None -> nan
+        return a if keep is None else a[keep]
+    if keep is not None:
+        ev = ev[keep]
+
+    # event-level fields: converted once per event, then gathered per outcome
+    home = [e.get("home_team") for e in events]
+    away = [e.get("away_team") for e in events]
+    commence = [e.get("commence_time") for e in events]
+    lc = lambda names: np.array([x.lower() if isinstance(x, str) else "\0" for x in names] or [""], dtype=object)
+    names = col("name")
+    outcome = _sides(names, lc(home).take(ev), lc(away).take(ev))
+    if snapshot:
+        keys = np.array([teams.event_join_key(*x) for x in zip(commence, home, away)], dtype=object)
+        ids = np.array([str(e.get("id")) for e in events], dtype=object)
+        return {"event_id": ids.take(ev), "event_join_key": keys.take(ev), "book": col("book"),
+                "market": col("market"), "outcome": outcome, "point": col("point", np.float64),
+                "price_dec": col("price_dec", np.float64)}
+    kickoff = pd.to_datetime(pd.Series(commence, dtype=object), utc=True, errors="coerce", format="ISO8601")
+    per_event = {
+        "event_id": np.array([str(e.get("id")) for e in events], dtype=object),
+        "sport_key": np.array([e.get("sport_key") for e in events], dtype=object),
+        "sport_title": np.array([e.get("sport_title") for e in events], dtype=object),
+        "commence_time": kickoff.array,
+        "home_team": np.array(home, dtype=object),
+        "away_team": np.array(away, dtype=object),
+        "event_join_key": teams.join_key(kickoff, pd.Series(home, dtype=object), pd.Series(away, dtype=object)).to_numpy(),
+    }
+    data = {k: v.take(ev) for k, v in per_event.items()}
+
+    updated = [m or b for m, b in zip(col("_market_update"), col("_book_update"))]
+    data.update({
+        "book": col("book"),
+        "book_title": col("book_title"),
+        "market": col("market"),
+        "outcome": outcome,
+        "name": names,
+        "point": col("point", np.float64),
+        "price_dec": col("price_dec", np.float64),
+        "last_update": pd.to_datetime(pd.Series(updated, dtype=object), utc=True, errors="coerce",
+                                      format="ISO8601").array,
+    })
+    return data
+
+def odds_wide(long: pd.DataFrame, market: str = "h2h") -> pd.DataFrame:
+    """Pivot view of normalize_odds: one row per (event, book) with price_home/draw/away."""
+    long = long[long["market"] == market]
+    keys = ["event_id", "book", "market"]
+    sides = long[long["outcome"].isin(SIDES)].drop_duplicates(keys + ["outcome"], keep="last")
+    prices = sides.pivot(index=keys, columns="outcome", values="price_dec")
+    prices = prices.reindex(columns=list(SIDES)).add_prefix("price_")
+    prices.columns.name = None
+    return long.drop_duplicates(keys).drop(columns=["outcome", "name", "point", "price_dec"]) \
+               .join(prices, on=keys).reset_index(drop=True)
+
+def odds_snapshot_frame(events: list[dict], pulled_ts: datetime, markets=None) -> pd.DataFrame:
+    """
+    Rows of the `odds` snapshot table, stamped with `pulled_ts`: one per (event, book, market,
+    outcome). h2h keeps home/draw/away; lined markets fold the line into the outcome ('over 2.5').
+    """
+    # on the arrays, not a frame: a call is a few hundred rows, where each pandas op costs more than it saves
+    d = _normalized(events, markets, snapshot=True)
+    outcome, point = d["outcome"], d["point"]
+    side = (outcome == "home") | (outcome == "draw") | (outcome == "away")
+    keep = np.flatnonzero(side | (d["market"] != "h2h"))
+    outcome, point = outcome[keep], point[keep]
+    lined = ~np.isnan(point)
+    if lined.any():
+        outcome[lined] = [f"{o} {p:g}" for o, p in zip(outcome[lined], point[lined])]
+    return pd.DataFrame({
+        "event_id": d["event_id"][keep],
+        "match_id": None,
+        "book": d["book"][keep],
+        "market": d["market"][keep],
+        "outcome": outcome,
+        "price_dec": d["price_dec"][keep],
+        "ts": pulled_ts,
+        "event_join_key": d["event_join_key"][keep],
+        "is_closing": False,
+    }, index=pd.RangeIndex(len(keep)))
+
+def h2h_snapshot_frame(events: list[dict], pulled_ts: datetime) -> pd.DataFrame:
+    """One row per (event, book, outcome) of the h2h market, stamped with `pulled_ts`."""
+    return odds_snapshot_frame(events, pulled_ts, markets=("h2h",))
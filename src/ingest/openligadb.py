@@ -3,35 +3,16 @@ OpenLigaDB client for Bundesliga fixtures/results.
 Docs: https://www.openligadb.de/
 Example: /getmatchdata/bl1/2023
 """
-import os, re, httpx, pandas as pd, hashlib
+import os, pandas as pd, hashlib
 from datetime import datetime, timezone
 from dotenv import load_dotenv
+from . import httpclient, teams
 
 load_dotenv()
-OLDB_BASE   = "https://api.openligadb.de"
+OLDB_BASE   = httpclient.OLDB_BASE
 OLDB_LEAGUE = os.getenv("OLDB_LEAGUE", "bl1")
 OLDB_SEASON = os.getenv("OLDB_SEASON", "2023")
 
-def _norm_team(name: str) -> str:
-    if not name: return ""
-    s = name.lower()
-    s = re.sub(r"[^a-z0-9]+", " ", s).strip()
-    s = s.replace(" fc", "").replace(" sc", "")
-    return re.sub(r"\s+", " ", s)
-
-def _join_key(dt_iso: str, home: str, away: str) -> str:
-    date_str = ""
-    if dt_iso:
-        try:
-            date_str = datetime.fromisoformat(dt_iso.replace("Z","+00:00")).strftime("%Y-%m-%d")
-        except Exception:
-            # Some OLDB dumps use local time; try parsing without Z
-            try:
-                date_str = datetime.fromisoformat(dt_iso).strftime("%Y-%m-%d")
-            except Exception:
-                date_str = ""
-    return f"{date_str}|{_norm_team(home)}|{_norm_team(away)}"
-
 def _to_ts(dt_iso: str):
     if not dt_iso: return None
     for cand in (dt_iso, dt_iso.replace("Z","+00:00")):
@@ -47,11 +28,7 @@ def _hash64(s: str) -> int:
     return int(h, 16)
 
 def fetch_fixtures_openligadb(league_key: str = OLDB_LEAGUE, season: str = OLDB_SEASON) -> pd.DataFrame:
-    url = f"{OLDB_BASE}/getmatchdata/{league_key}/{season}"
-    with httpx.Client(timeout=30) as client:
-        r = client.get(url)
-        r.raise_for_status()
-        data = r.json()
+    data = httpclient.get_json(httpclient.OPENLIGADB, f"/getmatchdata/{league_key}/{season}")
 
     rows = []
     for m in data:
@@ -63,11 +40,8 @@ def fetch_fixtures_openligadb(league_key: str = OLDB_LEAGUE, season: str = OLDB_
         venue    = (m.get("Location") or {}).get("LocationCity")
         finished = bool(m.get("MatchIsFinished"))
 
-        jkey = _join_key(kickoff, team1, team2)
-        pk = int(match_id) if match_id is not None else _hash64(jkey or f"row-{len(rows)}")
-
         rows.append({
-            "match_id": pk,
+            "match_id": int(match_id) if match_id is not None else None,
             "league_id": None,
             "season": int(season) if str(season).isdigit() else None,
             "kickoff_ts": _to_ts(kickoff),
@@ -76,10 +50,16 @@ def fetch_fixtures_openligadb(league_key: str = OLDB_LEAGUE, season: str = OLDB_
             "venue": venue,
             "referee": None,
             "status": "FT" if finished else "NS",
-            "join_key": jkey,
+            "_home": team1,
+            "_away": team2,
         })
 
     df = pd.DataFrame(rows)
-    # sanity fix if join_key somehow empty: still ensure unique PKs
+    if df.empty:
+        return df
+    df["join_key"] = teams.join_key(df["kickoff_ts"], df.pop("_home"), df.pop("_away"))
+    # no MatchID: a deterministic PK from the join key (row number if that's empty too)
+    df["match_id"] = [int(m) if pd.notna(m) else _hash64(k if k.strip("|") else f"row-{i}")
+                      for i, (m, k) in enumerate(zip(df["match_id"], df["join_key"]))]
     df["match_id"] = df["match_id"].astype("int64")
     return df
@@ -0,0 +1,223 @@
+"""
+DAG orchestrator behind run_full_ingest.
+
+Stages form a dependency graph per league-season:
+
+    teams, players, fixtures  ->  details (player stats / lineups / events), injuries, odds
+
+Independent league-seasons and independent stages run concurrently on a thread pool,
+while every DuckDB statement goes through one SingleWriter (DuckDB allows a single writer).
+The API quota is the real limit: all stages share httpclient's token bucket, so adding
+parallelism saturates the plan instead of tripping it. In incremental mode a stage whose
+inputs haven't changed since its last run (watermark / fixtures fingerprint) is skipped.
+Progress is journaled per page / fixture (journal.py), so resume=True picks up a crashed
+backfill where it stopped instead of paying for it again.
+"""
+from __future__ import annotations
+import math, os, duckdb
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from . import quota, journal
+from .explore_data_pipeline import (
+    DB_PATH, WORKERS, PLAYER_SINKS_FULL, FIXTURE_IDS_PER_CALL, api_get_json, upsert, ensure_schema,
+    ingest_dim_league, ingest_dim_team, ingest_fixtures, ingest_fixture_details,
+    ingest_injuries, ingest_odds_by_season, _fixture_ids_for, _last_finished_ts,
+)
+from .players import ingest_players
+from .ratelimit import QuotaExhausted
+from .watermarks import (get_watermark, set_watermark, is_fresh, season_closed,
+                         fixtures_window_start, fixtures_fingerprint, DIM_TTL)
+from ..warehouse.writer import SingleWriter
+
+PARALLEL = int(os.getenv("INGEST_PARALLEL", "4"))   # stages running at once (each may fan out to WORKERS calls)
+
+# abort the whole run on these instead of skipping the failed branch
+FATAL = (QuotaExhausted, quota.QuotaExceeded)
+
+
+class _Ctx:
+    def __init__(self, incremental: bool, dim_ttl):
+        self.incremental = incremental
+        self.dim_ttl = dim_ttl
+
+    def fresh(self, con, endpoint, league_id, season) -> bool:
+        if not self.incremental:
+            return False
+        closed = season_closed(con, league_id, season)
+        return is_fresh(con, endpoint, league_id, season, ttl=self.dim_ttl, closed=closed)
+
+    def unchanged(self, con, endpoint, league_id, season) -> tuple[bool, str | None]:
+        """(skip?, current fingerprint) for stages fed by the season's fixtures."""
+        fp = fixtures_fingerprint(con, league_id, season)
+        if not self.incremental:
+            return False, fp
+        wm = get_watermark(con, endpoint, league_id, season)
+        return wm is not None and fp is not None and wm["input_hash"] == fp, fp
+
+
+def _teams(ctx, con, league_id, season, ckpt):
+    if ctx.fresh(con, "teams", league_id, season):
+        return None
+    n = ingest_dim_team(con, league_id, season)
+    set_watermark(con, "teams", league_id, season, n_rows=n)
+    return n
+
+def _players(ctx, con, league_id, season, ckpt):
+    if ctx.fresh(con, "players", league_id, season):
+        return None
+    # one pass over /players feeds dim_player and the season aggregates
+    n = ingest_players(con, api_get_json, upsert, league_id, season,
+                       sinks=PLAYER_SINKS_FULL, workers=WORKERS, ckpt=ckpt)
+    set_watermark(con, "players", league_id, season, n_rows=n["dim_player"])
+    return n
+
+def _fixtures(ctx, con, league_id, season, ckpt):
+    if ctx.incremental and season_closed(con, league_id, season) and ctx.fresh(con, "fixtures", league_id, season):
+        return None
+    since = fixtures_window_start(con, league_id, season) if ctx.incremental else None
+    n = ingest_fixtures(con, league_id, season, date_from=since)
+    set_watermark(con, "fixtures", league_id, season, n_rows=n,
+                  last_item_ts=_last_finished_ts(con, league_id, season))
+    return n
+
+def _details_ids(ctx, con, league_id, season):
+    # incremental: every finished fixture still without stats, however old (a failed or empty one is
+    # asked again); a full run re-fetches them all
+    return _fixture_ids_for(con, league_id, season, only_finished=True,
+                            missing_from="fact_player_stats_match" if ctx.incremental else None)
+
+def _details(ctx, con, league_id, season, ckpt):
+    fids = _details_ids(ctx, con, league_id, season)
+    n = ingest_fixture_details(con, league_id, season, fixture_ids=fids, ckpt=ckpt) if fids else None
+    set_watermark(con, "fixture_details", league_id, season, n_rows=len(fids),
+                  last_item_ts=_last_finished_ts(con, league_id, season))
+    return n
+
+def _fixture_fed(endpoint, ingest, paged=False):
+    def stage(ctx, con, league_id, season, ckpt):
+        skip, fp = ctx.unchanged(con, endpoint, league_id, season)
+        if skip:
+            return None
+        try:
+            n = ingest(con, league_id, season, ckpt=ckpt) if paged else ingest(con, league_id, season)
+        except RuntimeError as e:
+            if isinstance(e, FATAL):
+                raise
+            print(f"[{endpoint}] {league_id} {season} skip: {e}")  # some seasons may not have data
+            return None
+        set_watermark(con, endpoint, league_id, season, n_rows=n, input_hash=fp)
+        return n
+    return stage
+
+# name -> (upstream stages, stage function)
+STAGES = {
+    "teams":    ((), _teams),
+    "players":  ((), _players),
+    "fixtures": ((), _fixtures),
+    "details":  (("fixtures",), _details),
+    "injuries": (("fixtures",), _fixture_fed("injuries", ingest_injuries)),
+    "odds":     (("fixtures",), _fixture_fed("odds", ingest_odds_by_season, paged=True)),
+}
+DEFAULT_STAGES = ("teams", "players", "fixtures", "details", "injuries")
+
+
+def _journaled(ctx, stage, fn, con, league_id, season):
+    ckpt = journal.Checkpoint(con, league_id, season, stage)
+    if ckpt.finished:
+        return None
+    need = _requests_left(ctx, con, stage, ckpt)
+    quota.get_ledger().check(quota.API_FOOTBALL, 1 if need is None else need)   # before paying for half of it
+    n = fn(ctx, con, league_id, season, ckpt)
+    ckpt.finish(n if isinstance(n, int) else None)
+    return n
+
+
+def _requests_left(ctx, con, stage, ckpt):
+    if stage in ("players", "odds"):
+        return journal.pages_left(ckpt)
+    if stage == "details":
+        # the fixtures _details would fetch
+        left = (ckpt.total - len(ckpt.done) if ckpt.total is not None else
+                len(_details_ids(ctx, con, ckpt.league_id, ckpt.season)))
+        return math.ceil(left / FIXTURE_IDS_PER_CALL)
+    return 1
+
+
+def run_dag(tasks: dict, parallel: int = PARALLEL) -> tuple[dict, dict]:
+    """
+    tasks: key -> (dependency keys, zero-arg callable). Runs every task once its
+    dependencies succeeded; a failed task skips its dependents, a FATAL error stops the run.
+    A task waiting on a key that isn't in `tasks` (or on a cycle) fails as unsatisfiable.
+    Returns (results, errors).
+    """
+    pending, running, results, errors = dict(tasks), {}, {}, {}
+    with ThreadPoolExecutor(max_workers=parallel) as ex:
+        while pending or running:
+            for key in list(pending):
+                deps, fn = pending[key]
+                if any(d in errors for d in deps):
+                    errors[key] = RuntimeError(f"skipped: upstream {[d for d in deps if d in errors]} failed")
+                    del pending[key]
+                elif all(d in results for d in deps):
+                    running[ex.submit(fn)] = key
+                    del pending[key]
+            if not running:
+                # nothing in flight and nothing could start: the rest wait on keys that never run
+                for key, (deps, _) in pending.items():
+                    errors[key] = RuntimeError(f"unsatisfiable: {[d for d in deps if d not in results]} never run")
+                pending.clear()
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                key = running.pop(fut)
+                try:
+                    results[key] = fut.result()
+                except FATAL:
+                    pending.clear()
+                    for f in running:
+                        f.cancel()
+                    raise
+                except Exception as e:
+                    print(f"[orchestrator] {key} failed: {e!r}")
+                    errors[key] = e
+    return results, errors
+
+
+def run(leagues: dict[str, int], seasons: list[int], db_path: str = DB_PATH,
+        stages=DEFAULT_STAGES, incremental: bool = False, dim_ttl=DIM_TTL,
+        parallel: int = PARALLEL, resume: bool = False) -> dict:
+    writer = SingleWriter(duckdb.connect(db_path))
+    try:
+        writer.call(ensure_schema)
+        with quota.attached(writer):   # until the writer closes, then the ledger from before
+            ctx = _Ctx(incremental, dim_ttl)
+            if resume:
+                planned = [(league_id, season, stage) for league_id in leagues.values()
+                           for season in seasons for stage in stages]
+                journal.print_remaining(journal.remaining(writer, planned, partial(_requests_left, ctx)))
+            else:
+                journal.clear(writer)   # a fresh run doesn't trust a previous run's progress
+            if not (incremental and is_fresh(writer, "leagues", ttl=dim_ttl)):
+                set_watermark(writer, "leagues", n_rows=ingest_dim_league(writer))
+
+            tasks = {}
+            for country, league_id in leagues.items():
+                for season in seasons:
+                    for stage in stages:
+                        deps, fn = STAGES[stage]
+                        tasks[(country, season, stage)] = (
+                            [(country, season, d) for d in deps if d in stages],
+                            lambda stage=stage, fn=fn, league_id=league_id, season=season:
+                                _journaled(ctx, stage, fn, writer, league_id, season),
+                        )
+            results, errors = run_dag(tasks, parallel=parallel)
+            for key in sorted(results, key=str):
+                n = results[key]
+                print(f"== {key[0]} {key[1]} {key[2]}: {'skipped (up to date)' if n is None else n}")
+            if errors:
+                raise RuntimeError(f"{len(errors)} ingest stage(s) failed: {sorted(errors, key=str)} "
+                                   f"(progress kept in ingest_journal, rerun with resume=True)")
+            journal.clear(writer)
+            return results
+    finally:
+        writer.close()
@@ -0,0 +1,43 @@
+"""
+Paginated reader for API-Football list endpoints (/players, /odds, ...).
+Reads paging.total from the first page, then prefetches the remaining pages
+concurrently and yields each page exactly once, in page order.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+
+
+def iter_pages(fetch, endpoint: str, params: dict, workers: int = 4, skip=(), total: int | None = None,
+               on_total=None):
+    """
+    `fetch(endpoint, params)` must return the full JSON payload (with `paging`).
+    Yields (page_number, response_list).
+    skip: pages already stored (resume); they are neither fetched nor yielded. Page 1 is still
+    fetched when `total` isn't known yet, since it carries paging.total.
+    on_total(n) is called with paging.total once it's known.
+    """
+    skip = set(skip)
+    if total is None or 1 not in skip:
+        first = fetch(endpoint, {**params, "page": 1})
+        paging = first.get("paging") or {}
+        total = int(paging.get("total") or 1)
+        if on_total is not None:
+            on_total(total)
+        if 1 not in skip:
+            yield 1, first.get("response") or []
+    if total <= 1:
+        return
+
+    pages = [p for p in range(2, total + 1) if p not in skip]
+    if workers <= 1:
+        for page in pages:
+            yield page, fetch(endpoint, {**params, "page": page}).get("response") or []
+        return
+
+    ex = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [(page, ex.submit(fetch, endpoint, {**params, "page": page})) for page in pages]
+        for page, fut in futures:
+            yield page, fut.result().get("response") or []
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
@@ -1,10 +1,13 @@
-import os, time, math, requests, pandas as pd, duckdb
-from datetime import datetime, timezone
+import time, pandas as pd, duckdb
+from .players import ingest_players
+from .flatten import Spec, flatten, flatten_arrow, INT, DATE
+from . import httpclient, quota, journal, decode
+from .ratelimit import QuotaExhausted
+from ..warehouse.keys import INJURY_KEY, rekey
+from ..warehouse import frames
+from ..warehouse.io import DB_PATH
 
-API_KEY = os.getenv("API_FOOTBALL_KEY")
-BASE    = "https://v3.football.api-sports.io"
-HDRS    = {"x-apisports-key": API_KEY}
-DB_PATH = r"C:/Users/campo/Desktop/sports betting/warehouse.duckdb"
+BASE    = httpclient.API_FOOTBALL_BASE
 
 COUNTRIES = ["England","France","Germany","Italy","Spain"]
 LEAGUE_NAMES = {
@@ -20,19 +23,18 @@ SOURCE = "api-football"
 SLEEP = 0.25  # be gentle even on PRO
 RETRIES = 3
 
-def api_get(endpoint, params, retries=RETRIES):
-    for i in range(retries):
-        r = requests.get(f"{BASE}/{endpoint}", headers=HDRS, params=params, timeout=30)
-        if r.status_code >= 500:
-            time.sleep(1 + i)
-            continue
-        r.raise_for_status()
-        j = r.json()
-        if j.get("errors"):
-            # bubble up plan/coverage/quota errors explicitly
-            raise RuntimeError(f"{endpoint} error: {j['errors']} params={params}")
-        return j
-    raise RuntimeError(f"{endpoint} failed after retries params={params}")
+def api_get(endpoint, params, retries=RETRIES, stream=False):
+    # shared pooled client: rate limiting, 429/5xx backoff and quota ledger included
+    # stream: `response` decoded item by item as it's read (decode.iter_payload), single-pass callers only
+    r = httpclient.request(httpclient.API_FOOTBALL, f"/{endpoint}", params, retries=retries)
+    if r.status_code >= 500:
+        raise RuntimeError(f"{endpoint} failed after retries params={params}")
+    r.raise_for_status()
+    j = decode.iter_payload(r.content) if stream else decode.loads(r.content)
+    if j.get("errors"):
+        # bubble up plan/coverage/quota errors explicitly
+        raise RuntimeError(f"{endpoint} error: {j['errors']} params={params}")
+    return j
 
 def discover_league_ids():
     """Return {country: league_id} for target top leagues via /leagues."""
@@ -65,117 +67,71 @@ def discover_league_ids():
     return out
 
 def upsert_df(con, table, df, key_cols):
-    if df.empty: return 0
-    tmp = f"tmp_{table}_{int(time.time()*1000)}"
-    con.register("df_src", df)
-    con.execute(f"CREATE TEMP TABLE {tmp} AS SELECT * FROM df_src")
-    on_clause = " AND ".join([f"t.{k}=s.{k}" for k in key_cols])
-    set_cols = [c for c in df.columns if c not in key_cols]
+    """df: a DataFrame or Arrow data; merged straight from the registered view, no staging copy."""
+    src = frames.as_source(df)
+    if src is None: return 0
+    cols = frames.columns(src)
+    set_cols = [c for c in cols if c not in key_cols]
     set_clause = ", ".join([f"{c}=excluded.{c}" for c in set_cols])
-
-    # DuckDB 1.1+ supports MERGE; use INSERT ON CONFLICT for simplicity
-    cols = ", ".join(df.columns)
-    placeholders = ", ".join([f"s.{c}" for c in df.columns])
     pk = ", ".join(key_cols)
-
-    # ensure PK exists
-    # (if not created earlier, you can ALTER TABLE to add a PK)
-
-    con.execute(f"""
-    INSERT INTO {table} ({cols})
-    SELECT {placeholders} FROM {tmp} s
+    # DuckDB 1.1+ supports MERGE; use INSERT ON CONFLICT for simplicity
+    return frames.insert_from(con, "df_src", src, f"""
+    INSERT INTO {table} ({", ".join(cols)})
+    SELECT {", ".join(cols)} FROM df_src
     ON CONFLICT ({pk}) DO UPDATE SET {set_clause}
     """)
-    con.execute(f"DROP TABLE {tmp}")
-    return len(df)
+
+STANDINGS_SPEC = Spec(
+    "league_id", "season",
+    ("league.standings[][].team.id", "team_id", INT),
+    ("league.standings[][].team.name", "team_name"),
+    ("league.standings[][].rank", "rank", INT),
+    ("league.standings[][].all.played", "played", INT),
+    ("league.standings[][].all.win", "wins", INT),
+    ("league.standings[][].all.draw", "draws", INT),
+    ("league.standings[][].all.lose", "losses", INT),
+    ("league.standings[][].points", "points", INT),
+    ("league.standings[][].all.goals.for", "gf", INT),
+    ("league.standings[][].all.goals.against", "ga", INT),
+    ("league.standings[][].goalsDiff", "gd", INT),
+    ("league.standings[][].form", "form"),
+    "source", "updated_ts",
+)
 
 def ingest_standings(con, league_id, season):
     j = api_get("standings", {"league": league_id, "season": season})
-    rows = []
-    for item in j.get("response", []):
-        league = item.get("league", {}) or {}
-        for table in league.get("standings", []):
-            for t in table:
-                team = t.get("team", {}) or {}
-                rows.append({
-                    "league_id": league_id, "season": season,
-                    "team_id": team.get("id"), "team_name": team.get("name"),
-                    "rank": t.get("rank"),
-                    "played": t.get("all",{}).get("played"),
-                    "wins": t.get("all",{}).get("win"),
-                    "draws": t.get("all",{}).get("draw"),
-                    "losses": t.get("all",{}).get("lose"),
-                    "points": t.get("points"),
-                    "gf": t.get("all",{}).get("goals",{}).get("for"),
-                    "ga": t.get("all",{}).get("goals",{}).get("against"),
-                    "gd": t.get("goalsDiff"),
-                    "form": t.get("form"),
-                    "source": SOURCE, "updated_ts": pd.Timestamp.utcnow()
-                })
-    df = pd.DataFrame(rows)
-    return upsert_df(con, "standings", df, ["league_id","season","team_id"])
+    rows = flatten_arrow(STANDINGS_SPEC, j.get("response", []), league_id=league_id, season=season,
+                         source=SOURCE, updated_ts=pd.Timestamp.utcnow())
+    return upsert_df(con, "standings", rows, ["league_id","season","team_id"])
+
+INJURY_SPEC = Spec(
+    "league_id", "season",
+    ("team.id", "team_id", INT),
+    ("player.id", "player_id", INT),
+    ("player.name", "player_name"),
+    ("reason", "reason"),
+    ("player.type", "status"),
+    ("start", "start_date", DATE),
+    ("end", "expected_return", DATE),
+    ("fixture.id", "fixture_id", INT),
+    "source", "updated_ts",
+    ("player.reason", "_player_reason"),
+)
 
 def ingest_injuries(con, league_id, season):
-    j = api_get("injuries", {"league": league_id, "season": season})
-    rows = []
-    for e in j.get("response", []):
-        player = e.get("player", {}) or {}
-        team   = e.get("team", {}) or {}
-        fixture= e.get("fixture", {}) or {}
-        rows.append({
-            "league_id": league_id, "season": season,
-            "team_id": team.get("id"),
-            "player_id": player.get("id"),
-            "player_name": player.get("name"),
-            "reason": e.get("reason") or (player.get("reason") if isinstance(player.get("reason"), str) else None),
-            "status": e.get("status"),
-            "start_date": pd.to_datetime(e.get("start"), errors="coerce"),
-            "expected_return": pd.to_datetime(e.get("end"), errors="coerce"),
-            "fixture_id": fixture.get("id"),
-            "source": SOURCE, "updated_ts": pd.Timestamp.utcnow()
-        })
-    df = pd.DataFrame(rows)
-    return upsert_df(con, "injuries", df, ["league_id","season","team_id","player_id","start_date"])
-
-def ingest_player_stats(con, league_id, season):
-    total = 0
-    page = 1
-    while True:
-        j = api_get("players", {"league": league_id, "season": season, "page": page})
-        resp = j.get("response", [])
-        if not resp: break
-        rows = []
-        for rec in resp:
-            player = rec.get("player", {}) or {}
-            stats  = (rec.get("statistics") or [{}])[0]
-            team   = stats.get("team", {}) or {}
-            games  = stats.get("games", {}) or {}
-            shots  = stats.get("shots", {}) or {}
-            goals  = stats.get("goals", {}) or {}
-            passes = stats.get("passes", {}) or {}
-            tackles= stats.get("tackles", {}) or {}
-            duels  = stats.get("duels", {}) or {}
-            cards  = stats.get("cards", {}) or {}
-            rows.append({
-                "league_id": league_id, "season": season,
-                "team_id": team.get("id"), "player_id": player.get("id"),
-                "minutes": games.get("minutes"),
-                "appearances": games.get("appearences") or games.get("appearances"),
-                "lineups": games.get("lineups"),
-                "rating": games.get("rating"),
-                "shots_total": shots.get("total"), "shots_on": shots.get("on"),
-                "goals": goals.get("total"), "assists": goals.get("assists"),
-                "passes_total": passes.get("total"), "passes_key": passes.get("key"),
-                "tackles": tackles.get("total"),
-                "duels_total": duels.get("total"), "duels_won": duels.get("won"),
-                "yellow": cards.get("yellow"), "red": cards.get("red"),
-                "source": SOURCE, "updated_ts": pd.Timestamp.utcnow()
-            })
-        df = pd.DataFrame(rows)
-        total += upsert_df(con, "player_stats", df, ["league_id","season","player_id","team_id"])
-        page += 1
-        time.sleep(SLEEP)
-    return total
+    j = api_get("injuries", {"league": league_id, "season": season}, stream=True)
+    df = flatten(INJURY_SPEC, j.get("response", []), league_id=league_id, season=season,
+                 source=SOURCE, updated_ts=pd.Timestamp.utcnow())
+    # the reason sometimes only comes on the player
+    alt = df.pop("_player_reason")
+    df["reason"] = [r or (a if isinstance(a, str) else None) for r, a in zip(df["reason"], alt)]
+    # start_date is never sent, and is NULL: one row per player and fixture
+    return upsert_df(con, "injuries", df, INJURY_KEY)
+
+def ingest_player_stats(con, league_id, season, ckpt=None):
+    # single pass over /players, remaining pages prefetched once paging.total is known
+    return ingest_players(con, api_get, upsert_df, league_id, season,
+                          sinks=("player_stats",), workers=2, ckpt=ckpt)["player_stats"]
 
 def ensure_schema(con):
     con.execute("""
@@ -193,9 +149,10 @@ def ensure_schema(con):
       player_name VARCHAR, reason VARCHAR, status VARCHAR,
       start_date TIMESTAMP, expected_return TIMESTAMP, fixture_id INTEGER,
       source VARCHAR, updated_ts TIMESTAMP,
-      PRIMARY KEY (league_id, season, team_id, player_id, start_date)
+      PRIMARY KEY (league_id, season, team_id, player_id, fixture_id)
     );
     """)
+    rekey(con, "injuries", INJURY_KEY)
     con.execute("""
     CREATE TABLE IF NOT EXISTS player_stats (
       league_id INTEGER, season INTEGER, team_id INTEGER, player_id INTEGER,
@@ -207,44 +164,54 @@ def ensure_schema(con):
       PRIMARY KEY (league_id, season, player_id, team_id)
     );
     """)
+    journal.ensure_journal(con)
 
-def main():
-    con = duckdb.connect(DB_PATH)
-    ensure_schema(con)  # <-- add this
-    leagues = discover_league_ids()
+# stage -> (log label, ingester); player_stats journals each /players page
+STAGES = {
+    "standings": ("standings", lambda con, l, s, ckpt: ingest_standings(con, l, s)),
+    "injuries": ("injuries ", lambda con, l, s, ckpt: ingest_injuries(con, l, s)),
+    "player_stats": ("plyrstats", ingest_player_stats),
+}
+
+def _requests_left(con, stage, ckpt):
+    return journal.pages_left(ckpt) if stage == "player_stats" else 1
+
+def main(resume=False):
     con = duckdb.connect(DB_PATH)
-    # ensure tables exist (DDL above)
+    ensure_schema(con)
+    quota.attach(con)
     leagues = discover_league_ids()  # {'England': 39, 'France': 61, 'Germany': 78, 'Italy': 135, 'Spain': 140} typically
     print("Leagues:", leagues)
+    if resume:
+        planned = [(l, s, st) for l in leagues.values() for s in SEASONS for st in STAGES]
+        journal.print_remaining(journal.remaining(con, planned, _requests_left))
+    else:
+        journal.clear(con)
 
     for country, league_id in leagues.items():
         for season in SEASONS:
-            try:
-                s = ingest_standings(con, league_id, season)
-                print(f"[standings] {country} {season}: upserted {s}")
-            except Exception as e:
-                print(f"[standings] {country} {season}: {e}")
-
-            try:
-                inj = ingest_injuries(con, league_id, season)
-                print(f"[injuries ] {country} {season}: upserted {inj}")
-            except Exception as e:
-                print(f"[injuries ] {country} {season}: {e}")
-
-            try:
-                ps = ingest_player_stats(con, league_id, season)
-                print(f"[plyrstats] {country} {season}: upserted {ps}")
-            except Exception as e:
-                print(f"[plyrstats] {country} {season}: {e}")
+            for stage, (label, ingest) in STAGES.items():
+                ckpt = journal.Checkpoint(con, league_id, season, stage)
+                if ckpt.finished:
+                    continue
+                try:
+                    n = ingest(con, league_id, season, ckpt)
+                    ckpt.finish(n)
+                    print(f"[{label}] {country} {season}: upserted {n}")
+                except (quota.QuotaExceeded, QuotaExhausted):
+                    print("Out of API quota: progress is kept, rerun with --resume")
+                    raise
+                except Exception as e:
+                    print(f"[{label}] {country} {season}: {e}")
 
             time.sleep(SLEEP)
 
+    journal.clear(con)
     con.close()
 
 if __name__ == "__main__":
-    main()
-
-
-
-
-
+    import argparse
+    parser = argparse.ArgumentParser(description="Standings, injuries and player stats for the top-5 leagues")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from ingest_journal (shows what is left first)")
+    main(resume=parser.parse_args().resume)
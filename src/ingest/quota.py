@@ -0,0 +1,242 @@
+"""
+Request ledger and odds-pull planner for the metered providers.
+
+Every call to The Odds API / API-Football is recorded in `api_quota_ledger` with its cost,
+taken from the provider's remaining-request headers when it sends them. The planner
+spreads odds pulls for upcoming fixtures (T-24h, T-1h, ...) over what is left of the
+monthly budget, and refuses or degrades before the run instead of failing halfway.
+"""
+from __future__ import annotations
+import os, threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import duckdb, pandas as pd
+from ..warehouse.io import DB_PATH
+from ..warehouse.writer import SingleWriter, atomic
+
+ODDS = "theoddsapi"
+API_FOOTBALL = "api-football"
+
+# provider -> (request budget, period it resets on)
+BUDGETS = {
+    ODDS: (int(os.getenv("ODDS_MONTHLY_BUDGET", "500")), "month"),
+    API_FOOTBALL: (int(os.getenv("API_FOOTBALL_DAILY_BUDGET", "7500")), "day"),
+}
+
+# API-Football league id -> The Odds API sport key
+ODDS_SPORT_KEYS = {
+    39: "soccer_epl",
+    61: "soccer_france_ligue_one",
+    78: "soccer_germany_bundesliga",
+    135: "soccer_italy_serie_a",
+    140: "soccer_spain_la_liga",
+}
+DEFAULT_OFFSETS = (pd.Timedelta(hours=24), pd.Timedelta(hours=1))  # in priority order
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised before a call (or a plan) that would overrun a provider's budget."""
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _period_start(period: str, now: datetime) -> datetime:
+    if period == "month":
+        return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _int(headers, name):
+    v = headers.get(name) if headers is not None else None
+    try:
+        return int(float(v)) if v not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def odds_call_cost(regions: str, markets: str) -> int:
+    # The Odds API bills one request per market per region on /odds
+    return max(1, len(regions.split(","))) * max(1, len(markets.split(",")))
+
+
+class Ledger:
+    """
+    con: a connection of its own (default: one to DB_PATH) or a SingleWriter, whose queue
+    then carries the ledger's statements like everyone else's.
+    """
+    def __init__(self, con=None):
+        self.con = con if con is not None else duckdb.connect(DB_PATH)
+        self._lock = threading.Lock()
+        self._last_remaining = {}   # provider -> (ts, remaining reported by the provider)
+        self._run(lambda con: con.execute("""
+        CREATE TABLE IF NOT EXISTS api_quota_ledger (
+            call_ts TIMESTAMP,
+            provider VARCHAR,
+            endpoint VARCHAR,
+            cost INTEGER,
+            remaining INTEGER,   -- as reported by the provider after the call, if any
+            used INTEGER
+        );
+        """))
+
+    def _run(self, fn):
+        with self._lock:
+            return atomic(self.con, fn)
+
+    def record(self, provider: str, endpoint: str, headers=None, cost: int | None = None):
+        if provider == ODDS:
+            cost = _int(headers, "x-requests-last") if cost is None else cost
+            remaining = _int(headers, "x-requests-remaining")
+            used = _int(headers, "x-requests-used")
+        else:
+            remaining = _int(headers, "x-ratelimit-requests-remaining")
+            limit = _int(headers, "x-ratelimit-requests-limit")
+            used = limit - remaining if limit is not None and remaining is not None else None
+        cost = 1 if cost is None else cost
+        now = _now()
+        self._run(lambda con: con.execute("INSERT INTO api_quota_ledger VALUES (?, ?, ?, ?, ?, ?)",
+                                          [now, provider, endpoint, cost, remaining, used]))
+        if remaining is not None:
+            self._last_remaining[provider] = (now, remaining)
+
+    def spent(self, provider: str, since: datetime | None = None) -> int:
+        since = since or _period_start(BUDGETS[provider][1], _now())
+        return int(self._run(lambda con: con.execute(
+            "SELECT coalesce(sum(cost), 0) FROM api_quota_ledger WHERE provider = ? AND call_ts >= ?",
+            [provider, since]).fetchone()[0]))
+
+    def remaining(self, provider: str) -> int:
+        """Budget left this period: our own count, tightened by what the provider last reported."""
+        budget, period = BUDGETS[provider]
+        left = budget - self.spent(provider)
+        start = _period_start(period, _now())
+        last = self._last_remaining.get(provider)
+        if last is None:
+            row = self._run(lambda con: con.execute("""
+                SELECT call_ts, remaining FROM api_quota_ledger
+                WHERE provider = ? AND remaining IS NOT NULL
+                ORDER BY call_ts DESC LIMIT 1
+            """, [provider]).fetchone())
+            last = tuple(row) if row else None
+        if last is not None and last[0] >= start:
+            left = min(left, last[1])
+        return max(0, left)
+
+    def check(self, provider: str, cost: int):
+        left = self.remaining(provider)
+        if cost > left:
+            raise QuotaExceeded(f"{provider}: call costs {cost} requests but only {left} left this "
+                                f"{BUDGETS[provider][1]} (budget {BUDGETS[provider][0]})")
+
+
+_ledger: Ledger | None = None
+_ledger_lock = threading.Lock()
+
+def attach(con) -> Ledger:
+    """Keep the ledger in an already open warehouse connection (or SingleWriter)."""
+    global _ledger
+    with _ledger_lock:
+        _ledger = Ledger(con if isinstance(con, SingleWriter) else con.cursor())
+    return _ledger
+
+@contextmanager
+def attached(con):
+    """attach(con) for the block, then put back the ledger from before (con may be closed after)."""
+    global _ledger
+    with _ledger_lock:
+        before = _ledger
+    try:
+        yield attach(con)
+    finally:
+        with _ledger_lock:
+            _ledger = before
+
+def get_ledger() -> Ledger:
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = Ledger()
+        return _ledger
+
+
+def _cluster(times: pd.Series, tolerance: pd.Timedelta) -> pd.Series:
+    """Greedy 1-D clustering of sorted target times: one pull serves targets in [start, start + tolerance)."""
+    slot, start, out = -1, None, []
+    for t in times:
+        if start is None or t >= start + tolerance:
+            slot, start = slot + 1, t
+        out.append(slot)
+    return pd.Series(out, index=times.index)
+
+
+def plan_odds_pulls(con, budget: int | None = None, offsets=DEFAULT_OFFSETS,
+                    regions: str = "eu", markets: str = "h2h",
+                    tolerance: pd.Timedelta = pd.Timedelta(hours=3),
+                    until=None, now=None, strict: bool = False) -> pd.DataFrame:
+    """
+    Schedule odds pulls for upcoming fixtures in fact_fixtures.
+
+    One /sports/{key}/odds call returns every upcoming event of a league, so fixtures whose
+    targets (kickoff - offset) fall within `tolerance` share one pull taken at the earliest target.
+    Pulls are kept by priority (offset order, then fixtures covered) until the budget runs out.
+    strict=True raises QuotaExceeded instead of dropping pulls.
+    """
+    now = pd.Timestamp(now or _now())
+    until = pd.Timestamp(until) if until is not None else (now + pd.offsets.MonthBegin(1)).normalize()
+    budget = get_ledger().remaining(ODDS) if budget is None else budget
+    cost = odds_call_cost(regions, markets)
+
+    fx = con.execute("""
+        SELECT fixture_id, league_id, date_utc FROM fact_fixtures
+        WHERE date_utc > ? AND date_utc <= ? AND list_contains(?, league_id)
+          AND coalesce(status_short, 'NS') IN ('NS', 'TBD')
+    """, [now.to_pydatetime(), (until + max(offsets)).to_pydatetime(), list(ODDS_SPORT_KEYS)]).fetchdf()
+
+    cols = ["sport_key", "league_id", "offset", "pull_ts", "n_fixtures", "fixture_ids", "cost", "scheduled"]
+    if fx.empty:
+        return pd.DataFrame(columns=cols)
+
+    fx["date_utc"] = pd.to_datetime(fx["date_utc"])
+    targets = pd.concat([fx.assign(offset=off, priority=i, target_ts=fx["date_utc"] - off)
+                         for i, off in enumerate(offsets)], ignore_index=True)
+    targets = targets[(targets["target_ts"] > now) & (targets["target_ts"] < until)]
+    if targets.empty:
+        return pd.DataFrame(columns=cols)
+
+    targets = targets.sort_values(["league_id", "priority", "target_ts"])
+    targets["slot"] = targets.groupby(["league_id", "priority"], group_keys=False)["target_ts"] \
+                             .apply(lambda s: _cluster(s, tolerance))
+    plan = (targets.groupby(["league_id", "priority", "slot"])
+                   .agg(offset=("offset", "first"), pull_ts=("target_ts", "min"),
+                        n_fixtures=("fixture_id", "size"), fixture_ids=("fixture_id", list))
+                   .reset_index())
+    plan["sport_key"] = plan["league_id"].map(ODDS_SPORT_KEYS)
+    plan["cost"] = cost
+    plan = plan.sort_values(["priority", "n_fixtures", "pull_ts"], ascending=[True, False, True])
+    plan["scheduled"] = plan["cost"].cumsum() <= budget
+
+    need, n_pulls = int(plan["cost"].sum()), len(plan)
+    if need > budget:
+        kept = plan[plan["scheduled"]]
+        covered = int(kept["n_fixtures"].sum()) / max(1, int(plan["n_fixtures"].sum()))
+        msg = (f"[quota] odds plan needs {need} requests before {until:%Y-%m-%d} but only {budget} are left: "
+               f"keeping {len(kept)}/{n_pulls} pulls ({covered:.0%} of fixture snapshots)")
+        if strict:
+            raise QuotaExceeded(msg)
+        print(msg)
+    return plan.sort_values("pull_ts")[cols].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Show request budgets and the planned odds pulls")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--strict", action="store_true")
+    args = parser.parse_args()
+    con = duckdb.connect(args.db)
+    ledger = attach(con)
+    for provider, (budget, period) in BUDGETS.items():
+        print(f"{provider}: {ledger.remaining(provider)}/{budget} left this {period}")
+    print(plan_odds_pulls(con, strict=args.strict).to_string())
@@ -0,0 +1,112 @@
+"""
+Token-bucket limiter for the API-Football fetchers.
+Paces calls by the per-minute quota and backs off on 429 / x-ratelimit-* headers,
+so concurrent fetchers can share one budget without tripping the provider.
+"""
+from __future__ import annotations
+import threading, time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+
+class QuotaExhausted(RuntimeError):
+    """Raised when the provider reports no requests left for the day."""
+
+
+def retry_after_seconds(headers, default: float = 60.0) -> float:
+    # Retry-After is either a number of seconds or an HTTP date
+    raw = headers.get("Retry-After") if headers is not None else None
+    if not raw:
+        return default
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(raw)
+        return max(0.0, (dt - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
+
+
+def _int_header(headers, name: str):
+    v = headers.get(name)
+    try:
+        return int(v) if v not in (None, "") else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate_per_min: float, burst: int | None = None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.blocked_until = 0.0
+        self.exhausted_on = None    # UTC day the provider reported no daily requests left
+        self.set_rate(rate_per_min, burst)
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+
+    def set_rate(self, rate_per_min: float, burst: int | None = None):
+        self.rate_per_min = float(rate_per_min)
+        # small burst by default: the provider window is sliding, a full minute up front trips it
+        self.capacity = burst or max(1, int(rate_per_min // 10))
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_min / 60.0)
+            self.updated = now
+
+    def acquire(self):
+        """Block until one request may be sent; QuotaExhausted once the day's plan is spent."""
+        if self.exhausted_on is not None:
+            if self.exhausted_on == datetime.now(timezone.utc).date():
+                raise QuotaExhausted("API-Football daily request quota exhausted")
+            self.exhausted_on = None    # the plan reset at midnight UTC
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) * 60.0 / self.rate_per_min
+            self._sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stop every caller for `seconds` (429 / window exhausted)."""
+        with self._lock:
+            now = self._clock()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated = now
+
+    def update_from_headers(self, headers):
+        """
+        API-Football sends the per-minute window as X-RateLimit-Limit/Remaining
+        and the daily plan as x-ratelimit-requests-limit/remaining. A spent plan doesn't fail
+        the response that reported it (it was paid for): the next acquire() raises.
+        """
+        if headers is None:
+            return
+        limit = _int_header(headers, "X-RateLimit-Limit")
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        daily_left = _int_header(headers, "x-ratelimit-requests-remaining")
+
+        if limit and limit != self.rate_per_min:
+            with self._lock:
+                self.set_rate(limit)
+                self.tokens = min(self.tokens, self.capacity)
+        if remaining is not None:
+            if remaining <= 0:
+                self.pause(60.0)
+            else:
+                with self._lock:
+                    self.tokens = min(self.tokens, float(remaining))
+        if daily_left is not None:
+            self.exhausted_on = datetime.now(timezone.utc).date() if daily_left <= 0 else None
@@ -0,0 +1,245 @@
+"""
+Team-name resolution across providers.
+
+API-Football, The Odds API and OpenLigaDB spell clubs differently ("FC Bayern München",
+"Bayern Munich", "Bayern"). norm_team() folds a name to a comparison key (accents, club
+affixes, leading numbers, a few exonyms), and TeamIndex maps keys to dim_team.team_id: the dim_team names plus
+the `team_alias` table, which grows whenever a new spelling gets resolved.
+
+resolve_events() attaches fixture_id to a whole snapshot of events in one pass:
+  1. names -> team ids through the index, then one merge with fact_fixtures on
+     (home, away) with kickoffs within WINDOW;
+  2. what's left is matched fuzzily, blocked on (league, kickoff +- WINDOW): a day of one league
+     has a handful of fixtures, so only those pairs get scored. Accepted matches teach the index
+     the new spellings, so the next snapshot resolves them in step 1.
+"""
+from __future__ import annotations
+import re, unicodedata
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+from functools import lru_cache
+import duckdb, numpy as np, pandas as pd
+from .quota import ODDS_SPORT_KEYS
+
+WINDOW = pd.Timedelta(days=1)
+FUZZY_MIN = 1.3     # home + away similarity: an exact side lets the other be loose ("Wolves")
+SPORT_LEAGUES = {v: k for k, v in ODDS_SPORT_KEYS.items()}
+
+_FOLD = str.maketrans({"ß": "ss", "ø": "o", "æ": "ae", "œ": "oe", "ł": "l", "đ": "d", "ı": "i"})
+# legal-form / sports-club tokens that one provider writes and another drops
+_AFFIXES = frozenset("fc afc cf sc ac as ss sv fsv tsg vfl vfb bsc ssc ssv us cd ud rc rcd sd ca fk sk nk club de".split())
+_EXONYMS = {"munich": "munchen", "cologne": "koln", "nuremberg": "nurnberg", "utd": "united", "st": "saint"}
+_SPLIT = re.compile(r"[^a-z0-9]+")
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@lru_cache(maxsize=8192)
+def norm_team(name) -> str:
+    """'1. FC Köln' -> 'koln', 'Bayern Munich' -> 'bayern munchen'; '' for missing names."""
+    if not isinstance(name, str):
+        return ""
+    s = unicodedata.normalize("NFKD", name.lower().translate(_FOLD))
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    toks = [_EXONYMS.get(t, t) for t in _SPLIT.split(s) if t]
+    kept = [t for t in toks if t not in _AFFIXES]
+    while kept and kept[0].isdigit():     # '1. FC Köln', 'TSG 1899 Hoffenheim'; 'Schalke 04' keeps its 04
+        kept.pop(0)
+    return " ".join(kept or toks)
+
+
+@lru_cache(maxsize=65536)
+def similarity(a: str, b: str) -> float:
+    """0..1 between two norm_team keys; one key's words all in the other's counts 0.9."""
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    ta, tb = set(a.split()), set(b.split())
+    if ta <= tb or tb <= ta:
+        return 0.9
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def team_keys(names: pd.Series) -> pd.Series:
+    return names.map(norm_team)
+
+
+def join_key(kickoff: pd.Series, home: pd.Series, away: pd.Series) -> pd.Series:
+    """'YYYY-MM-DD|home key|away key' per row (kickoff: UTC timestamps)."""
+    d = pd.to_datetime(kickoff, utc=True, errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+    return d + "|" + team_keys(home) + "|" + team_keys(away)
+
+
+def event_join_key(kickoff, home, away) -> str:
+    """join_key of one event, kickoff an ISO string: for a few events, without building Series."""
+    try:
+        ts = datetime.fromisoformat(kickoff)
+        d = (ts.astimezone(timezone.utc) if ts.tzinfo else ts).strftime("%Y-%m-%d")
+    except (TypeError, ValueError):
+        d = ""
+    return f"{d}|{norm_team(home)}|{norm_team(away)}"
+
+
+def ensure_aliases(con):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS team_alias (
+        alias VARCHAR PRIMARY KEY,  -- norm_team() key
+        team_id INTEGER,            -- dim_team.team_id
+        name VARCHAR,               -- spelling it was learned from
+        source VARCHAR,             -- 'manual', 'fuzzy'
+        created_ts TIMESTAMP
+    );
+    """)
+
+
+def add_alias(con, name: str, team_id: int, source: str = "manual"):
+    ensure_aliases(con)
+    con.execute("""
+        INSERT INTO team_alias VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (alias) DO UPDATE SET team_id = excluded.team_id, name = excluded.name,
+                                          source = excluded.source, created_ts = excluded.created_ts
+    """, [norm_team(name), int(team_id), name, source, _now()])
+
+
+class TeamIndex:
+    """norm_team key -> team_id, and team_id -> every key it's known by."""
+
+    def __init__(self, names=(), con=None):
+        self.con = con
+        self.ids: dict[str, int] = {}
+        self.keys: dict[int, set] = {}
+        for team_id, name in names:
+            self._put(norm_team(name), int(team_id))
+
+    @classmethod
+    def load(cls, con) -> "TeamIndex":
+        ensure_aliases(con)
+        try:
+            rows = con.execute("SELECT team_id, team_name FROM dim_team").fetchall()
+        except duckdb.CatalogException:
+            rows = []
+        # aliases last: a learned/manual spelling overrides a clash between dim_team names
+        rows += con.execute("SELECT team_id, name FROM team_alias ORDER BY created_ts").fetchall()
+        return cls(rows, con)
+
+    def _put(self, key: str, team_id: int):
+        if key:
+            self.ids[key] = team_id
+            self.keys.setdefault(team_id, set()).add(key)
+
+    def lookup(self, names: pd.Series) -> pd.Series:
+        """Team ids (Int64, <NA> when unknown) for a column of names."""
+        return team_keys(names).map(self.ids).astype("Int64")
+
+    def score(self, key: str, team_id) -> float:
+        return max((similarity(key, k) for k in self.keys.get(team_id, ())), default=0.0)
+
+    def learn(self, name: str, team_id: int) -> bool:
+        """Remember a spelling that resolved to team_id; False if the key already means another team."""
+        key = norm_team(name)
+        if not key or self.ids.get(key, team_id) != team_id:
+            return False
+        if key not in self.ids:
+            self._put(key, team_id)
+            if self.con is not None:
+                add_alias(self.con, name, team_id, "fuzzy")
+        return True
+
+
+def _naive_utc(s) -> pd.Series:
+    return pd.to_datetime(s, utc=True, errors="coerce").dt.tz_localize(None)
+
+
+def match_events(events: pd.DataFrame, fixtures: pd.DataFrame, index: TeamIndex,
+                 window: pd.Timedelta = WINDOW) -> pd.DataFrame:
+    """
+    Fixture for each row of `events` (commence_time, home_team, away_team[, league_id]) among
+    `fixtures` (fixture_id, league_id, date_utc, home_team_id, away_team_id).
+    Returns fixture_id, home_team_id, away_team_id (Int64) and resolved_by ('alias' / 'fuzzy' /
+    None), aligned with events.index.
+    """
+    n = len(events)
+    ev = pd.DataFrame({
+        "_row": np.arange(n),
+        "kickoff": _naive_utc(events["commence_time"]).to_numpy(),
+        "home_key": team_keys(events["home_team"]).to_numpy(),
+        "away_key": team_keys(events["away_team"]).to_numpy(),
+        "league_id": events["league_id"].to_numpy() if "league_id" in events else None,
+    })
+    ev["home_team_id"] = ev["home_key"].map(index.ids).astype("Int64")
+    ev["away_team_id"] = ev["away_key"].map(index.ids).astype("Int64")
+    fx = pd.DataFrame({
+        "fixture_id": fixtures["fixture_id"].astype("Int64").array,
+        "fx_league": fixtures["league_id"].astype("Int64").array,
+        "fx_kickoff": _naive_utc(fixtures["date_utc"]).to_numpy(),
+        "fx_home": fixtures["home_team_id"].astype("Int64").array,
+        "fx_away": fixtures["away_team_id"].astype("Int64").array,
+    })
+    out = pd.DataFrame({"fixture_id": pd.array([pd.NA] * n, dtype="Int64"),
+                        "home_team_id": ev["home_team_id"].array, "away_team_id": ev["away_team_id"].array,
+                        "resolved_by": np.full(n, None, dtype=object)})
+    if n == 0 or fx.empty:
+        return out.set_axis(events.index)
+
+    def near(cand):
+        cand = cand[(cand["kickoff"] - cand["fx_kickoff"]).abs() <= window]
+        if ev["league_id"].notna().any():
+            cand = cand[cand["league_id"].isna() | (cand["league_id"] == cand["fx_league"])]
+        return cand
+
+    # 1. known spellings: an equi-join on the team ids
+    known = ev.dropna(subset=["home_team_id", "away_team_id"])
+    hit = near(known.merge(fx, left_on=["home_team_id", "away_team_id"], right_on=["fx_home", "fx_away"]))
+    hit = hit.assign(gap=(hit["kickoff"] - hit["fx_kickoff"]).abs()).sort_values("gap").drop_duplicates("_row")
+
+    # 2. the rest: score every fixture of the same league and window, keep the best pair per event
+    rest = ev[~ev["_row"].isin(hit["_row"])]
+    cand = near(rest.merge(fx[~fx["fixture_id"].isin(hit["fixture_id"])], how="cross"))
+    if not cand.empty:
+        cand = cand.assign(score=[index.score(h, th) + index.score(a, ta) for h, th, a, ta in
+                                  zip(cand["home_key"], cand["fx_home"], cand["away_key"], cand["fx_away"])])
+        cand = cand[cand["score"] >= FUZZY_MIN].sort_values("score", ascending=False)
+        cand = cand.drop_duplicates("fixture_id").drop_duplicates("_row")
+        names = events[["home_team", "away_team"]].to_numpy()
+        for r, th, ta in zip(cand["_row"], cand["fx_home"], cand["fx_away"]):
+            index.learn(names[r, 0], th)
+            index.learn(names[r, 1], ta)
+
+    for found, how in ((hit, "alias"), (cand, "fuzzy")):
+        if len(found):
+            rows = found["_row"].to_numpy()
+            out.loc[rows, "fixture_id"] = found["fixture_id"].to_numpy()
+            out.loc[rows, "home_team_id"] = found["fx_home"].to_numpy()
+            out.loc[rows, "away_team_id"] = found["fx_away"].to_numpy()
+            out.loc[rows, "resolved_by"] = how
+    return out.set_axis(events.index)
+
+
+def resolve_events(con, events: pd.DataFrame, index: TeamIndex | None = None) -> pd.DataFrame:
+    """
+    match_events against fact_fixtures, for a frame of The Odds API events (commence_time,
+    home_team, away_team, and league_id or sport_key). Fixtures are read once, for the
+    snapshot's kickoff range.
+    """
+    index = index or TeamIndex.load(con)
+    if "league_id" not in events and "sport_key" in events:
+        events = events.assign(league_id=events["sport_key"].map(SPORT_LEAGUES))
+    # long odds frames repeat each event per outcome: match the distinct events, then broadcast
+    keys = [c for c in ("commence_time", "home_team", "away_team", "league_id") if c in events]
+    codes = events.groupby(keys, dropna=False, sort=False).ngroup().to_numpy()
+    uniq = events.drop_duplicates(keys)
+    kick = _naive_utc(events["commence_time"]).dropna()
+    fixtures = pd.DataFrame(columns=["fixture_id", "league_id", "date_utc", "home_team_id", "away_team_id"])
+    if len(kick):
+        try:
+            fixtures = con.execute("""
+                SELECT fixture_id, league_id, date_utc, home_team_id, away_team_id FROM fact_fixtures
+                WHERE date_utc BETWEEN ? AND ?
+            """, [(kick.min() - WINDOW).to_pydatetime(), (kick.max() + WINDOW).to_pydatetime()]).fetchdf()
+        except duckdb.CatalogException:
+            pass
+    found = match_events(uniq, fixtures, index).reset_index(drop=True)
+    return found.take(codes).set_axis(events.index)
@@ -0,0 +1,102 @@
+"""
+Per-(endpoint, league, season) watermarks for incremental ingestion.
+A watermark records when a stage last ran and the newest item it saw, so a
+nightly run only asks the API for what can still have changed.
+"""
+from __future__ import annotations
+import os
+from datetime import datetime, timedelta, timezone
+
+FINISHED = ("FT", "AET", "PEN")
+# statuses that will never change again; PST (postponed) is not one of them
+TERMINAL = FINISHED + ("CANC", "ABD", "AWD", "WO")
+DIM_TTL = timedelta(days=int(os.getenv("DIM_TTL_DAYS", "7")))
+GLOBAL = 0   # league_id / season used for endpoints that aren't league-scoped (/leagues)
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def ensure_watermarks(con):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_watermark (
+        endpoint VARCHAR,
+        league_id INTEGER,
+        season INTEGER,
+        last_run_ts TIMESTAMP,      -- when the stage last completed (UTC)
+        last_item_ts TIMESTAMP,     -- newest item seen (e.g. latest finished kickoff)
+        n_rows INTEGER,
+        input_hash VARCHAR,         -- fingerprint of the stage's inputs when it last ran
+        PRIMARY KEY (endpoint, league_id, season)
+    );
+    """)
+    con.execute("ALTER TABLE ingest_watermark ADD COLUMN IF NOT EXISTS input_hash VARCHAR")
+
+
+def get_watermark(con, endpoint: str, league_id: int = GLOBAL, season: int = GLOBAL):
+    row = con.execute("""
+        SELECT last_run_ts, last_item_ts, n_rows, input_hash FROM ingest_watermark
+        WHERE endpoint = ? AND league_id = ? AND season = ?
+    """, [endpoint, league_id, season]).fetchone()
+    if row is None:
+        return None
+    return {"last_run_ts": row[0], "last_item_ts": row[1], "n_rows": row[2], "input_hash": row[3]}
+
+
+def set_watermark(con, endpoint: str, league_id: int = GLOBAL, season: int = GLOBAL,
+                  n_rows: int | None = None, last_item_ts=None, input_hash: str | None = None):
+    con.execute("""
+        INSERT INTO ingest_watermark (endpoint, league_id, season, last_run_ts, last_item_ts, n_rows, input_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (endpoint, league_id, season) DO UPDATE SET
+            last_run_ts = excluded.last_run_ts,
+            last_item_ts = COALESCE(excluded.last_item_ts, ingest_watermark.last_item_ts),
+            n_rows = excluded.n_rows,
+            input_hash = excluded.input_hash
+    """, [endpoint, league_id, season, _now(), last_item_ts, n_rows, input_hash])
+
+
+def is_fresh(con, endpoint: str, league_id: int = GLOBAL, season: int = GLOBAL,
+             ttl: timedelta = DIM_TTL, closed: bool = False) -> bool:
+    """A stage is fresh if it ran within `ttl`, or ever ran at all for a closed season."""
+    wm = get_watermark(con, endpoint, league_id, season)
+    if wm is None or wm["last_run_ts"] is None:
+        return False
+    return closed or _now() - wm["last_run_ts"] < ttl
+
+
+def season_closed(con, league_id: int, season: int) -> bool:
+    """True once every known fixture of the season has a terminal status."""
+    n_total, n_open = con.execute("""
+        SELECT count(*), count(*) FILTER (WHERE status_short IS NULL
+                                          OR NOT list_contains(?, status_short))
+        FROM fact_fixtures WHERE league_id = ? AND season = ?
+    """, [list(TERMINAL), league_id, season]).fetchone()
+    return n_total > 0 and n_open == 0
+
+
+def fixtures_window_start(con, league_id: int, season: int):
+    """
+    First date the fixtures delta has to cover: the earliest fixture that is not
+    finished yet, capped by the previous run. None means nothing is known -> full pull.
+    """
+    wm = get_watermark(con, "fixtures", league_id, season)
+    if wm is None:
+        return None
+    first_open = con.execute("""
+        SELECT min(date_utc) FROM fact_fixtures
+        WHERE league_id = ? AND season = ?
+          AND (status_short IS NULL OR NOT list_contains(?, status_short))
+    """, [league_id, season, list(TERMINAL)]).fetchone()[0]
+    cands = [d for d in (first_open, wm["last_run_ts"]) if d is not None]
+    return min(cands).date() if cands else None
+
+
+def fixtures_fingerprint(con, league_id: int, season: int) -> str | None:
+    """Hash of (fixture, status, kickoff) for a league-season; changes when any fixture moves."""
+    return con.execute("""
+        SELECT md5(string_agg(fixture_id || ':' || coalesce(status_short, '') || ':'
+                              || coalesce(CAST(date_utc AS VARCHAR), ''), ',' ORDER BY fixture_id))
+        FROM fact_fixtures WHERE league_id = ? AND season = ?
+    """, [league_id, season]).fetchone()[0]
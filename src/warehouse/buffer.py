@@ -0,0 +1,84 @@
+# src/warehouse/buffer.py
+"""
+Write-behind buffering for upserts.
+
+Per-fixture and per-page ingesters produce a few dozen rows per call; upserting each frame costs
+a register/INSERT ... ON CONFLICT/unregister and an implicit transaction every time. WriteBehind
+collects frames per (table, keys) across calls and writes them in large batches:
+
+    with WriteBehind(con, upsert, ckpt=ckpt) as wb:
+        for page, resp in pages:
+            wb.add("fact_odds", odds_frame(resp, ...), ["fixture_id", ...])
+            wb.done(f"page:{page}")
+    wb.totals   # rows written per table
+
+A flush concatenates each table's frames, keeps the last row per key (a later page wins, and
+ON CONFLICT can't touch a key twice in one statement), and upserts every table in one explicit
+transaction. With a journal checkpoint the items added since the last flush are marked in that
+same transaction (Checkpoint.commit), so a resumed run redoes exactly what wasn't flushed.
+Leaving the block flushes, on an exception too: what was fetched before the error is kept. A flush
+that fails drops its buffer (its items stay unjournaled, so a resumed run fetches them again).
+"""
+from __future__ import annotations
+from . import frames
+from .writer import atomic, transaction
+
+BUFFER_ROWS = 50_000
+
+
+class WriteBehind:
+    def __init__(self, con, upsert, max_rows: int = BUFFER_ROWS, ckpt=None):
+        """upsert(con, table, df, keys) -> rows; ckpt: journal.Checkpoint (optional)."""
+        self.con, self.upsert, self.max_rows, self.ckpt = con, upsert, max_rows, ckpt
+        self.totals: dict[str, int] = {}
+        self._parts: dict[tuple, list] = {}     # (table, keys) -> sources
+        self._items: list = []
+        self._rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def add(self, table: str, df, keys):
+        """Buffer `df` for an upsert into `table` on `keys`."""
+        src = frames.as_source(df)
+        if src is not None:
+            if isinstance(src, frames.pa.RecordBatchReader if frames.pa else ()):
+                src = src.read_all()    # a stream can't wait in a buffer
+            self._parts.setdefault((table, tuple(keys)), []).append(src)
+            self._rows += frames.num_rows(src)
+            self.totals.setdefault(table, 0)
+        if self._rows >= self.max_rows:
+            self.flush()
+
+    def done(self, item):
+        """Journal `item` (str or list, e.g. 'page:3') with the next flush; needs a checkpoint."""
+        if self.ckpt is not None:
+            self._items += [item] if isinstance(item, str) else list(item)
+
+    def flush(self) -> dict:
+        """Write everything buffered in one transaction; rows written per table."""
+        if not self._parts and not self._items:
+            return {}
+        try:
+            writes = [(table, frames.dedupe(frames.concat(parts), list(keys)), list(keys))
+                      for (table, keys), parts in self._parts.items()]
+            if self.ckpt is not None:
+                out = self.ckpt.commit(self.upsert, writes, self._items)
+            else:
+                out = atomic(self.con, self._tx, writes)
+        finally:
+            # a failed write is dropped, not retried by the exit flush on top of its own error
+            self._parts, self._items, self._rows = {}, [], 0
+        for table, n in out.items():
+            self.totals[table] = self.totals.get(table, 0) + n
+        return out
+
+    def _tx(self, con, writes) -> dict:
+        with transaction(con):
+            out = {}
+            for table, src, keys in writes:
+                out[table] = out.get(table, 0) + self.upsert(con, table, src, keys)
+        return out
@@ -0,0 +1,82 @@
+# src/warehouse/frames.py
+"""
+What the warehouse writers take.
+
+DB.insert_df, explore_data_pipeline.upsert and python_ingester.upsert_df accept a pandas
+DataFrame, a pyarrow Table / RecordBatch, a RecordBatchReader, or any iterable of RecordBatches.
+DuckDB scans Arrow data in place through register(): it's never converted to pandas nor copied
+into a staging table, and a stream is pulled batch by batch while the INSERT runs (so it can
+only be written once). pyarrow is optional (`pip install .[arrow]`); DataFrames work without it.
+"""
+from __future__ import annotations
+import itertools
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:     # Arrow inputs only
+    pa = pc = None
+
+
+def as_source(data):
+    """`data` as something con.register() scans, or None when there's nothing to write."""
+    if isinstance(data, pd.DataFrame):
+        return None if data.empty else data
+    if data is None:
+        return None
+    if pa is None:
+        raise TypeError(f"can't write a {type(data).__name__} without pyarrow")
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    if isinstance(data, pa.Table):
+        return data if data.num_rows else None
+    if isinstance(data, pa.RecordBatchReader):
+        return data
+    batches = iter(data)
+    first = next(batches, None)
+    if first is None:
+        return None
+    return pa.RecordBatchReader.from_batches(first.schema, itertools.chain([first], batches))
+
+
+def columns(src) -> list[str]:
+    return list(src.columns) if isinstance(src, pd.DataFrame) else list(src.schema.names)
+
+
+def num_rows(src) -> int:
+    return len(src) if isinstance(src, pd.DataFrame) else src.num_rows
+
+
+def empty_like(src):
+    """Zero rows with src's columns and types (reads nothing from a stream)."""
+    return src.head(0) if isinstance(src, pd.DataFrame) else src.schema.empty_table()
+
+
+def insert_from(con, name: str, src, sql: str) -> int:
+    """Run `sql` (an INSERT ... SELECT FROM `name`) with src registered as `name`; rows written."""
+    con.register(name, src)
+    try:
+        row = con.execute(sql).fetchone()
+    finally:
+        con.unregister(name)
+    return int(row[0]) if row else 0
+
+
+def concat(parts: list):
+    """One source from several buffered DataFrames / Arrow tables (Arrow if any part is)."""
+    if len(parts) == 1:
+        return parts[0]
+    if all(isinstance(p, pd.DataFrame) for p in parts):
+        return pd.concat(parts, ignore_index=True)
+    tables = [p if not isinstance(p, pd.DataFrame) else pa.Table.from_pandas(p, preserve_index=False) for p in parts]
+    return pa.concat_tables(tables, promote_options="permissive")
+
+
+def dedupe(src, keys: list):
+    """Last row per key: an INSERT ... ON CONFLICT can't touch one key twice."""
+    if isinstance(src, pd.DataFrame):
+        return src.drop_duplicates(keys, keep="last", ignore_index=True) if src.duplicated(keys).any() else src
+    last = src.append_column("_i", pa.array(range(src.num_rows), pa.int64())) \
+              .group_by(keys, use_threads=False).aggregate([("_i", "max")]).column("_i_max")
+    return src if len(last) == src.num_rows else src.take(pc.take(last, pc.sort_indices(last)))   # in row order
@@ -1,41 +1,134 @@
 # src/warehouse/io.py
+"""
+Append-only writer that creates and widens tables from the frames it's given.
+
+The columns of every table it touched are cached in-process: a call costs one INSERT, and the
+catalog is only read the first time a table is seen and only written when a frame brings new
+columns (the cache is updated with the ALTER). Tables changed behind its back: invalidate().
+
+bulk=True buffers frames per table and writes each table's buffer in one INSERT once it holds
+flush_rows rows or flush_bytes bytes, or on flush()/close()/leaving a `with DB(...)` block.
+Arrow streams (RecordBatchReader, batch iterators) are written through, after the buffer of their
+table, since they can only be read once.
+"""
 from __future__ import annotations
-import duckdb, pandas as pd
+import os, duckdb, pandas as pd
+from . import frames
+
+# the one warehouse every ingester, the quota ledger and the feature builders share
+DB_PATH = os.getenv("DUCKDB_PATH", r"C:/Users/campo/Desktop/sports betting/warehouse.duckdb")
+BULK_ROWS = 100_000
+BULK_BYTES = 64 * 2 ** 20
 
 class DB:
-    def __init__(self, path: str = "warehouse.duckdb"):
-        self.con = duckdb.connect(path)
-
-    def _ensure_table(self, table: str, sample_df: pd.DataFrame):
-        self.con.register("_sample_df", sample_df.head(0))
-        self.con.execute(f'''
-            CREATE TABLE IF NOT EXISTS "{table}" AS
-            SELECT * FROM _sample_df LIMIT 0
-        ''')
-        self.con.unregister("_sample_df")
-
-    def _add_missing_columns(self, table: str, df: pd.DataFrame):
-        have = {r[1] for r in self.con.execute(f"PRAGMA table_info('{table}')").fetchall()}
-        for col in df.columns:
-            if col not in have:
-                s = df[col]
+    def __init__(self, path: str | None = None, bulk: bool = False,
+                 flush_rows: int = BULK_ROWS, flush_bytes: int = BULK_BYTES):
+        self.con = duckdb.connect(path or DB_PATH)
+        self.bulk, self.flush_rows, self.flush_bytes = bulk, flush_rows, flush_bytes
+        self._columns: dict[str, list] = {}    # table -> columns, in table order
+        self._pending: dict[str, list] = {}    # table -> buffered sources (bulk)
+        self._pending_size: dict[str, tuple] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def invalidate(self, table: str | None = None):
+        """Forget cached columns (of one table, or all) after DDL done outside this class."""
+        if table is None:
+            self._columns.clear()
+        else:
+            self._columns.pop(table, None)
+
+    def _table_columns(self, table: str, src) -> list:
+        cols = self._columns.get(table)
+        if cols is None:
+            # declared types, not CREATE AS over an empty frame: DuckDB reads an empty object column as INTEGER
+            decl = ", ".join(f'"{c}" {t}' for c, t in self._column_types(src).items())
+            self.con.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({decl})')
+            cols = self._columns[table] = [r[1] for r in self.con.execute(f"PRAGMA table_info('{table}')").fetchall()]
+        return cols
+
+    def _column_types(self, src) -> dict:
+        if isinstance(src, pd.DataFrame):
+            out = {}
+            for col in src.columns:
+                s = src[col]
                 if pd.api.types.is_integer_dtype(s):           dtype = "BIGINT"
                 elif pd.api.types.is_float_dtype(s):           dtype = "DOUBLE"
                 elif pd.api.types.is_bool_dtype(s):            dtype = "BOOLEAN"
                 elif pd.api.types.is_datetime64_any_dtype(s):  dtype = "TIMESTAMP WITH TIME ZONE"
                 else:                                          dtype = "VARCHAR"
-                self.con.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}" {dtype}')
+                out[col] = dtype
+            return out
+        # Arrow carries its types: let DuckDB name them
+        self.con.register("_sample_df", frames.empty_like(src))
+        try:
+            return {r[0]: r[1] for r in self.con.execute("DESCRIBE SELECT * FROM _sample_df").fetchall()}
+        finally:
+            self.con.unregister("_sample_df")
+
+    def _add_missing_columns(self, table: str, src) -> list:
+        cols = self._table_columns(table, src)
+        have = set(cols)
+        missing = [c for c in frames.columns(src) if c not in have]
+        if missing:
+            types = self._column_types(src)
+            for col in missing:
+                self.con.execute(f'ALTER TABLE "{table}" ADD COLUMN "{col}" {types[col]}')
+                cols.append(col)
+        return cols
 
-    def insert_df(self, table: str, df: pd.DataFrame) -> int:
-        if df is None or df.empty:
+    def _write(self, table: str, src) -> int:
+        try:
+            cols = self._add_missing_columns(table, src)
+            have = set(frames.columns(src))
+            sel = ", ".join(f'"{c}"' for c in cols if c in have)
+            return frames.insert_from(self.con, "_tmp_df", src,
+                                      f'INSERT INTO "{table}" ({sel}) SELECT {sel} FROM _tmp_df')
+        except duckdb.CatalogException:
+            self.invalidate(table)    # dropped or altered elsewhere: re-read next time
+            raise
+
+    def insert_df(self, table: str, df) -> int:
+        """
+        Append a DataFrame or Arrow data (see frames) to `table`, creating/widening it as needed.
+        In bulk mode the rows may only be buffered; returns the rows accepted either way.
+        """
+        src = frames.as_source(df)
+        if src is None:
             return 0
-        self._ensure_table(table, df)
-        self._add_missing_columns(table, df)
-
-        self.con.register("_tmp_df", df)
-        table_cols = [r[1] for r in self.con.execute(f"PRAGMA table_info('{table}')").fetchall()]
-        common = [c for c in table_cols if c in df.columns]
-        cols = ", ".join(f'"{c}"' for c in common)
-        self.con.execute(f'INSERT INTO "{table}" ({cols}) SELECT {cols} FROM _tmp_df')
-        self.con.unregister("_tmp_df")
-        return len(df)
+        bufferable = isinstance(src, pd.DataFrame) or (frames.pa is not None and isinstance(src, frames.pa.Table))
+        if not self.bulk or not bufferable:
+            self.flush(table)
+            return self._write(table, src)
+        rows, nbytes = _size(src)
+        self._pending.setdefault(table, []).append(src)
+        n0, b0 = self._pending_size.get(table, (0, 0))
+        self._pending_size[table] = (n0 + rows, b0 + nbytes)
+        if n0 + rows >= self.flush_rows or b0 + nbytes >= self.flush_bytes:
+            self.flush(table)
+        return rows
+
+    def flush(self, table: str | None = None) -> int:
+        """Write the buffered frames (of one table, or all), one INSERT per table."""
+        n = 0
+        for t in ([table] if table is not None else list(self._pending)):
+            parts = self._pending.pop(t, [])
+            self._pending_size.pop(t, None)
+            if parts:
+                n += self._write(t, frames.concat(parts))
+        return n
+
+    def close(self):
+        self.flush()
+        self.con.close()
+
+
+def _size(src) -> tuple[int, int]:
+    if isinstance(src, pd.DataFrame):
+        # shallow: object columns count their pointers, which is enough for a flush threshold
+        return len(src), int(src.memory_usage(index=False).sum())
+    return src.num_rows, src.nbytes
@@ -0,0 +1,33 @@
+# src/warehouse/keys.py
+"""
+Primary keys of warehouse tables whose key changed after they were first created, and rekey()
+to migrate a table still carrying the old one.
+"""
+from __future__ import annotations
+from .writer import transaction
+
+# one row per player and fixture they're listed for
+INJURY_KEY = ["league_id", "season", "team_id", "player_id", "fixture_id"]
+
+
+def rekey(con, table, keys, latest="updated_ts"):
+    """Rebuild `table` with PRIMARY KEY (keys) if it has another one, keeping the latest row of each
+    key (rows with a NULL key are dropped). Rows kept, or None when the key was already right."""
+    pk = con.execute("""
+        SELECT constraint_column_names FROM duckdb_constraints()
+        WHERE database_name = current_database() AND schema_name = current_schema()
+          AND table_name = ? AND constraint_type = 'PRIMARY KEY'
+    """, [table]).fetchone()
+    if pk is None or list(pk[0]) == list(keys):
+        return None
+    decl = ", ".join(f"{c} {t}" for c, t in con.execute(f"SELECT name, type FROM pragma_table_info('{table}')").fetchall())
+    key = ", ".join(keys)
+    with transaction(con):
+        con.execute(f"CREATE TABLE {table}__rekey ({decl}, PRIMARY KEY ({key}))")
+        n = con.execute(f"""
+            INSERT INTO {table}__rekey SELECT * FROM {table}
+            WHERE {" AND ".join(f"{k} IS NOT NULL" for k in keys)}
+            QUALIFY row_number() OVER (PARTITION BY {key} ORDER BY {latest} DESC NULLS LAST) = 1
+        """).fetchone()[0]
+        con.execute(f"DROP TABLE {table}; ALTER TABLE {table}__rekey RENAME TO {table}")
+    return n
@@ -0,0 +1,159 @@
+# src/warehouse/lake.py
+"""
+Parquet export of the fact tables, hive-partitioned, for consumers that shouldn't open warehouse.duckdb.
+
+    lake/fact_fixtures/league_id=39/season=2024/data_0.parquet
+    lake/fact_odds/league_id=39/season=2024/date=2025-03-08/data_0.parquet
+
+sync(con, root) rewrites only the partitions whose content changed since the last sync: each
+table's partitions are fingerprinted in one GROUP BY (row count + xor of row hashes) and compared
+with <root>/<table>/_sync.json. Changed partitions are written by one COPY ... PARTITION_BY into a
+staging directory and swapped in; partitions gone from the table are removed.
+
+views(con, root) / connect(root) expose the lake under the table names, as read_parquet views
+with hive partitioning: filters on league_id / season / date only open the matching files.
+
+    python -m src.warehouse.lake --db warehouse.duckdb --root lake
+"""
+from __future__ import annotations
+import json, os, shutil, uuid
+from datetime import date
+import duckdb, pandas as pd
+from .io import DB_PATH
+
+NULL = "__HIVE_DEFAULT_PARTITION__"     # what DuckDB's PARTITION_BY writes for NULL
+MANIFEST = "_sync.json"
+
+# table -> partition columns: (name, SQL expression over the table, type)
+LEAGUE_SEASON = [("league_id", "league_id", "INTEGER"), ("season", "season", "INTEGER")]
+LAKE_TABLES = {
+    "fact_fixtures": LEAGUE_SEASON,
+    "fact_player_stats_match": LEAGUE_SEASON,
+    "fact_injuries": LEAGUE_SEASON,
+    "fact_odds": LEAGUE_SEASON + [("date", "CAST(updated_ts AS DATE)", "DATE")],   # pull date
+    "odds": [("sport_key", "sport_key", "VARCHAR"), ("date", "CAST(last_update AS DATE)", "DATE")],
+}
+
+
+def _path(p: str) -> str:
+    return p.replace("\\", "/")
+
+
+def _part_dir(names, values) -> str:
+    def fmt(v):
+        if v is None or v is pd.NaT or (isinstance(v, float) and v != v):
+            return NULL
+        return v.isoformat() if isinstance(v, date) else str(v)
+    return "/".join(f"{n}={fmt(v)}" for n, v in zip(names, values))
+
+
+def _source(table: str, parts) -> str:
+    derived = [f"{expr} AS {name}" for name, expr, _ in parts if expr != name]
+    return f"SELECT *{''.join(', ' + d for d in derived)} FROM {table}"
+
+
+def _fingerprints(con, table: str, parts) -> dict:
+    names = [p[0] for p in parts]
+    cols = ", ".join(names)
+    rows = con.execute(f"""
+        SELECT {cols}, count(*), bit_xor(hash(t))
+        FROM ({_source(table, parts)}) t GROUP BY {cols}
+    """).fetchall()
+    return {_part_dir(names, r[:len(names)]): [int(r[-2]), int(r[-1])] for r in rows}
+
+
+def _load_manifest(path: str) -> dict:
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def _tables(con) -> set:
+    return {r[0] for r in con.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+
+
+def sync_table(con, root: str, table: str, parts=None) -> dict:
+    """Bring <root>/<table> up to date; counts of partitions written / unchanged / deleted."""
+    parts = parts or LAKE_TABLES[table]
+    names = [p[0] for p in parts]
+    base = os.path.join(root, table)
+    manifest_path = os.path.join(base, MANIFEST)
+    old = _load_manifest(manifest_path)
+    new = _fingerprints(con, table, parts)
+    changed = [d for d, fp in new.items() if old.get(d) != fp or not os.path.isdir(os.path.join(base, d))]
+    gone = [d for d in old if d not in new]
+
+    if changed:
+        os.makedirs(base, exist_ok=True)
+        staging = os.path.join(base, f".staging-{uuid.uuid4().hex}")
+        keys = pd.DataFrame([dict(kv.split("=", 1) for kv in d.split("/")) for d in changed])
+        match = " AND ".join(f"CAST(s.{n} AS VARCHAR) IS NOT DISTINCT FROM "
+                             f"nullif(c.{n}, '{NULL}')" for n in names)
+        con.register("_lake_changed", keys)
+        try:
+            con.execute(f"""
+                COPY (SELECT s.* FROM ({_source(table, parts)}) s SEMI JOIN _lake_changed c ON {match})
+                TO '{_path(staging)}' (FORMAT parquet, COMPRESSION zstd, PARTITION_BY ({", ".join(names)}))
+            """)
+        finally:
+            con.unregister("_lake_changed")
+        for d in changed:
+            final = os.path.join(base, d)
+            shutil.rmtree(final, ignore_errors=True)
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(os.path.join(staging, d), final)
+        shutil.rmtree(staging, ignore_errors=True)
+    for d in gone:
+        shutil.rmtree(os.path.join(base, d), ignore_errors=True)
+
+    if changed or gone or not os.path.exists(manifest_path):
+        os.makedirs(base, exist_ok=True)
+        with open(manifest_path + ".tmp", "w") as fh:
+            json.dump(new, fh, indent=1, sort_keys=True)
+        os.replace(manifest_path + ".tmp", manifest_path)
+    return {"written": len(changed), "unchanged": len(new) - len(changed), "deleted": len(gone)}
+
+
+def sync(con, root: str, tables=None) -> dict:
+    """sync_table for every lake table present in the warehouse."""
+    have = _tables(con)
+    return {t: sync_table(con, root, t) for t in (tables or LAKE_TABLES) if t in have}
+
+
+def views(con, root: str, tables=None, prefix: str = "") -> list:
+    """CREATE OR REPLACE VIEW <prefix><table> over each table's Parquet files; the views created."""
+    out = []
+    for table in tables or LAKE_TABLES:
+        base = os.path.join(root, table)
+        if not os.path.exists(os.path.join(base, MANIFEST)):
+            continue
+        types = ", ".join(f"'{n}': '{t}'" for n, _, t in LAKE_TABLES.get(table, ()))
+        con.execute(f"""
+            CREATE OR REPLACE VIEW {prefix}{table} AS
+            SELECT * FROM read_parquet('{_path(base)}/**/*.parquet', hive_partitioning = true,
+                                       hive_types = {{{types}}}, union_by_name = true)
+        """)
+        out.append(prefix + table)
+    return out
+
+
+def connect(root: str):
+    """In-memory DuckDB with the lake tables as views, for read-only consumers."""
+    con = duckdb.connect()
+    views(con, root)
+    return con
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Sync the fact tables to a partitioned Parquet lake")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--root", default=os.getenv("LAKE_ROOT", "lake"))
+    parser.add_argument("--tables", nargs="+", help=f"subset of {', '.join(LAKE_TABLES)}")
+    args = parser.parse_args()
+    con = duckdb.connect(args.db, read_only=True)
+    for table, res in sync(con, args.root, args.tables).items():
+        print(f"[lake] {table}: {res['written']} partitions written, {res['unchanged']} unchanged, "
+              f"{res['deleted']} deleted")
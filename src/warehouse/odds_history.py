@@ -0,0 +1,162 @@
+# src/warehouse/odds_history.py
+"""
+Append-only price history of both odds feeds.
+
+fact_odds keeps one row per (fixture, bookmaker, market, selection) and overwrites it on every
+refresh, and the `odds` snapshot table repeats unchanged prices on every pull. odds_history
+stores a row only when a price moves: record() drops incoming rows whose price equals the
+previous price of the same key (the last stored row, then the batch itself in ts order), and
+rows at or before the last stored ts (already seen). Recording the same snapshot twice is a no-op.
+
+    price_asof(con, ts, fixture_ids=[...])   price of every key as of ts
+    opening_closing(con, fixture_ids=[...])  first price, and last price at or before kickoff
+
+Keys: source ('api_football' / 'theoddsapi'), event_id (the provider's event; the fixture id for
+API-Football), bookmaker, market, selection; fixture_id is the API-Football fixture when known.
+"""
+from __future__ import annotations
+import duckdb, pandas as pd
+from . import frames
+from .writer import atomic
+
+KEY = ["source", "event_id", "bookmaker", "market", "selection"]
+COLUMNS = KEY + ["fixture_id", "kickoff", "ts", "price"]
+_K = ", ".join(KEY)
+
+
+def ensure_history(con):
+    con.execute("""
+    CREATE TABLE IF NOT EXISTS odds_history (
+        source VARCHAR,          -- 'api_football', 'theoddsapi'
+        event_id VARCHAR,        -- provider event id (API-Football: the fixture id)
+        bookmaker VARCHAR,
+        market VARCHAR,
+        selection VARCHAR,       -- lowercased: home / draw / away / over 2.5 ...
+        fixture_id BIGINT,       -- API-Football fixture, NULL while unresolved
+        kickoff TIMESTAMP,       -- UTC
+        ts TIMESTAMP,            -- UTC, when the bookmaker set this price
+        price DOUBLE,
+        PRIMARY KEY (source, event_id, bookmaker, market, selection, ts)
+    );
+    """)
+    # the key + ts is the PRIMARY KEY; lookups go through fixture_id (see _scope), which turns a
+    # per-fixture query into a few-ms probe however many seasons are stored
+    con.execute("CREATE INDEX IF NOT EXISTS odds_history_fixture ON odds_history (fixture_id)")
+
+
+def record(con, rows) -> int:
+    """Append the price changes in `rows` (COLUMNS; DataFrame or Arrow); rows stored."""
+    src = frames.as_source(rows)
+    if src is None:
+        return 0
+    ensure_history(con)
+    return atomic(con, _record, src)
+
+
+def _record(con, src) -> int:
+    return frames.insert_from(con, "_odds_new", src, f"""
+        INSERT INTO odds_history ({", ".join(COLUMNS)})
+        WITH new AS (
+            SELECT DISTINCT ON ({_K}, ts) {", ".join(COLUMNS)} FROM _odds_new
+            WHERE price IS NOT NULL AND ts IS NOT NULL
+        ), last AS (
+            SELECT {_K}, max(ts) AS ts, arg_max(price, ts) AS price
+            FROM odds_history SEMI JOIN new USING ({_K}) GROUP BY ALL
+        ), seq AS (
+            SELECT n.*, false AS stored FROM new n LEFT JOIN last l USING ({_K})
+            WHERE l.ts IS NULL OR n.ts > l.ts
+            UNION ALL BY NAME
+            SELECT *, true AS stored FROM last
+        )
+        SELECT {", ".join(COLUMNS)} FROM (
+            SELECT *, lag(price) OVER (PARTITION BY {_K} ORDER BY ts) AS prev FROM seq
+        ) WHERE NOT stored AND prev IS DISTINCT FROM price
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def capture_fact_odds(con, league_id: int | None = None, season: int | None = None) -> int:
+    """Record the current fact_odds prices (of one league/season); run after each odds refresh."""
+    where, params = [], []
+    for col, val in (("o.league_id", league_id), ("o.season", season)):
+        if val is not None:
+            where.append(f"{col} = ?")
+            params.append(val)
+    rows = con.execute(f"""
+        SELECT 'api_football' AS source, CAST(o.fixture_id AS VARCHAR) AS event_id,
+               o.bookmaker_name AS bookmaker, o.market_key AS market, lower(o.selection) AS selection,
+               o.fixture_id, f.date_utc AS kickoff, coalesce(o.last_update, o.updated_ts) AS ts,
+               o.value AS price
+        FROM fact_odds o LEFT JOIN fact_fixtures f USING (fixture_id)
+        {"WHERE " + " AND ".join(where) if where else ""}
+    """, params).fetchdf()
+    return record(con, rows)
+
+
+def theoddsapi_rows(odds: pd.DataFrame) -> pd.DataFrame:
+    """History rows from an `odds` snapshot frame (loaders.build_odds_df_from_theoddsapi)."""
+    if odds is None or odds.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    sides = {"price_home": "home", "price_draw": "draw", "price_away": "away"}
+    ts = lambda s: pd.to_datetime(s, utc=True, errors="coerce").dt.tz_localize(None)
+    base = pd.DataFrame({
+        "source": "theoddsapi", "event_id": odds["event_id"].astype(str), "bookmaker": odds["bookmaker"],
+        "market": odds["market"], "fixture_id": odds.get("fixture_id"),
+        "kickoff": ts(odds["commence_time"]), "ts": ts(odds["last_update"]),
+    })
+    long = pd.concat([base.assign(selection=sel, price=pd.to_numeric(odds[col], errors="coerce"))
+                      for col, sel in sides.items() if col in odds], ignore_index=True)
+    long["fixture_id"] = long["fixture_id"].astype("Int64")
+    return long[COLUMNS]
+
+
+def backfill(con) -> dict:
+    """History from what the warehouse already holds: fact_odds, and every pull in `odds`."""
+    out = {"api_football": capture_fact_odds(con)}
+    try:
+        snaps = con.execute("SELECT * FROM odds ORDER BY last_update").fetchdf()
+    except duckdb.CatalogException:
+        snaps = None
+    out["theoddsapi"] = record(con, theoddsapi_rows(snaps))
+    return out
+
+
+def _scope(fixture_ids=None, bookmaker=None, market=None) -> tuple[str, str, dict]:
+    """(CTE `h`, extra WHERE, params) for the rows asked for."""
+    # the fixture ids alone, as a literal list, in their own CTE: DuckDB only probes the
+    # fixture_id index for a lone = / IN filter (not for a subquery, ANY(?) or an AND)
+    ids = "true" if fixture_ids is None else \
+        f"fixture_id IN ({', '.join(str(int(f)) for f in fixture_ids) or 'NULL'})"
+    where, params = ["true"], {}
+    for col, val in (("bookmaker", bookmaker), ("market", market)):
+        if val is not None:
+            where.append(f"{col} = ${col}")
+            params[col] = val
+    return f"WITH h AS MATERIALIZED (SELECT * FROM odds_history WHERE {ids})", " AND ".join(where), params
+
+
+def price_asof(con, ts, fixture_ids=None, bookmaker=None, market=None) -> pd.DataFrame:
+    """Price of each key as of `ts` (UTC): its last change at or before ts, with that change's ts."""
+    cte, where, params = _scope(fixture_ids, bookmaker, market)
+    ts = pd.Timestamp(ts)
+    ts = ts.tz_convert(None) if ts.tzinfo else ts
+    return con.execute(f"""
+        {cte}
+        SELECT {_K}, any_value(fixture_id) AS fixture_id, max(ts) AS ts, arg_max(price, ts) AS price
+        FROM h WHERE {where} AND ts <= $cut
+        GROUP BY ALL ORDER BY ALL
+    """, {**params, "cut": ts.to_pydatetime()}).fetchdf()
+
+
+def opening_closing(con, fixture_ids=None, bookmaker=None, market=None) -> pd.DataFrame:
+    """First recorded price and the last one at or before kickoff (closing), per key."""
+    cte, where, params = _scope(fixture_ids, bookmaker, market)
+    return con.execute(f"""
+        {cte}
+        SELECT {_K}, any_value(fixture_id) AS fixture_id, any_value(kickoff) AS kickoff,
+               min(ts) AS opening_ts, arg_min(price, ts) AS opening_price,
+               max(ts) FILTER (ts <= kickoff) AS closing_ts,
+               arg_max(price, ts) FILTER (ts <= kickoff) AS closing_price
+        FROM h WHERE {where}
+        GROUP BY ALL ORDER BY ALL
+    """, params).fetchdf()
@@ -107,7 +107,38 @@ CREATE TABLE IF NOT EXISTS fact_player_stats_match (
   PRIMARY KEY (fixture_id, player_id, team_id)
 );
 
+CREATE TABLE IF NOT EXISTS fact_lineups (
+  fixture_id INTEGER,
+  league_id INTEGER,
+  season INTEGER,
+  team_id INTEGER,
+  player_id INTEGER,
+  player_name VARCHAR,
+  number INTEGER,
+  position VARCHAR,       -- 'G','D','M','F'
+  grid VARCHAR,           -- e.g. '2:3'
+  is_starter BOOLEAN,
+  formation VARCHAR,
+  updated_ts TIMESTAMP,
+  PRIMARY KEY (fixture_id, team_id, player_id)
+);
 
+CREATE TABLE IF NOT EXISTS fact_events (
+  fixture_id INTEGER,
+  league_id INTEGER,
+  season INTEGER,
+  event_idx INTEGER,      -- position in the API's event list
+  elapsed INTEGER,
+  extra INTEGER,
+  team_id INTEGER,
+  player_id INTEGER,
+  assist_id INTEGER,
+  type VARCHAR,           -- 'Goal','Card','subst','Var'
+  detail VARCHAR,
+  comments VARCHAR,
+  updated_ts TIMESTAMP,
+  PRIMARY KEY (fixture_id, event_idx)
+);
 
 CREATE TABLE IF NOT EXISTS fact_standings_snapshot (
   league_id INTEGER,
@@ -130,13 +161,13 @@ CREATE TABLE IF NOT EXISTS fact_injuries (
   team_id INTEGER,
   player_id INTEGER,
   player_name VARCHAR,
-  status VARCHAR,               -- 'Injured', 'Doubtful', etc.
+  status VARCHAR,               -- 'Missing Fixture', 'Questionable'
   reason VARCHAR,
   start_date date,
   expected_return date,
   fixture_id INTEGER,
   updated_ts TIMESTAMP,
-  PRIMARY KEY (league_id, season, team_id, player_id, start_date)
+  PRIMARY KEY (league_id, season, team_id, player_id, fixture_id)
 );
 
 -- Odds (one row per fixture-bookmaker-market selection; granular)
@@ -0,0 +1,122 @@
+# src/warehouse/writer.py
+"""
+Single-writer access to a DuckDB connection shared by many threads.
+
+DuckDB allows one writer process, and a connection must not be used by two threads at
+once. SingleWriter owns the connection on a dedicated thread and serialises every
+statement through a queue; it quacks like a connection for what the ingesters use
+(execute(...).fetchdf()/fetchone()/fetchall(), register, cursor), and `atomic` runs a
+whole multi-statement function (e.g. register -> INSERT ... ON CONFLICT -> unregister)
+without other threads interleaving. Inside it, `with transaction(con):` makes the block
+all-or-nothing.
+"""
+from __future__ import annotations
+import queue, threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+import pandas as pd
+
+_STOP = object()
+
+
+class _Result:
+    """Materialised query result, safe to read from any thread."""
+    def __init__(self, description, rows):
+        self.description = description
+        self._rows = rows
+        self._pos = 0
+
+    def fetchall(self):
+        rows, self._pos = self._rows[self._pos:], len(self._rows)
+        return rows
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchdf(self):
+        cols = [d[0] for d in self.description or []]
+        return pd.DataFrame.from_records(self.fetchall(), columns=cols)
+
+    df = fetchdf
+
+
+class SingleWriter:
+    def __init__(self, con):
+        self._con = con
+        self._q: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="duckdb-writer", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            item = self._q.get()
+            if item is _STOP:
+                break
+            fut, fn, args, kwargs = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(self._con, *args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        fut = Future()
+        if threading.current_thread() is self._thread:
+            # re-entrant call from inside an atomic function: run inline
+            fut.set_result(fn(self._con, *args, **kwargs))
+        else:
+            self._q.put((fut, fn, args, kwargs))
+        return fut
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn(con, *args) on the writer thread and wait for its result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    # --- connection-like surface ---
+    def execute(self, sql, params=None):
+        def _run(con):
+            cur = con.execute(sql, params) if params is not None else con.execute(sql)
+            desc = cur.description
+            return _Result(desc, cur.fetchall() if desc else [])
+        return self.call(_run)
+
+    def register(self, name, obj):
+        return self.call(lambda con: con.register(name, obj))
+
+    def unregister(self, name):
+        return self.call(lambda con: con.unregister(name))
+
+    def cursor(self):
+        return self.call(lambda con: con.cursor())
+
+    def close(self):
+        self._q.put(_STOP)
+        self._thread.join()
+        self._con.close()
+
+
+def atomic(con, fn, *args, **kwargs):
+    """
+    Run fn(con, *args) as one unit: on the writer thread for a SingleWriter,
+    directly for a plain connection.
+    """
+    if isinstance(con, SingleWriter):
+        return con.call(fn, *args, **kwargs)
+    return fn(con, *args, **kwargs)
+
+
+@contextmanager
+def transaction(con):
+    """BEGIN ... COMMIT around the block, ROLLBACK if it raises. `con` is the plain connection
+    (e.g. the one atomic passes in), not a SingleWriter."""
+    con.execute("BEGIN TRANSACTION")
+    try:
+        yield con
+        con.execute("COMMIT")
+    except BaseException:
+        con.execute("ROLLBACK")
+        raise
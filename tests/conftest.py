@@ -0,0 +1,8 @@
+import pytest
+from src.ingest import quota
+
+
+@pytest.fixture(autouse=True)
+def _ledger(monkeypatch):
+    """Tests attach the quota ledger to their own warehouse; put the global one back afterwards."""
+    monkeypatch.setattr(quota, "_ledger", quota._ledger)
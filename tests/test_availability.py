@@ -0,0 +1,65 @@
+import duckdb
+import pytest
+from bench.standin import StandIn
+from src.features import availability, team_strength
+from src.ingest import quota
+from src.ingest.explore_data_pipeline import ensure_schema, ingest_injuries
+
+
+def test_injuries_keyed_per_fixture_and_repulls_are_noops():
+    con = duckdb.connect()
+    # a warehouse from before: keyed on updated_ts, one copy of each report per pull
+    con.execute("""CREATE TABLE fact_injuries (league_id INTEGER, season INTEGER, team_id INTEGER, player_id INTEGER,
+                   player_name VARCHAR, status VARCHAR, reason VARCHAR, start_date DATE, expected_return DATE,
+                   fixture_id INTEGER, updated_ts TIMESTAMP,
+                   PRIMARY KEY (league_id, season, team_id, player_id, updated_ts))""")
+    con.execute("""INSERT INTO fact_injuries SELECT 78, 2022, 1, 7, 'X', NULL, r, NULL, NULL, 100,
+                   TIMESTAMP '2025-10-01' + INTERVAL (d) DAY FROM (VALUES (0, 'Knock'), (1, 'Knee Injury')) v(d, r)""")
+    ensure_schema(con)
+    assert con.execute("SELECT reason FROM fact_injuries").fetchall() == [("Knee Injury",)]
+    quota.attach(con)
+    with StandIn() as srv:
+        srv.use()
+        first = ingest_injuries(con, 78, 2022)
+        assert ingest_injuries(con, 78, 2022) == 0
+        reports = len(srv.universe.injuries(78, 2022))
+    assert first == reports == con.execute("SELECT count(*) - 1 FROM fact_injuries").fetchone()[0]
+    assert con.execute("SELECT count(*) FROM fact_injuries WHERE status IS NULL").fetchone()[0] == 1
+
+
+def _warehouse():
+    con = duckdb.connect()
+    ensure_schema(con)
+    # team 1 hosts team 2 weekly; matchdays 1-4 played with 11 each, player 7 misses 2 and 3
+    con.execute("""INSERT INTO fact_fixtures (fixture_id, league_id, season, date_utc, home_team_id, away_team_id)
+                   SELECT f, 39, 2024, TIMESTAMP '2024-08-01' + INTERVAL (f * 7) DAY, 1, 2 FROM range(1, 7) r(f)""")
+    con.execute("""INSERT INTO fact_player_stats_match (fixture_id, league_id, season, team_id, player_id, minutes)
+                   SELECT f, 39, 2024, t, t * 100 + p, 90 FROM range(1, 5) r(f), range(1, 3) s(t), range(1, 13) q(p)
+                   WHERE CASE WHEN t = 1 AND f IN (2, 3) THEN p <> 7 ELSE p <> 12 END""")
+    con.execute("""INSERT INTO fact_injuries (league_id, season, team_id, player_id, status, reason, fixture_id, updated_ts)
+                   VALUES (39, 2024, 1, 107, 'Missing Fixture', 'Hamstring', 2, '2024-08-14'),
+                          (39, 2024, 1, 107, 'Missing Fixture', 'Hamstring', 3, '2024-08-21'),
+                          (39, 2024, 1, 107, 'Questionable', 'Hamstring', 5, '2024-09-04'),
+                          (39, 2024, 2, 201, 'Missing Fixture', 'Suspended', 6, '2024-09-11')""")
+    team_strength.refresh(con)
+    return con
+
+
+def test_spells_and_minutes_share():
+    con = _warehouse()
+    assert availability.refresh(con) == {"injury_spells": 3, "fixture_absences": 4}
+    spells = con.execute("SELECT player_id, first_fixture_id, fixtures, end_ts FROM injury_spells "
+                         "ORDER BY player_id, start_ts").fetchall()
+    assert [s[:3] for s in spells] == [(107, 2, 2), (107, 5, 1), (201, 6, 1)]
+    assert spells[-1][3] is None                    # nothing scheduled after it yet
+
+    a = con.execute("SELECT * FROM fixture_absences ORDER BY date_utc, team_id").fetchdf()
+    assert a["spell_fixture"].tolist() == [1, 2, 1, 1]
+    assert a["doubtful"].tolist() == [False, False, True, False]
+    # 90 of the team's 990 minutes before matchday 2, 90 of 1980 before 3, 180 of 3960 before 5
+    assert a["minutes_share_l5"].tolist()[:3] == pytest.approx([1 / 11, 1 / 22, 1 / 22])
+    assert a["minutes_share_season"].tolist()[:3] == pytest.approx([1 / 11, 1 / 22, 1 / 22])
+
+    t = availability.team_absences(con, [3, 5]).set_index("fixture_id")
+    assert (t.loc[3, "n_out"], t.loc[5, "n_out"], t.loc[5, "n_doubtful"]) == (1, 0, 1)
+    assert t.loc[5, "doubtful_share_l5"] == pytest.approx(1 / 22) and t.loc[5, "out_share_l5"] == 0
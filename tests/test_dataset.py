@@ -0,0 +1,97 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+from bench.standin import StandIn
+from src.features import availability, dataset, player_form, prekickoff_odds, standings, team_strength
+from src.ingest import quota
+from src.ingest.explore_data_pipeline import ensure_schema, ingest_fixture_details, ingest_fixtures, ingest_injuries
+
+
+def _refresh(con):
+    standings.refresh(con)
+    player_form.refresh(con)
+    team_strength.refresh(con)
+    availability.refresh(con)
+    prekickoff_odds.refresh(con)
+
+
+@pytest.fixture(scope="module")
+def warehouse():
+    con = duckdb.connect()
+    ensure_schema(con)
+    with StandIn() as srv, quota.attached(con):
+        srv.use()
+        ingest_fixtures(con, 78, 2022)
+        ingest_injuries(con, 78, 2022)
+        ingest_fixture_details(con, 78, 2022, workers=4)
+    # injury lists pulled the day before kickoff for even fixtures, half an hour before for odd ones
+    con.execute("""UPDATE fact_injuries i SET updated_ts = f.date_utc - CASE WHEN i.fixture_id % 2 = 0
+                   THEN INTERVAL 1 DAY ELSE INTERVAL 30 MINUTE END FROM fact_fixtures f WHERE f.fixture_id = i.fixture_id""")
+    prekickoff_odds.ensure_prekickoff(con)
+    # two books pricing 1X2 two days, 12 hours and 30 minutes before kickoff
+    con.execute("""INSERT INTO odds_history
+                   SELECT 'api_football', fixture_id::VARCHAR, b, 'match winner', sel, fixture_id, date_utc,
+                          date_utc - to_minutes(m), CASE WHEN m = 30 THEN 9.0 ELSE 2 + m / 1000 END
+                   FROM fact_fixtures, (VALUES ('bet365'), ('pinnacle')) x(b),
+                        (VALUES ('home'), ('draw'), ('away')) y(sel), (VALUES (2880), (720), (30)) z(m)""")
+    _refresh(con)
+    return con
+
+
+def test_matrix_is_as_of_the_cutoff(warehouse, tmp_path):
+    con = warehouse
+    before = dataset.build(con, str(tmp_path / "a.arrow"), chunk_rows=100)
+    assert before == {"rows": 306, "columns": 7 + 2 * len(dataset.SIDE_FEATURES) + 7 + 3}
+    a = dataset.load(str(tmp_path / "a.arrow")).to_pandas()
+    assert np.allclose(a["odds_home"], 2.72) and (a["n_books"] == 2).all()         # not the T-30min 9.0
+    assert a["date_utc"].is_monotonic_increasing and (a["cutoff_ts"] == a["date_utc"] - pd.Timedelta(hours=1)).all()
+    assert a["home_played"].iloc[-1] == 33 and pd.isna(a["home_played"].iloc[0])
+    listed = a["home_n_out"] + a["home_n_doubtful"] + a["away_n_out"] + a["away_n_doubtful"]
+    assert listed[a["fixture_id"] % 2 == 0].sum() > 0 and listed[a["fixture_id"] % 2 == 1].sum() == 0
+
+    # rewrite a mid-season result and its player ratings: nothing known before it ends may move
+    mid = a.iloc[150]
+    con.execute("UPDATE fact_fixtures SET home_goals = home_goals + 5 WHERE fixture_id = ?", [int(mid["fixture_id"])])
+    con.execute("UPDATE fact_player_stats_match SET rating = '9.9' WHERE fixture_id = ?", [int(mid["fixture_id"])])
+    _refresh(con)
+    dataset.build(con, str(tmp_path / "b.arrow"))
+    b = dataset.load(str(tmp_path / "b.arrow")).to_pandas()
+    known = mid["date_utc"] + dataset.FINAL_WHISTLE
+    early = (a["cutoff_ts"] < known) & (a["fixture_id"] != mid["fixture_id"])
+    pd.testing.assert_frame_equal(a[early], b[early])
+    assert not a[~early].drop(columns=["y_home_goals", "y_result"]).equals(b[~early].drop(columns=["y_home_goals", "y_result"]))
+
+
+def test_npy_matches_arrow_and_offsets(warehouse, tmp_path):
+    con = warehouse
+    dataset.build(con, str(tmp_path / "d.arrow"), offset=pd.Timedelta(hours=24))
+    assert dataset.build(con, str(tmp_path / "d.npy"), offset=pd.Timedelta(hours=24), chunk_rows=100)["rows"] == 306
+    X, columns = dataset.load(str(tmp_path / "d.npy"))
+    assert isinstance(X, np.memmap) and X.shape == (306, len(columns))
+    a = dataset.load(str(tmp_path / "d.arrow")).to_pandas()
+    assert columns == list(a.columns)
+    assert np.allclose(X[:, columns.index("odds_draw")], a["odds_draw"]) and np.allclose(a["odds_draw"], 4.88)
+    assert np.array_equal(X[:, columns.index("home_rank")], a["home_rank"].to_numpy(float), equal_nan=True)
+    assert X[0, columns.index("date_utc")] == a["date_utc"].iloc[0].timestamp()
+    with pytest.raises(ValueError):
+        dataset.build(con, str(tmp_path / "x.arrow"), offset=pd.Timedelta(hours=6))
+
+
+def test_postponed_game_keeps_the_table_current(warehouse, tmp_path):
+    con = warehouse
+    # a round-2 game played after the last round: everyone else's tables still move on weekly
+    fid, home, away = con.execute("""SELECT fixture_id, home_team_id, away_team_id FROM fact_fixtures
+                                     WHERE round = 'Regular Season - 2' ORDER BY fixture_id LIMIT 1""").fetchone()
+    con.execute("""UPDATE fact_fixtures SET date_utc = (SELECT max(date_utc) FROM fact_fixtures) + INTERVAL 3 DAY
+                   WHERE fixture_id = ?""", [fid])
+    _refresh(con)
+    dataset.build(con, str(tmp_path / "p.arrow"))
+    a = dataset.load(str(tmp_path / "p.arrow")).to_pandas()
+    a = a[a["fixture_id"] != fid]
+    matchday = a["fixture_id"].map(dict(con.execute(
+        r"SELECT fixture_id, regexp_extract(round, '(\d+)$', 1)::INTEGER FROM fact_fixtures").fetchall()))
+    played = a["home_played"].fillna(0)
+    late = a["home_team_id"].isin([home, away]) & (matchday > 2)
+    assert (played[~late] == matchday[~late] - 1).all()       # the table after the last round
+    assert (played[late] == matchday[late] - 2).all()
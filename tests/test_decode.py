@@ -0,0 +1,23 @@
+import json
+import pytest
+from src.ingest import decode
+
+
+def test_iter_payload_streams_response():
+    payload = {"get": "fixtures", "errors": [], "paging": {"current": 1, "total": 2},
+               "response": [{"a": 1, "b": [1, {"c": "]}"}]}, {"a": "\"{"}, []], "tail": {"z": 1}}
+    for body in (json.dumps(payload).encode(), json.dumps(payload, indent=2)):
+        d = decode.iter_payload(body)
+        assert d["paging"] == {"current": 1, "total": 2}
+        assert "tail" not in d            # after `response`: only once it's consumed
+        assert list(d["response"]) == payload["response"]
+        assert d["tail"] == {"z": 1}
+    assert decode.loads(json.dumps(payload).encode()) == payload
+
+
+def test_iter_payload_edge_cases():
+    assert list(decode.iter_payload(b'{"response": []}')["response"]) == []
+    assert decode.iter_payload(b'{"errors": {"plan": "x"}}') == {"errors": {"plan": "x"}}
+    assert decode.iter_payload(b"[1, 2]") == [1, 2]
+    with pytest.raises(json.JSONDecodeError):
+        list(decode.iter_payload(b'{"response": [{"a": 1}, ')["response"])
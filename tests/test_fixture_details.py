@@ -0,0 +1,54 @@
+import duckdb
+from src.ingest.explore_data_pipeline import (
+    ensure_schema, upsert, fixture_detail_frames, DETAIL_KEYS,
+)
+
+
+def _fixture(fid, home=1, away=2):
+    return {
+        "fixture": {"id": fid, "date": "2024-08-24T13:30:00+00:00", "referee": "Ref",
+                    "venue": {"id": 10, "name": "Arena"}, "status": {"short": "FT"}},
+        "league": {"id": 78, "season": 2024, "round": "Regular Season - 1"},
+        "teams": {"home": {"id": home}, "away": {"id": away}},
+        "goals": {"home": 2, "away": 1},
+        "events": [
+            {"time": {"elapsed": 12, "extra": None}, "team": {"id": home},
+             "player": {"id": 100}, "assist": {"id": 101}, "type": "Goal", "detail": "Normal Goal"},
+            {"time": {"elapsed": 80, "extra": None}, "team": {"id": away},
+             "player": {"id": 200}, "assist": {"id": None}, "type": "Card", "detail": "Yellow Card"},
+        ],
+        "lineups": [
+            {"team": {"id": home}, "formation": "4-3-3",
+             "startXI": [{"player": {"id": 100, "name": "A", "number": 9, "pos": "F", "grid": "4:2"}}],
+             "substitutes": [{"player": {"id": 101, "name": "B", "number": 20, "pos": "M", "grid": None}}]},
+        ],
+        "players": [
+            {"team": {"id": home, "name": "Home FC"},
+             "players": [{"player": {"id": 100, "name": "A"},
+                          "statistics": [{"games": {"minutes": 90, "rating": "7.4", "captain": True},
+                                          "goals": {"total": 1}}]}]},
+        ],
+    }
+
+
+def test_fixture_detail_frames_fan_out():
+    """One /fixtures?ids= item fans out into every detail table."""
+    frames = fixture_detail_frames([_fixture(1), _fixture(2, home=3, away=4)], 78, 2024)
+    assert set(frames) == set(DETAIL_KEYS)
+    assert len(frames["fact_fixtures"]) == 2
+    assert len(frames["fact_player_stats_match"]) == 2
+    assert len(frames["fact_lineups"]) == 4
+    assert frames["fact_lineups"]["is_starter"].tolist() == [True, False, True, False]
+    assert frames["fact_events"]["event_idx"].tolist() == [0, 1, 0, 1]
+
+
+def test_fixture_detail_frames_upsert_idempotent():
+    """Frames match the warehouse schema and re-ingesting a batch doesn't duplicate rows."""
+    con = duckdb.connect()
+    ensure_schema(con)
+    for _ in range(2):
+        for table, df in fixture_detail_frames([_fixture(1)], 78, 2024).items():
+            upsert(con, table, df, DETAIL_KEYS[table])
+    assert con.execute("select count(*) from fact_events").fetchone()[0] == 2
+    assert con.execute("select count(*) from fact_lineups").fetchone()[0] == 2
+    assert con.execute("select minutes from fact_player_stats_match").fetchone()[0] == 90
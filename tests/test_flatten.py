@@ -0,0 +1,57 @@
+import traceback
+import pandas as pd
+import pytest
+from src.ingest.flatten import Spec, flatten, prefixed, INT, FLOAT, TS
+
+
+def test_flatten_nested_lists_and_constants():
+    spec = Spec(
+        ("fixture.id", "fixture_id", INT),
+        "league_id",
+        ("books[].name", "book"),
+        ("books[].bets[].odd", "odd", FLOAT),
+        ("books[].bets[].#", "pos"),
+        ("date", "date_utc", TS),
+    )
+    resp = [
+        {"fixture": {"id": 1}, "date": "2024-08-24T13:30:00+00:00",
+         "books": [{"name": "a", "bets": [{"odd": "1.5"}, {"odd": None}]}, {"name": "b", "bets": []}]},
+        {"fixture": None, "books": [{"name": "c", "bets": [{"odd": 2}]}]},
+    ]
+    df = flatten(spec, resp, league_id=78)
+    assert list(df.columns) == ["fixture_id", "league_id", "book", "odd", "pos", "date_utc"]
+    assert df["fixture_id"].tolist() == [1, 1, pd.NA]
+    assert df["league_id"].tolist() == [78, 78, 78]
+    assert df["book"].tolist() == ["a", "a", "c"]
+    assert df["odd"].tolist()[::2] == [1.5, 2.0] and pd.isna(df["odd"][1])
+    assert df["pos"].tolist() == [0, 1, 0]
+    assert str(df["date_utc"].dtype) == "datetime64[ns, UTC]" and pd.isna(df["date_utc"][2])
+
+
+def test_flatten_index_alternatives_and_prefix():
+    fields = ["fixture_id", ("statistics[0].games.minutes", "minutes", INT), ("team.teamId|TeamId", "team_id", INT)]
+    resp = [{"fixture": {"id": 9}, "players": [
+        {"statistics": [{"games": {"minutes": 90}}, {"games": {"minutes": 5}}], "team": {"TeamId": 3}},
+        {"statistics": [], "team": {"teamId": 4}},
+    ]}]
+    spec = Spec(*prefixed("players[].", fields, fixture_id=("fixture.id", INT)))
+    df = flatten(spec, resp)
+    assert df["fixture_id"].tolist() == [9, 9]
+    assert df["minutes"].tolist() == [90, pd.NA]
+    assert df["team_id"].tolist() == [3, 4]
+    assert flatten(spec, []).empty
+
+
+def test_spec_rejects_diverging_lists():
+    with pytest.raises(ValueError):
+        Spec(("home[].id", "home"), ("away[].id", "away"))
+
+
+def test_generated_code_shows_in_tracebacks():
+    spec = Spec(("fixture.id", "fixture_id", INT))
+    assert spec.source.startswith("def _extract(records, cols):")
+    with pytest.raises(TypeError) as e:
+        flatten(spec, 5)
+    frame = traceback.extract_tb(e.value.__traceback__)[-1]
+    assert frame.filename.startswith("<flatten.Spec ") and "fixture_id" in frame.filename
+    assert frame.line == "for i0, x0 in enumerate(records):"
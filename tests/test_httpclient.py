@@ -0,0 +1,60 @@
+import duckdb
+import httpx
+from bench.standin import StandIn, Faults
+from src.ingest import httpclient, quota
+
+
+def _ledger_rows(con):
+    return con.execute("SELECT provider, endpoint, cost, remaining FROM api_quota_ledger ORDER BY call_ts").fetchall()
+
+
+def test_5xx_backs_off_and_gives_up_after_the_retries(monkeypatch):
+    monkeypatch.setattr(httpclient, "BACKOFF", 0.0)
+    con = duckdb.connect()
+    quota.attach(con)
+    with StandIn(faults=Faults(p5xx=1.0)) as srv:
+        srv.use()
+        r = httpclient.request(httpclient.API_FOOTBALL, "/teams", {"league": 39, "season": 2024}, retries=3)
+        stats = srv.stats()
+    assert r.status_code == 503
+    assert stats["/teams"] == stats["5xx"] == 3
+    assert _ledger_rows(con) == []                  # not billed by the provider
+
+
+def test_failed_attempt_then_success_records_one_call(monkeypatch):
+    monkeypatch.setattr(httpclient, "BACKOFF", 0.0)
+    con = duckdb.connect()
+    quota.attach(con)
+    answers = iter([httpx.Response(500), httpx.Response(200, json={"response": []},
+                                                        headers={"x-ratelimit-requests-remaining": "99"})])
+    fake = httpx.Client(base_url="http://upstream", transport=httpx.MockTransport(lambda request: next(answers)))
+    monkeypatch.setitem(httpclient._clients, httpclient.API_FOOTBALL, fake)
+    assert httpclient.get_json(httpclient.API_FOOTBALL, "/teams") == {"response": []}
+    assert _ledger_rows(con) == [(quota.API_FOOTBALL, "/teams", 1, 99)]
+
+
+def test_429_waits_and_is_not_billed():
+    con = duckdb.connect()
+    quota.attach(con)
+    with StandIn(faults=Faults(p429=1.0, p429_body=0.0, retry_after=0.01)) as srv:
+        srv.use()
+        r = httpclient.request(httpclient.API_FOOTBALL, "/teams", {"league": 39, "season": 2024}, retries=2)
+        assert srv.stats()["429"] == 2
+        srv.faults.p429 = 0.0
+        teams = httpclient.get_json(httpclient.API_FOOTBALL, "/teams", {"league": 39, "season": 2024})
+    assert r.status_code == 429
+    assert len(teams["response"]) == 20
+    assert _ledger_rows(con) == [(quota.API_FOOTBALL, "/teams", 1, 75_000 - 3)]
+
+
+def test_set_base_url_swaps_the_pooled_client():
+    before = httpclient.PROVIDERS[httpclient.OPENLIGADB]["base_url"]
+    old = httpclient.client(httpclient.OPENLIGADB)
+    with StandIn() as srv:
+        srv.use()
+        c = httpclient.client(httpclient.OPENLIGADB)
+        assert old.is_closed and c is not old
+        assert str(c.base_url).rstrip("/") == srv.url
+        assert httpclient.get_json(httpclient.OPENLIGADB, "/getmatchdata/bl1/2023")
+    assert httpclient.PROVIDERS[httpclient.OPENLIGADB]["base_url"] == before
+    assert c.is_closed
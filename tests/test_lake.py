@@ -0,0 +1,41 @@
+import os
+import duckdb
+from src.warehouse import lake
+
+
+def _warehouse():
+    con = duckdb.connect()
+    con.execute("""
+        CREATE TABLE fact_fixtures AS
+        SELECT i AS fixture_id, l AS league_id, s AS season, 'team ' || i AS home
+        FROM range(8) r(i), (VALUES (39), (78)) a(l), (VALUES (2023), (2024)) b(s)
+    """)
+    con.execute("""
+        CREATE TABLE fact_odds AS
+        SELECT 1 AS fixture_id, 39 AS league_id, 2024 AS season, 'bet365' AS bookmaker,
+               TIMESTAMP '2025-03-08 12:00:00' + INTERVAL (i) DAY AS updated_ts, 2.0 + i AS odd
+        FROM range(3) r(i)
+    """)
+    return con
+
+
+def test_sync_rewrites_only_changed_partitions(tmp_path):
+    con, root = _warehouse(), str(tmp_path)
+    res = lake.sync(con, root)
+    assert res["fact_fixtures"] == {"written": 4, "unchanged": 0, "deleted": 0}
+    assert res["fact_odds"]["written"] == 3
+    assert os.path.isdir(os.path.join(root, "fact_odds", "league_id=39", "season=2024", "date=2025-03-09"))
+
+    assert lake.sync(con, root)["fact_fixtures"] == {"written": 0, "unchanged": 4, "deleted": 0}
+    con.execute("UPDATE fact_fixtures SET home = 'renamed' WHERE fixture_id = 3 AND league_id = 78 AND season = 2024")
+    con.execute("DELETE FROM fact_fixtures WHERE league_id = 39 AND season = 2023")
+    assert lake.sync(con, root)["fact_fixtures"] == {"written": 1, "unchanged": 2, "deleted": 1}
+    assert not os.path.exists(os.path.join(root, "fact_fixtures", "league_id=39", "season=2023"))
+
+    out = lake.connect(root)
+    assert out.execute("SELECT count(*) FROM fact_fixtures").fetchone()[0] == 24
+    assert out.execute("SELECT home FROM fact_fixtures WHERE league_id = 78 AND season = 2024 "
+                       "AND fixture_id = 3").fetchone()[0] == "renamed"
+    assert str(out.execute("SELECT max(date) FROM fact_odds").fetchone()[0]) == "2025-03-10"
+    plan = out.execute("EXPLAIN ANALYZE SELECT * FROM fact_fixtures WHERE league_id = 39").fetchall()[0][1]
+    assert "Scanning Files: 1/3" in plan
@@ -0,0 +1,68 @@
+import duckdb
+import pandas as pd
+from src.warehouse import odds_history
+
+
+def _rows(ts, prices, event="e1", fixture_id=7):
+    return pd.DataFrame([{"source": "theoddsapi", "event_id": event, "bookmaker": "pinnacle", "market": "h2h",
+                          "selection": sel, "fixture_id": fixture_id, "kickoff": pd.Timestamp("2025-03-08 15:00"),
+                          "ts": pd.Timestamp(ts), "price": price} for sel, price in prices.items()])
+
+
+def test_record_keeps_only_price_changes():
+    con = duckdb.connect()
+    assert odds_history.record(con, _rows("2025-03-07 10:00", {"home": 2.0, "away": 3.0})) == 2
+    assert odds_history.record(con, _rows("2025-03-07 10:00", {"home": 2.0, "away": 3.0})) == 0   # same pull again
+    assert odds_history.record(con, _rows("2025-03-07 12:00", {"home": 2.0, "away": 3.1})) == 1
+    batch = pd.concat([_rows("2025-03-08 14:00", {"home": 1.9}), _rows("2025-03-08 14:30", {"home": 1.9}),
+                       _rows("2025-03-08 15:30", {"home": 1.5})])
+    assert odds_history.record(con, batch) == 2
+
+    asof = odds_history.price_asof(con, "2025-03-07 11:00+00:00", fixture_ids=[7])
+    assert dict(zip(asof["selection"], asof["price"])) == {"home": 2.0, "away": 3.0}
+    assert odds_history.price_asof(con, "2025-03-07 09:00", fixture_ids=[7]).empty
+
+    oc = odds_history.opening_closing(con, fixture_ids=[7], market="h2h").set_index("selection")
+    assert oc.loc["home", "opening_price"] == 2.0 and oc.loc["home", "closing_price"] == 1.9   # 15:30 is in play
+    assert oc.loc["away", "closing_price"] == 3.1
+
+
+def test_capture_fact_odds_and_snapshot_rows():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE fact_fixtures AS SELECT 11 AS fixture_id, TIMESTAMP '2025-03-08 15:00' AS date_utc")
+    con.execute("""CREATE TABLE fact_odds AS SELECT 11 AS fixture_id, 39 AS league_id, 2024 AS season,
+                   8 AS bookmaker_id, 'Bet365' AS bookmaker_name, 'match winner' AS market_key, 'Home' AS selection,
+                   1.8 AS value, NULL::TIMESTAMP AS last_update, TIMESTAMP '2025-03-07 09:00' AS updated_ts""")
+    assert odds_history.capture_fact_odds(con, 39, 2024) == 1
+    con.execute("UPDATE fact_odds SET updated_ts = TIMESTAMP '2025-03-07 10:00'")
+    assert odds_history.capture_fact_odds(con, 39, 2024) == 0      # refreshed, same price
+    con.execute("UPDATE fact_odds SET value = 1.7, updated_ts = TIMESTAMP '2025-03-07 11:00'")
+    assert odds_history.capture_fact_odds(con, 39, 2024) == 1
+
+    snap = pd.DataFrame({"event_id": ["abc"], "bookmaker": ["Pinnacle"], "market": ["h2h"],
+                         "commence_time": pd.to_datetime(["2025-03-08T15:00:00Z"]),
+                         "last_update": pd.to_datetime(["2025-03-07T08:00:00Z"]),
+                         "price_home": [1.85], "price_draw": [3.6], "price_away": [4.2],
+                         "fixture_id": pd.array([11], dtype="Int64")})
+    assert odds_history.record(con, odds_history.theoddsapi_rows(snap)) == 3
+    oc = odds_history.opening_closing(con, fixture_ids=[11])
+    assert sorted(oc["source"].unique()) == ["api_football", "theoddsapi"]
+    home = oc[(oc["source"] == "api_football")].iloc[0]
+    assert (home["opening_price"], home["closing_price"]) == (1.8, 1.7)
+
+
+def test_odds_snapshot_lands_in_the_configured_warehouse(tmp_path, monkeypatch):
+    from bench.standin import StandIn
+    from src.ingest import loaders, quota
+    from src.warehouse import io
+    path = str(tmp_path / "w.duckdb")
+    monkeypatch.setattr(io, "DB_PATH", path)
+    monkeypatch.setattr(quota, "DB_PATH", path)
+    monkeypatch.setattr(quota, "_ledger", None)
+    monkeypatch.setenv("THE_ODDS_API_KEY", "test")
+    with StandIn() as srv:
+        srv.use()
+        res = loaders.ingest_odds_snapshot("soccer_germany_bundesliga")
+    con = duckdb.connect(path)
+    assert res["history_rows"] == con.execute("SELECT count(*) FROM odds_history").fetchone()[0] > 0
+    assert con.execute("SELECT count(*) FROM api_quota_ledger").fetchone()[0] == 1
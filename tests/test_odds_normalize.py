@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from src.ingest.odds_theoddsapi import normalize_odds, odds_wide, odds_snapshot_frame, h2h_snapshot_frame
+from src.ingest.loaders import build_odds_df_from_theoddsapi
+
+
+def _event(eid, home="FC Home", away="Away United"):
+    return {
+        "id": eid, "sport_key": "soccer_germany_bundesliga", "sport_title": "Bundesliga",
+        "commence_time": "2025-10-26T14:30:00Z", "home_team": home, "away_team": away,
+        "bookmakers": [
+            {"key": "book_a", "title": "Book A", "last_update": "2025-10-25T10:00:00Z", "markets": [
+                {"key": "h2h", "outcomes": [{"name": "fc home", "price": 2.1}, {"name": away, "price": 3.4},
+                                            {"name": "Draw", "price": 3.2}]},
+                {"key": "totals", "last_update": "2025-10-25T11:00:00Z", "outcomes": [
+                    {"name": "Over", "price": 1.9, "point": 2.5}, {"name": "Under", "price": 1.95, "point": 2.5}]},
+            ]},
+            {"key": "book_b", "title": "Book B", "markets": [
+                {"key": "h2h", "outcomes": [{"name": "1", "price": 2.0}, {"name": "X", "price": 3.3},
+                                            {"name": "Someone else", "price": 9.9}]},
+            ]},
+        ],
+    }
+
+
+def test_normalize_resolves_sides_against_team_columns():
+    long = normalize_odds([_event("e1"), _event("e2", home="Other", away="Team")])
+    assert len(long) == 16
+    e1 = long[long["event_id"] == "e1"]
+    assert e1["outcome"].tolist() == ["home", "away", "draw", "over", "under", "home", "draw", "someone else"]
+    assert e1["point"].tolist()[3:5] == [2.5, 2.5]
+    # market last_update wins over the bookmaker's
+    assert str(e1["last_update"].iloc[3]) == "2025-10-25 11:00:00+00:00"
+    assert str(e1["last_update"].iloc[0]) == "2025-10-25 10:00:00+00:00"
+    assert normalize_odds([_event("e1")], markets=("totals",))["market"].unique().tolist() == ["totals"]
+
+
+def test_wide_and_snapshot_views():
+    events = [_event("e1")]
+    wide = odds_wide(normalize_odds(events))
+    assert wide[["book", "price_home", "price_draw", "price_away"]].values.tolist()[0] == ["book_a", 2.1, 3.2, 3.4]
+    assert wide["price_away"].isna().tolist() == [False, True]
+
+    ts = datetime(2025, 10, 25, tzinfo=timezone.utc)
+    snap = odds_snapshot_frame(events, ts)
+    assert sorted(snap["outcome"]) == ["away", "draw", "draw", "home", "home", "over 2.5", "under 2.5"]
+    assert set(h2h_snapshot_frame(events, ts)["market"]) == {"h2h"}
+
+    legacy = build_odds_df_from_theoddsapi(events, league_key="bl1")
+    assert legacy["bookmaker"].tolist() == ["Book A", "Book B"]
+    assert legacy["join_key"].iloc[0] == "2025-10-26|home|away united"
+    assert build_odds_df_from_theoddsapi([]).empty
+
+
+def test_missing_outcome_name_stays_missing():
+    ev = _event("e1")
+    ev["bookmakers"][1]["markets"][0]["outcomes"][2]["name"] = None
+    long = normalize_odds([ev])
+    assert long["outcome"].tolist()[-1] is None and "none" not in long["outcome"].tolist()
+    snap = odds_snapshot_frame([ev], datetime(2025, 10, 25, tzinfo=timezone.utc))
+    assert len(snap[snap["book"] == "book_b"]) == 2 and snap["event_join_key"].iloc[0] == "2025-10-26|home|away united"
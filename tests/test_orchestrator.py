@@ -0,0 +1,109 @@
+import threading
+from datetime import datetime
+import duckdb
+import pytest
+from src.ingest.orchestrator import run_dag
+from src.ingest.quota import QuotaExceeded
+from src.warehouse.writer import SingleWriter, atomic
+
+
+def test_dag_runs_after_deps_and_skips_failed_branch():
+    order = []
+    def task(name, fail=False):
+        def fn():
+            if fail:
+                raise ValueError(name)
+            order.append(name)
+            return name
+        return fn
+    tasks = {
+        "fixtures": ((), task("fixtures")),
+        "players": ((), task("players", fail=True)),
+        "details": (("fixtures",), task("details")),
+        "player_form": (("players",), task("player_form")),
+    }
+    results, errors = run_dag(tasks, parallel=2)
+    assert order.index("fixtures") < order.index("details")
+    assert set(results) == {"fixtures", "details"}
+    assert set(errors) == {"players", "player_form"}
+
+
+def test_dag_aborts_on_quota():
+    def boom():
+        raise QuotaExceeded("no requests left")
+    with pytest.raises(QuotaExceeded):
+        run_dag({"odds": ((), boom), "after": (("odds",), lambda: 1)})
+
+
+def test_single_writer_serialises_threads():
+    w = SingleWriter(duckdb.connect())
+    w.execute("CREATE TABLE t (k INTEGER PRIMARY KEY, v INTEGER)")
+
+    def bump(con, k):
+        v = con.execute("SELECT coalesce(max(v), 0) FROM t").fetchone()[0]
+        con.execute("INSERT INTO t VALUES (?, ?)", [k, v + 1])
+
+    threads = [threading.Thread(target=atomic, args=(w, bump, k)) for k in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert w.execute("SELECT max(v), count(*) FROM t").fetchone() == (20, 20)
+    w.close()
+
+
+def test_ledger_writes_go_through_the_writer():
+    from src.ingest import quota
+    w = SingleWriter(duckdb.connect())
+    ledger = quota.attach(w)
+    assert ledger.con is w        # no side connection writing around the queue
+    threads = [threading.Thread(target=ledger.record, args=(quota.API_FOOTBALL, "/fixtures")) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ledger.spent(quota.API_FOOTBALL) == 20
+    assert w.execute("SELECT count(*) FROM api_quota_ledger").fetchone() == (20,)
+    w.close()
+
+
+def test_incremental_details_retry_old_fixtures_without_stats(monkeypatch):
+    from src.ingest import orchestrator
+    from src.ingest.explore_data_pipeline import ensure_schema
+    from src.ingest.watermarks import set_watermark, DIM_TTL
+    con = duckdb.connect()
+    ensure_schema(con)
+    con.execute("""INSERT INTO fact_fixtures (fixture_id, league_id, season, date_utc, status_short)
+                   SELECT f, 39, 2024, TIMESTAMP '2024-08-01' + INTERVAL (f * 7) DAY, 'FT' FROM range(1, 6) r(f)""")
+    con.execute("INSERT INTO fact_player_stats_match (fixture_id, league_id, season, team_id, player_id) "
+                "SELECT f, 39, 2024, 1, 1 FROM range(2, 6) r(f)")      # fixture 1's details failed long ago
+    set_watermark(con, "fixture_details", 39, 2024, n_rows=4, last_item_ts=datetime(2024, 9, 5))
+    asked = []
+    monkeypatch.setattr(orchestrator, "ingest_fixture_details",
+                        lambda con, l, s, fixture_ids, ckpt: asked.extend(fixture_ids) or len(fixture_ids))
+    orchestrator._details(orchestrator._Ctx(True, DIM_TTL), con, 39, 2024, None)
+    assert asked == [1]
+
+
+def test_dag_fails_tasks_waiting_on_unknown_keys():
+    results, errors = run_dag({"details": (("fixtures",), lambda: 1), "after": (("details",), lambda: 2),
+                               "teams": ((), lambda: 3)})
+    assert results == {"teams": 3} and set(errors) == {"details", "after"}
+
+
+def test_details_estimate_counts_what_the_stage_fetches():
+    from src.ingest import orchestrator, journal
+    from src.ingest.explore_data_pipeline import ensure_schema
+    from src.ingest.watermarks import DIM_TTL
+    con = duckdb.connect()
+    ensure_schema(con)
+    journal.ensure_journal(con)
+    con.execute("""INSERT INTO fact_fixtures (fixture_id, league_id, season, date_utc, status_short)
+                   SELECT f, 39, 2024, TIMESTAMP '2024-08-01' + INTERVAL (f) DAY, if(f <= 45, 'FT', 'NS')
+                   FROM range(1, 61) r(f)""")
+    con.execute("INSERT INTO fact_player_stats_match (fixture_id, league_id, season, team_id, player_id) "
+                "SELECT f, 39, 2024, 1, 1 FROM range(1, 41) r(f)")     # 40 of the 45 finished have stats
+    ckpt = journal.Checkpoint(con, 39, 2024, "details")
+    full, incremental = orchestrator._Ctx(False, DIM_TTL), orchestrator._Ctx(True, DIM_TTL)
+    assert orchestrator._requests_left(full, con, "details", ckpt) == 3         # all 45, 20 per call
+    assert orchestrator._requests_left(incremental, con, "details", ckpt) == 1  # the 5 without stats
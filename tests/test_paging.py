@@ -0,0 +1,64 @@
+import duckdb
+import threading
+from src.ingest.paging import iter_pages
+from src.ingest.players import ingest_players
+from src.ingest.explore_data_pipeline import ensure_schema, upsert
+
+
+def _fake_players_api(total_pages):
+    calls = []
+    lock = threading.Lock()
+    def fetch(endpoint, params):
+        with lock:
+            calls.append(params["page"])
+        page = params["page"]
+        return {
+            "paging": {"current": page, "total": total_pages},
+            "response": [{"player": {"id": page * 10 + i, "name": f"p{page}{i}"},
+                          "statistics": [{"team": {"id": 1}, "games": {"minutes": 90}}]}
+                         for i in range(3)],
+        }
+    return fetch, calls
+
+
+def test_iter_pages_fetches_each_page_once_in_order():
+    fetch, calls = _fake_players_api(5)
+    pages = [p for p, _ in iter_pages(fetch, "players", {"league": 78}, workers=3)]
+    assert pages == [1, 2, 3, 4, 5]
+    assert sorted(calls) == [1, 2, 3, 4, 5]
+
+
+def test_ingest_players_feeds_every_sink_from_one_pass():
+    """dim_player and player_stats are both filled while each page is downloaded once."""
+    con = duckdb.connect()
+    ensure_schema(con)
+    fetch, calls = _fake_players_api(4)
+    totals = ingest_players(con, fetch, upsert, 78, 2024, sinks=("dim_player", "player_stats"), workers=2)
+    assert totals == {"dim_player": 12, "player_stats": 12}
+    assert len(calls) == 4
+    assert con.execute("select count(*) from dim_player").fetchone()[0] == 12
+
+
+def test_ingest_players_resumes_from_journal():
+    """A crash on page 3 keeps pages 1-2; the resumed run fetches only what is missing."""
+    from src.ingest import journal
+    con = duckdb.connect()
+    ensure_schema(con)
+    fetch, calls = _fake_players_api(4)
+    def flaky(endpoint, params):
+        if params["page"] == 3:
+            raise RuntimeError("quota")
+        return fetch(endpoint, params)
+
+    ckpt = journal.Checkpoint(con, 78, 2024, "players")
+    try:
+        ingest_players(con, flaky, upsert, 78, 2024, workers=1, ckpt=ckpt)
+    except RuntimeError:
+        pass
+    calls.clear()
+    ckpt = journal.Checkpoint(con, 78, 2024, "players")
+    assert ckpt.done == {"page:1", "page:2"} and ckpt.total == 4
+    assert journal.pages_left(ckpt) == 2
+    totals = ingest_players(con, fetch, upsert, 78, 2024, workers=1, ckpt=ckpt)
+    assert sorted(calls) == [3, 4] and totals == {"dim_player": 6}
+    assert con.execute("select count(*) from dim_player").fetchone()[0] == 12
@@ -0,0 +1,64 @@
+import duckdb
+import numpy as np
+import pandas as pd
+from src.features import player_form
+
+
+def _warehouse():
+    con = duckdb.connect()
+    # kickoffs out of fixture-id order, so the windows must follow date_utc
+    con.execute("CREATE TABLE fact_fixtures AS SELECT f AS fixture_id, "
+                "TIMESTAMP '2024-08-01' + INTERVAL ((f * 7) % 40) DAY AS date_utc FROM range(1, 41) r(f)")
+    con.execute("""CREATE TABLE fact_player_stats_match AS
+        SELECT f AS fixture_id, 39 AS league_id, CASE WHEN (f * 7) % 40 < 20 THEN 2024 ELSE 2025 END AS season,
+               1 AS team_id, p AS player_id,
+               CASE WHEN f % 4 = 0 THEN NULL ELSE 45 + f % 46 END AS minutes,
+               CASE WHEN f % 3 = 0 THEN NULL ELSE printf('%.1f', 6 + (f % 5) / 2) END AS rating,
+               CASE WHEN f % 2 = 0 THEN NULL ELSE f % 3 END AS shots_on, NULL::INTEGER AS shots_total,
+               1 AS passes_key, NULL::INTEGER AS goals, 0 AS assists
+        FROM range(1, 41) r(f), range(1, 4) q(p)""")
+    return con
+
+
+def test_rolling_windows_match_pandas():
+    con = _warehouse()
+    assert player_form.refresh(con) == {"players": 3, "rows": 120}
+    got = con.execute("SELECT * FROM player_form WHERE player_id = 2 ORDER BY date_utc").fetchdf()
+    src = con.execute("""SELECT s.*, f.date_utc FROM fact_player_stats_match s JOIN fact_fixtures f USING (fixture_id)
+                         WHERE player_id = 2 ORDER BY date_utc""").fetchdf()
+    minutes, rating = src["minutes"].fillna(0), pd.to_numeric(src["rating"])
+    assert np.allclose(got["minutes_l5"], minutes.rolling(5, min_periods=1).mean())
+    assert np.allclose(got["rating_l5"], rating.rolling(5, min_periods=1).mean(), equal_nan=True)
+    assert np.allclose(got["rating_ewm"], rating.ewm(halflife=player_form.HALFLIFE).mean(), equal_nan=True)
+    assert np.allclose(got["shots_on_ewm"], src["shots_on"].fillna(0).ewm(halflife=player_form.HALFLIFE).mean())
+    assert got["season_matches"].tolist() == list(range(1, 21)) * 2
+    assert got["matches"].iloc[-1] == 40
+
+
+def test_refresh_only_rewrites_the_changed_tail():
+    con = _warehouse()
+    player_form.refresh(con)
+    before = player_form.form_before(con, "2024-08-20", [1])
+    assert player_form.refresh(con) == {"players": 0, "rows": 0}
+    # a corrected stat on the 36th kickoff of player 1, and a new fixture for players 1-2
+    con.execute("UPDATE fact_player_stats_match SET minutes = 1 WHERE player_id = 1 AND fixture_id = 5")   # day 35
+    con.execute("INSERT INTO fact_fixtures VALUES (41, TIMESTAMP '2024-10-01')")
+    con.execute("INSERT INTO fact_player_stats_match VALUES (41, 39, 2025, 1, 1, 90, '8.0', 2, NULL, 1, 1, 0), "
+                "(41, 39, 2025, 1, 2, 90, '7.0', 0, NULL, 1, 0, 0)")
+    assert player_form.refresh(con) == {"players": 2, "rows": 6 + 1}
+    assert player_form.form_before(con, "2024-08-20", [1]).equals(before)
+    latest = player_form.form_before(con, "2025-01-01", [1, 2, 3]).set_index("player_id")
+    assert latest.loc[1, "fixture_id"] == 41 and latest.loc[3, "fixture_id"] != 41
+
+
+def test_rescheduled_match_moves_its_rows():
+    con = _warehouse()
+    player_form.refresh(con)
+    # the first kickoff is postponed past the last one
+    con.execute("UPDATE fact_fixtures SET date_utc = TIMESTAMP '2024-10-01' WHERE date_utc = TIMESTAMP '2024-08-01'")
+    assert player_form.refresh(con) == {"players": 3, "rows": 120}
+    fresh = _warehouse()
+    fresh.execute("UPDATE fact_fixtures SET date_utc = TIMESTAMP '2024-10-01' WHERE date_utc = TIMESTAMP '2024-08-01'")
+    player_form.refresh(fresh)
+    q = "SELECT * FROM player_form ORDER BY player_id, date_utc"
+    assert con.execute(q).fetchdf().equals(fresh.execute(q).fetchdf())
@@ -0,0 +1,37 @@
+import duckdb
+import pandas as pd
+from src.features import prekickoff_odds
+from src.warehouse import odds_history
+
+
+def _price(fixture_id, ts, price, selection="home"):
+    return {"source": "api_football", "event_id": str(fixture_id), "bookmaker": "Bet365", "market": "match winner",
+            "selection": selection, "fixture_id": fixture_id, "kickoff": None, "ts": pd.Timestamp(ts), "price": price}
+
+
+def test_refresh_is_asof_and_incremental():
+    con = duckdb.connect()
+    con.execute("""CREATE TABLE fact_fixtures AS SELECT * FROM (VALUES
+                   (1, TIMESTAMP '2025-03-08 15:00'), (2, TIMESTAMP '2025-03-09 15:00'), (3, NULL)) t(fixture_id, date_utc)""")
+    odds_history.record(con, pd.DataFrame([_price(1, "2025-03-06 10:00", 2.0), _price(1, "2025-03-07 15:00", 1.9),
+                                           _price(2, "2025-03-01", 3.0)]))
+    assert prekickoff_odds.refresh(con) == {"pairs": 6, "rows": 6}
+    assert prekickoff_odds.refresh(con) == {"pairs": 0, "rows": 0}
+
+    t24 = prekickoff_odds.prekickoff_odds(con, pd.Timedelta(hours=24)).set_index("fixture_id")
+    assert t24.loc[1, "price"] == 2.0           # the 15:00 price is not strictly before the cutoff
+    closing = prekickoff_odds.prekickoff_odds(con, pd.Timedelta(0), fixture_ids=[1])
+    assert closing["price"].tolist() == [1.9]
+
+    # a move shortly before kickoff only touches fixture 1's T-1h and closing
+    odds_history.record(con, pd.DataFrame([_price(1, "2025-03-08 13:30", 1.75)]))
+    assert prekickoff_odds.refresh(con) == {"pairs": 2, "rows": 2}
+    assert prekickoff_odds.prekickoff_odds(con, pd.Timedelta(hours=1), fixture_ids=[1])["price"].tolist() == [1.75]
+    odds_history.record(con, pd.DataFrame([_price(1, "2025-03-08 15:00", 1.8)]))     # at kickoff: not before any cutoff
+    assert prekickoff_odds.refresh(con) == {"pairs": 0, "rows": 0}
+
+    # another cutoff, and a rescheduled fixture
+    assert prekickoff_odds.refresh(con, offsets=[pd.Timedelta(hours=48)]) == {"pairs": 2, "rows": 2}
+    con.execute("UPDATE fact_fixtures SET date_utc = TIMESTAMP '2025-03-07 12:00' WHERE fixture_id = 1")
+    assert prekickoff_odds.refresh(con)["pairs"] == 3
+    assert prekickoff_odds.prekickoff_odds(con, pd.Timedelta(0), fixture_ids=[1])["price"].tolist() == [2.0]
@@ -0,0 +1,69 @@
+import duckdb
+import pandas as pd
+import pytest
+from src.ingest import quota
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    con.execute("""CREATE TABLE fact_fixtures (fixture_id INTEGER, league_id INTEGER,
+                   date_utc TIMESTAMP, status_short VARCHAR)""")
+    quota.attach(con)
+    return con
+
+
+def test_ledger_uses_provider_headers(con):
+    """The Odds API reports cost and remaining credits; the ledger trusts the tighter number."""
+    ledger = quota.get_ledger()
+    ledger.record(quota.ODDS, "/sports/soccer_epl/odds",
+                  {"x-requests-last": "3", "x-requests-remaining": "40", "x-requests-used": "460"})
+    assert ledger.spent(quota.ODDS) == 3
+    assert ledger.remaining(quota.ODDS) == 40
+    with pytest.raises(quota.QuotaExceeded):
+        ledger.check(quota.ODDS, 41)
+
+
+def test_plan_groups_fixtures_and_degrades(con):
+    """Kickoffs close together share a pull; T-1h pulls are dropped first when the budget is short."""
+    now = pd.Timestamp("2025-03-01 00:00")
+    con.execute("""INSERT INTO fact_fixtures VALUES
+        (1, 78, '2025-03-08 14:30', 'NS'), (2, 78, '2025-03-08 14:30', 'NS'),
+        (3, 78, '2025-03-08 17:30', 'NS'), (4, 39, '2025-03-09 15:00', 'NS')""")
+    plan = quota.plan_odds_pulls(con, budget=100, now=now, until="2025-04-01")
+    assert len(plan) == 6   # 78: two T-24h and two T-1h clusters, 39: one of each
+    assert plan["scheduled"].all()
+
+    plan = quota.plan_odds_pulls(con, budget=3, now=now, until="2025-04-01")
+    kept = plan[plan["scheduled"]]
+    assert len(kept) == 3
+    assert (kept["offset"] == pd.Timedelta(hours=24)).all()
+
+    with pytest.raises(quota.QuotaExceeded):
+        quota.plan_odds_pulls(con, budget=3, now=now, until="2025-04-01", strict=True)
+
+
+def test_ledger_outlives_the_runs_writer(tmp_path):
+    """run() bills through its writer, then hands back the ledger from before it started."""
+    from bench.standin import StandIn
+    from src.ingest import orchestrator
+    path = str(tmp_path / "w.duckdb")
+    before = quota.attach(duckdb.connect(path))
+    with StandIn() as srv:
+        srv.use()
+        orchestrator.run({}, [], db_path=path, stages=())
+    assert quota.get_ledger() is before
+    assert quota.get_ledger().spent(quota.API_FOOTBALL) == 1      # /leagues, written by run's writer
+    assert quota.get_ledger().remaining(quota.ODDS) == quota.BUDGETS[quota.ODDS][0]
+
+
+def test_stage_checks_the_daily_budget(con):
+    from src.ingest import journal, orchestrator
+    journal.ensure_journal(con)
+    ledger = quota.get_ledger()
+    ledger.record(quota.API_FOOTBALL, "/fixtures", {"x-ratelimit-requests-remaining": "0",
+                                                    "x-ratelimit-requests-limit": "100"})
+    called = []
+    with pytest.raises(quota.QuotaExceeded):
+        orchestrator._journaled(None, "fixtures", lambda *a: called.append(a), con, 78, 2022)
+    assert not called
@@ -0,0 +1,49 @@
+import pytest
+from src.ingest.ratelimit import TokenBucket, QuotaExhausted, retry_after_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+    def sleep(self, s):
+        self.now += s
+
+
+def test_bucket_paces_to_rate_after_burst():
+    """After the burst is spent, calls are spaced by 60/rate seconds."""
+    clock = FakeClock()
+    tb = TokenBucket(rate_per_min=60, burst=2, clock=clock, sleep=clock.sleep)
+    for _ in range(2):
+        tb.acquire()
+    assert clock.now == 0.0
+    tb.acquire()
+    assert clock.now == pytest.approx(1.0)
+    tb.acquire()
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_headers_pause_and_rate_update():
+    """Remaining=0 blocks for a window; X-RateLimit-Limit replaces the configured rate."""
+    clock = FakeClock()
+    tb = TokenBucket(rate_per_min=600, clock=clock, sleep=clock.sleep)
+    tb.update_from_headers({"X-RateLimit-Limit": "120", "X-RateLimit-Remaining": "0"})
+    assert tb.rate_per_min == 120
+    tb.acquire()
+    assert clock.now >= 60.0
+
+
+def test_daily_quota_raises_on_the_next_call():
+    tb = TokenBucket(rate_per_min=60)
+    tb.update_from_headers({"x-ratelimit-requests-remaining": "0"})    # the response itself is kept
+    with pytest.raises(QuotaExhausted):
+        tb.acquire()
+    tb.update_from_headers({"x-ratelimit-requests-remaining": "7500"})
+    tb.acquire()
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds({"Retry-After": "7"}) == 7.0
+    assert retry_after_seconds({}, default=3.0) == 3.0
+    assert retry_after_seconds({"Retry-After": "garbage"}, default=5.0) == 5.0
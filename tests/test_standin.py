@@ -0,0 +1,21 @@
+import duckdb
+from bench.standin import StandIn, Faults
+from src.ingest import quota
+from src.ingest.explore_data_pipeline import ensure_schema, ingest_fixtures, ingest_fixture_details
+
+
+def test_pipeline_runs_against_standin_through_faults():
+    """Fixtures + batched details end to end; injected 429s/5xx are retried by httpclient."""
+    con = duckdb.connect()
+    ensure_schema(con)
+    quota.attach(con)
+    faults = Faults(per_minute=100_000, p429=0.15, p5xx=0.15, retry_after=0.01, seed=3)
+    with StandIn(faults=faults) as srv:
+        srv.use()
+        assert ingest_fixtures(con, 78, 2022) == 306     # 18 teams, double round robin
+        totals = ingest_fixture_details(con, 78, 2022, workers=4)
+        stats = srv.stats()
+    assert totals["fact_fixtures"] == 306
+    assert totals["fact_lineups"] == 306 * 2 * 20
+    assert stats["/fixtures"] >= 1 + 16                  # one season call + 16 batches of 20 ids
+    assert stats.get("429", 0) + stats.get("429_body", 0) + stats.get("5xx", 0) > 0
@@ -0,0 +1,60 @@
+import duckdb
+import pandas as pd
+from src.features import standings
+
+
+def _fixtures(con, league_id, rows):
+    con.execute("""CREATE TABLE IF NOT EXISTS fact_fixtures (fixture_id INTEGER, league_id INTEGER, season INTEGER,
+                   round VARCHAR, date_utc TIMESTAMP, status_short VARCHAR, home_team_id INTEGER,
+                   away_team_id INTEGER, home_goals INTEGER, away_goals INTEGER)""")
+    con.executemany("INSERT INTO fact_fixtures VALUES (?, ?, 2024, ?, ?, ?, ?, ?, ?, ?)",
+                    [(f, league_id, f"Regular Season - {r}", d, s, h, a, hg, ag) for f, r, d, s, h, a, hg, ag in rows])
+
+
+def test_matchday_tables_and_incremental_refresh():
+    con = duckdb.connect()
+    _fixtures(con, 39, [
+        (1, 1, "2024-08-10", "FT", 1, 2, 2, 0), (2, 1, "2024-08-10", "FT", 3, 4, 1, 1),
+        (3, 2, "2024-08-17", "FT", 2, 3, 0, 1), (4, 2, "2024-08-17", "PST", 4, 1, None, None),
+        (5, 3, "2024-08-24", "FT", 1, 3, 1, 1), (6, 3, "2024-08-24", "FT", 4, 2, 3, 0),
+        (7, 4, "2024-09-28", "NS", 2, 1, None, None), (8, 4, "2024-09-28", "NS", 3, 4, None, None),
+    ])
+    assert standings.refresh(con) == {"seasons": 1, "rows": 12}
+    assert standings.refresh(con) == {"seasons": 0, "rows": 0}
+    md2 = standings.table_at(con, 39, 2024, 2).set_index("team_id")
+    assert md2["rank"].to_dict() == {3: 1, 1: 2, 4: 3, 2: 4}
+    assert (md2.loc[1, "played"], md2.loc[3, "form"]) == (1, "DW")
+    md1 = standings.table_at(con, 39, 2024, 1).set_index("team_id")
+    assert md1.loc[3, "rank"] == md1.loc[4, "rank"] == 2      # level on everything
+    before = {md: standings.table_at(con, 39, 2024, md) for md in (2, 3)}
+
+    # the postponed game is played a month later: tables as of earlier kickoffs don't change
+    con.execute("UPDATE fact_fixtures SET status_short = 'FT', home_goals = 0, away_goals = 2, "
+                "date_utc = TIMESTAMP '2024-09-20' WHERE fixture_id = 4")
+    assert standings.refresh(con) == {"seasons": 1, "rows": 8}
+    for md, df in before.items():
+        assert standings.table_at(con, 39, 2024, md).equals(df)
+    assert set(before[3]["snapshot_ts"]) == {pd.Timestamp("2024-08-24")}
+
+    # the next round counts it; only its own matchday is written
+    con.execute("UPDATE fact_fixtures SET status_short = 'FT', home_goals = 0, away_goals = 0 WHERE fixture_id = 7")
+    con.execute("UPDATE fact_fixtures SET status_short = 'FT', home_goals = 1, away_goals = 1 WHERE fixture_id = 8")
+    assert standings.refresh(con) == {"seasons": 1, "rows": 4}
+    last = standings.table_at(con, 39, 2024).set_index("team_id")
+    assert last.loc[1, ["points", "played", "gd", "form", "rank"]].tolist() == [8, 4, 4, "WDWD", 1]
+    assert set(last["snapshot_ts"]) == {pd.Timestamp("2024-09-28")}
+    assert set(standings.table_at(con, 39, 2024, 1)["snapshot_ts"]) == {pd.Timestamp("2024-08-10")}
+
+
+def test_head_to_head_tiebreak():
+    con = duckdb.connect()
+    # 3 leads; 1 and 2 both on 3 points, 2 with the better goal difference, 1 won the meeting
+    games = [(11, 1, "2024-08-10", "FT", 1, 2, 1, 0), (12, 1, "2024-08-10", "FT", 3, 4, 0, 0),
+             (13, 2, "2024-08-17", "FT", 3, 1, 3, 0), (14, 2, "2024-08-17", "FT", 2, 4, 5, 0)]
+    _fixtures(con, 39, games)
+    _fixtures(con, 140, [(f + 10, *rest) for f, *rest in games])
+    standings.refresh(con)
+    epl = standings.table_at(con, 39, 2024, 2).set_index("team_id")["rank"]
+    liga = standings.table_at(con, 140, 2024, 2).set_index("team_id")["rank"]
+    assert (epl[3], epl[2], epl[1]) == (1, 2, 3)        # goal difference first
+    assert (liga[3], liga[1], liga[2]) == (1, 2, 3)     # head-to-head first
@@ -0,0 +1,64 @@
+import duckdb
+import pytest
+from src.features import player_form, team_strength
+from src.ingest.explore_data_pipeline import ensure_schema
+
+
+def _warehouse():
+    con = duckdb.connect()
+    ensure_schema(con)
+    # team 1 hosts team 2 weekly, one season per league; 12 players a side, player 12 comes on for 10'
+    con.execute("""INSERT INTO fact_fixtures (fixture_id, league_id, season, date_utc, home_team_id, away_team_id)
+                   SELECT l * 10 + f, l, 2024, TIMESTAMP '2024-08-01' + INTERVAL (f * 7) DAY, l * 10 + 1, l * 10 + 2
+                   FROM (VALUES (39), (61)) x(l), range(1, 7) r(f)""")
+    con.execute("""INSERT INTO fact_player_stats_match (fixture_id, league_id, season, team_id, player_id, minutes,
+                                                        rating, shots_on, goals)
+                   SELECT x.fixture_id, x.league_id, 2024, t.team_id, t.team_id * 100 + p,
+                          CASE WHEN p = 12 THEN 10 ELSE 90 END, printf('%.1f', 6 + p / 10 + x.fixture_id % 10 / 10),
+                          CASE WHEN p = 9 THEN 1 END, NULL
+                   FROM fact_fixtures x,
+                        (SELECT fixture_id, home_team_id AS team_id FROM fact_fixtures
+                         UNION ALL SELECT fixture_id, away_team_id FROM fact_fixtures) t,
+                        range(1, 13) q(p)
+                   WHERE t.fixture_id = x.fixture_id AND x.fixture_id % 10 < 6""")   # matchday 6 not played yet
+    player_form.refresh(con)
+    return con
+
+
+def test_team_stats_and_expected_xi():
+    con = _warehouse()
+    assert team_strength.refresh(con) == {"team_match_stats": 20, "team_strength": 20}
+    m = con.execute("SELECT * FROM team_match_stats WHERE fixture_id = 392 AND team_id = 391").fetchdf().iloc[0]
+    ratings = [6 + p / 10 + 0.2 for p in range(1, 13)]
+    assert m["rating"] == pytest.approx((sum(ratings[:11]) * 90 + ratings[11] * 10) / 1000)
+    assert (m["players"], m["minutes"], m["shots_on"], m["goals"]) == (12, 1000, 1, 0)
+    assert m["rating_l5"] == pytest.approx(m["rating"] - 0.05)          # mean of matchdays 1 and 2
+
+    # matchday 1: no previous fixture, no form; matchday 6: last week's XI with its form
+    s = con.execute("SELECT * FROM team_strength WHERE team_id = 391 ORDER BY date_utc").fetchdf()
+    assert s["fixture_id"].tolist() == [392, 393, 394, 395, 396] and set(s["xi_source"]) == {"previous"}
+    assert (s["xi_players"].iloc[-1], s["xi_with_form"].iloc[-1]) == (11, 11)
+    form = player_form.form_before(con, s["date_utc"].iloc[-1], [39100 + p for p in range(1, 12)])
+    assert s["xi_rating_ewm"].iloc[-1] == pytest.approx(form["rating_ewm"].mean())
+
+    # a published lineup adds a row next to the guess; its subs' form only comes from before kickoff
+    con.execute("""INSERT INTO fact_lineups (fixture_id, league_id, season, team_id, player_id, is_starter)
+                   SELECT 396, 39, 2024, 391, 39100 + p, p <> 1 FROM range(1, 13) q(p)""")
+    team_strength.refresh(con, [(39, 2024)])
+    both = con.execute("SELECT * FROM team_strength WHERE fixture_id = 396 AND team_id = 391").fetchdf()
+    assert both.set_index("xi_source")["xi_rating_ewm"].loc["previous"] == s["xi_rating_ewm"].iloc[-1]
+    row = both.set_index("xi_source").loc["lineup"]
+    assert row["xi_players"] == 11
+    w = form.set_index("player_id")["minutes_l5"].to_dict() | {39112: 10.0}
+    r = player_form.form_before(con, row["date_utc"], [39100 + p for p in range(2, 13)]).set_index("player_id")
+    assert row["xi_rating_ewm"] == pytest.approx((r["rating_ewm"] * r.index.map(w)).sum() / sum(r.index.map(w)))
+
+
+def test_partition_refresh_matches_full():
+    con = _warehouse()
+    team_strength.refresh(con)
+    full = {t: con.execute(f"SELECT * FROM {t} ORDER BY ALL").fetchdf() for t in ("team_match_stats", "team_strength")}
+    assert team_strength.refresh(con, [(61, 2024)]) == {"team_match_stats": 10, "team_strength": 10}
+    for t, df in full.items():
+        assert con.execute(f"SELECT * FROM {t} ORDER BY ALL").fetchdf().equals(df)
+    assert team_strength.refresh(con, []) == {"team_match_stats": 0, "team_strength": 0}
@@ -0,0 +1,54 @@
+import duckdb
+import pandas as pd
+from src.ingest.teams import norm_team, TeamIndex, match_events, resolve_events
+
+
+def test_norm_team_folds_provider_spellings():
+    assert norm_team("FC Bayern München") == norm_team("Bayern Munich") == "bayern munchen"
+    assert norm_team("1. FC Köln") == norm_team("FC Koln") == "koln"
+    assert norm_team("TSG 1899 Hoffenheim") == "hoffenheim" and norm_team("FC Schalke 04") == "schalke 04"
+    assert norm_team("Manchester Utd") == "manchester united"
+    assert norm_team("FC") == "fc" and norm_team(None) == ""
+
+
+def _con():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE dim_team (team_id INTEGER PRIMARY KEY, team_name VARCHAR, country_name VARCHAR)")
+    con.execute("""INSERT INTO dim_team VALUES (1, 'FC Bayern München', 'Germany'), (2, 'VfL Wolfsburg', 'Germany'),
+                   (3, 'Borussia Dortmund', 'Germany'), (4, 'Borussia Mönchengladbach', 'Germany')""")
+    con.execute("""CREATE TABLE fact_fixtures (fixture_id INTEGER, league_id INTEGER, date_utc TIMESTAMP,
+                   home_team_id INTEGER, away_team_id INTEGER)""")
+    con.execute("""INSERT INTO fact_fixtures VALUES (10, 78, '2025-03-08 14:30', 1, 2), (11, 78, '2025-03-08 17:30', 3, 4),
+                   (12, 78, '2025-03-15 14:30', 2, 1)""")
+    return con
+
+
+def test_resolve_events_alias_then_fuzzy_and_learns():
+    con = _con()
+    events = pd.DataFrame({
+        "sport_key": "soccer_germany_bundesliga",
+        "commence_time": pd.to_datetime(["2025-03-08T14:30:00Z"] * 2 + ["2025-03-08T17:30:00Z", "2025-03-20T12:00:00Z"]),
+        "home_team": ["Bayern Munich", "Bayern Munich", "Dortmund", "Wolfsburg"],
+        "away_team": ["Wolfsburg", "Wolfsburg", "Borussia Monchengladbach", "Bayern Munich"],
+    }, index=[5, 6, 7, 8])
+    out = resolve_events(con, events)
+    assert out.index.tolist() == [5, 6, 7, 8]
+    assert out["fixture_id"].tolist() == [10, 10, 11, pd.NA]      # the last one is outside the window
+    assert out["resolved_by"].tolist() == ["alias", "alias", "fuzzy", None]
+    assert out["home_team_id"].tolist()[2] == 3
+
+    # the fuzzy match taught the index "Dortmund"
+    assert con.execute("SELECT alias, team_id, source FROM team_alias").fetchall() == [("dortmund", 3, "fuzzy")]
+    assert resolve_events(con, events.iloc[[2]])["resolved_by"].tolist() == ["alias"]
+
+
+def test_fuzzy_needs_both_sides_and_the_league():
+    index = TeamIndex([(1, "Bayern Munich"), (2, "Wolfsburg")])
+    fixtures = pd.DataFrame({"fixture_id": [10], "league_id": [78], "date_utc": [pd.Timestamp("2025-03-08 14:30")],
+                             "home_team_id": [1], "away_team_id": [2]})
+    events = pd.DataFrame({"commence_time": [pd.Timestamp("2025-03-08 14:30", tz="UTC")] * 3,
+                           "home_team": ["Bayern", "Hertha", "Bayern"], "away_team": ["Wolfsburg FC", "Union", "Wolfsburg"],
+                           "league_id": [78, 78, 39]})
+    out = match_events(events, fixtures, index)
+    assert out["fixture_id"].tolist() == [10, pd.NA, pd.NA]
+    assert index.ids["bayern"] == 1
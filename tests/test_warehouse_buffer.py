@@ -0,0 +1,63 @@
+import duckdb
+import pandas as pd
+import pytest
+from src.ingest import journal
+from src.ingest.explore_data_pipeline import upsert
+from src.warehouse.buffer import WriteBehind
+
+
+def _con():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE t (k INTEGER, j INTEGER, v VARCHAR, PRIMARY KEY (k, j))")
+    journal.ensure_journal(con)
+    return con
+
+
+def test_write_behind_batches_and_dedupes():
+    con, calls = _con(), []
+    def counting(con, table, df, keys):
+        calls.append(len(df))
+        return upsert(con, table, df, keys)
+
+    with WriteBehind(con, counting, max_rows=5) as wb:
+        for i in range(4):
+            # every fixture re-sends key (0, 0): the last one wins
+            wb.add("t", pd.DataFrame({"k": [0, i + 1], "j": [0, 0], "v": [f"a{i}", "b"]}), ["k", "j"])
+        assert calls == [4]                       # 6 rows buffered >= 5: one upsert of 4 distinct keys
+    assert calls == [4, 2]
+    assert wb.totals == {"t": 6}
+    assert con.execute("SELECT v FROM t WHERE k = 0").fetchone() == ("a3",)
+
+
+def test_write_behind_flushes_on_error_with_journal():
+    con = _con()
+    ckpt = journal.Checkpoint(con, 78, 2024, "odds")
+    with pytest.raises(RuntimeError):
+        with WriteBehind(con, upsert, ckpt=ckpt) as wb:
+            wb.add("t", pd.DataFrame({"k": [1], "j": [1], "v": ["x"]}), ["k", "j"])
+            wb.done("page:1")
+            assert ckpt.done == set()             # nothing journaled before the flush
+            raise RuntimeError("quota")
+    assert con.execute("SELECT count(*) FROM t").fetchone() == (1,)
+    assert journal.Checkpoint(con, 78, 2024, "odds").done == {"page:1"}
+
+
+def test_write_behind_failed_flush_is_not_retried_on_exit():
+    con, calls = _con(), []
+    def failing(con, table, df, keys):
+        calls.append(len(df))
+        raise RuntimeError("constraint")
+    with pytest.raises(RuntimeError) as e:
+        with WriteBehind(con, failing, max_rows=1) as wb:
+            wb.add("t", pd.DataFrame({"k": [1], "j": [1], "v": ["x"]}), ["k", "j"])
+    assert calls == [1]
+    assert e.value.__context__ is None          # no second failure raised while unwinding
+
+
+def test_write_behind_dedupes_arrow():
+    pa = pytest.importorskip("pyarrow")
+    con = _con()
+    with WriteBehind(con, upsert) as wb:
+        wb.add("t", pa.table({"k": [1, 2, 1], "j": [0, 0, 0], "v": ["a", "b", "c"]}), ["k", "j"])
+        wb.add("t", pd.DataFrame({"k": [2], "j": [0], "v": ["d"]}), ["k", "j"])
+    assert con.execute("SELECT k, v FROM t ORDER BY k").fetchall() == [(1, "c"), (2, "d")]
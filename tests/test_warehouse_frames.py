@@ -0,0 +1,44 @@
+import duckdb
+import pandas as pd
+import pytest
+from src.warehouse.io import DB
+from src.ingest.explore_data_pipeline import upsert
+from src.ingest.python_ingester import upsert_df
+from src.ingest.flatten import Spec, flatten, flatten_arrow, INT, FLOAT, TS
+
+pa = pytest.importorskip("pyarrow")
+
+
+def test_upserts_take_arrow_tables_and_streams():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE t (k INTEGER PRIMARY KEY, v VARCHAR, x DOUBLE)")
+    table = pa.table({"k": [1, 2, 3], "v": ["a", "b", "c"], "x": [0.5, None, 1.5]})
+    assert upsert(con, "t", table, ["k"]) == 3
+    # a generator of batches is written as a stream, never materialised
+    batches = (b for b in pa.table({"k": [3, 4], "v": ["C", "d"], "x": [2.0, 2.5]}).to_batches(max_chunksize=1))
+    assert upsert_df(con, "t", batches, ["k"]) == 2
+    assert upsert(con, "t", pd.DataFrame({"k": [1], "v": ["A"], "x": [9.0]}), ["k"]) == 1
+    assert upsert(con, "t", pa.table({"k": pa.array([], pa.int64())}), ["k"]) == 0
+    assert upsert_df(con, "t", iter(()), ["k"]) == 0
+    assert con.execute("SELECT k, v, x FROM t ORDER BY k").fetchall() == \
+        [(1, "A", 9.0), (2, "b", None), (3, "C", 2.0), (4, "d", 2.5)]
+
+
+def test_insert_df_creates_and_widens_from_arrow(tmp_path):
+    db = DB(str(tmp_path / "w.duckdb"))
+    assert db.insert_df("odds", pa.table({"event_id": ["e1"], "price": [2.1]})) == 1
+    ts = pa.array([pd.Timestamp("2025-01-01", tz="UTC")])
+    assert db.insert_df("odds", pa.table({"event_id": ["e2"], "pulled": ts}).to_reader()) == 1
+    types = dict(db.con.execute("SELECT column_name, data_type FROM information_schema.columns "
+                                "WHERE table_name = 'odds'").fetchall())
+    assert types == {"event_id": "VARCHAR", "price": "DOUBLE", "pulled": "TIMESTAMP WITH TIME ZONE"}
+
+
+def test_flatten_arrow_matches_flatten():
+    spec = Spec(("id", "id", INT), ("odd", "odd", FLOAT), ("date", "date", TS), ("name", "name"), "league_id")
+    recs = [{"id": 1, "odd": "1.5", "date": "2024-08-24T13:30:00+00:00", "name": "x"}, {"id": None, "name": 7}]
+    table = flatten_arrow(spec, recs, league_id=78)
+    assert table.schema.field("id").type == pa.int64() and table.column("id").null_count == 1
+    assert table.column("odd").to_pylist() == [1.5, None]
+    assert table.column("name").to_pylist() == ["x", "7"]
+    pd.testing.assert_series_equal(table.to_pandas()["date"], flatten(spec, recs, league_id=78)["date"])
@@ -0,0 +1,33 @@
+import duckdb
+import pandas as pd
+import pytest
+from src.warehouse.io import DB
+
+
+def test_insert_df_caches_schema_and_widens(tmp_path):
+    db = DB(str(tmp_path / "w.duckdb"))
+    assert db.insert_df("odds", pd.DataFrame({"event_id": ["e1"], "price": [2.1]})) == 1
+    assert db._columns["odds"] == ["event_id", "price"]
+    assert db.insert_df("odds", pd.DataFrame({"price": [1.9], "book": ["b"], "event_id": ["e2"]})) == 1
+    assert db._columns["odds"] == ["event_id", "price", "book"]
+    assert db.con.execute("SELECT * FROM odds ORDER BY event_id").fetchall() == [("e1", 2.1, None), ("e2", 1.9, "b")]
+
+    # dropped behind its back: the failed insert forgets the table, the next one recreates it
+    db.con.execute("DROP TABLE odds")
+    with pytest.raises(duckdb.CatalogException):
+        db.insert_df("odds", pd.DataFrame({"event_id": ["e3"]}))
+    assert "odds" not in db._columns
+    assert db.insert_df("odds", pd.DataFrame({"event_id": ["e3"]})) == 1
+
+
+def test_bulk_mode_buffers_until_threshold(tmp_path):
+    path = str(tmp_path / "w.duckdb")
+    with DB(path, bulk=True, flush_rows=5) as db:
+        for i in range(3):
+            assert db.insert_df("t", pd.DataFrame({"k": [2 * i, 2 * i + 1]})) == 2
+        # 6 rows >= 5: flushed in one insert on the third frame
+        assert db.con.execute("SELECT count(*) FROM t").fetchone() == (6,)
+        db.insert_df("t", pd.DataFrame({"k": [6], "v": ["x"]}))
+        assert db.con.execute("SELECT count(*) FROM t").fetchone() == (6,)
+    with DB(path) as db:
+        assert db.con.execute("SELECT max(k), count(v) FROM t").fetchone() == (6, 1)
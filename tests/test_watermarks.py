@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+import duckdb
+import pytest
+from src.ingest import watermarks
+from src.ingest.watermarks import (ensure_watermarks, set_watermark, get_watermark, is_fresh, season_closed,
+                                   fixtures_window_start, fixtures_fingerprint)
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    ensure_watermarks(con)
+    con.execute("CREATE TABLE fact_fixtures (fixture_id INTEGER, league_id INTEGER, season INTEGER, "
+                "date_utc TIMESTAMP, status_short VARCHAR)")
+    con.execute("""INSERT INTO fact_fixtures VALUES (1, 39, 2024, '2024-08-10', 'FT'), (2, 39, 2024, '2024-08-17', 'PST'),
+                   (3, 39, 2024, '2024-08-24', 'NS'), (4, 39, 2023, '2023-08-12', 'AET'), (5, 39, 2023, '2023-08-19', 'CANC')""")
+    return con
+
+
+def test_is_fresh_by_ttl_or_closed_season(con, monkeypatch):
+    assert not is_fresh(con, "teams", 39, 2024)
+    set_watermark(con, "teams", 39, 2024, n_rows=20)
+    assert is_fresh(con, "teams", 39, 2024, ttl=timedelta(hours=1))
+    later = watermarks._now() + timedelta(days=2)
+    monkeypatch.setattr(watermarks, "_now", lambda: later)
+    assert not is_fresh(con, "teams", 39, 2024, ttl=timedelta(days=1))
+    assert is_fresh(con, "teams", 39, 2024, ttl=timedelta(days=1), closed=True)
+    assert is_fresh(con, "teams", 39, 2024, ttl=timedelta(days=3))
+
+
+def test_season_closed_once_every_fixture_is_terminal(con):
+    assert season_closed(con, 39, 2023)                 # AET and CANC never change again
+    assert not season_closed(con, 39, 2024)             # PST and NS still can
+    assert not season_closed(con, 39, 2025)             # nothing known
+    con.execute("UPDATE fact_fixtures SET status_short = NULL WHERE fixture_id = 5")
+    assert not season_closed(con, 39, 2023)
+
+
+def test_window_starts_at_the_first_open_fixture(con):
+    assert fixtures_window_start(con, 39, 2024) is None        # never pulled: full pull
+    set_watermark(con, "fixtures", 39, 2024, n_rows=3)
+    assert fixtures_window_start(con, 39, 2024) == datetime(2024, 8, 17).date()
+    # nothing open: the previous run caps it
+    set_watermark(con, "fixtures", 39, 2023, n_rows=2)
+    assert fixtures_window_start(con, 39, 2023) == get_watermark(con, "fixtures", 39, 2023)["last_run_ts"].date()
+
+
+def test_fingerprint_moves_with_status_or_kickoff(con):
+    fp = fixtures_fingerprint(con, 39, 2024)
+    assert fp == fixtures_fingerprint(con, 39, 2024) and fp != fixtures_fingerprint(con, 39, 2023)
+    con.execute("UPDATE fact_fixtures SET date_utc = '2024-09-20' WHERE fixture_id = 2")
+    moved = fixtures_fingerprint(con, 39, 2024)
+    con.execute("UPDATE fact_fixtures SET status_short = 'FT' WHERE fixture_id = 2")
+    assert len({fp, moved, fixtures_fingerprint(con, 39, 2024)}) == 3
+    assert fixtures_fingerprint(con, 39, 2025) is None